@@ -0,0 +1,410 @@
+# benchmark suite for the training hot paths, checked against a committed baseline
+# run from the repo root:
+#   python -m src.benchmarks.hot_paths                      # full sweep, exit 1 on a regression
+#   python -m src.benchmarks.hot_paths --quick              # smaller sweep (a subset of the keys)
+#   python -m src.benchmarks.hot_paths --only fitness env.step  # cases whose name starts so
+#   python -m src.benchmarks.hot_paths --update-baseline    # accept the current numbers
+#
+# measured (median of --repeat samples):
+#   env.reset / env.step / env.observe        calls/s     x world size, obstacle count
+#   episode.dummy / episode.neat              env steps/s x world size, obstacle count, T
+#   fitness.predator / fitness.prey_vs_pred   trace steps/s on long traces x T
+#   (and the *_batch versions training uses, 20 traces at a time)
+#   controller.build                          us per make_controller, per saved genome
+#   generation.<script>                       s per evaluate_genomes call on a pop_size population
+#
+# everything runs offline: dummy_controllers.py and the "best" genomes of the model
+# registry (results/models), the same ones the training scripts load as opponents.
+# results go to --out as JSON and are compared key by key with --baseline
+#
+# timings are machine-bound, so every sample of a case is taken between two samples of
+# a fixed calibration workload and also stored in calibration units ("calibrated"):
+# a slower machine, or a vm that is slowed down for a while, slows both alike. cases are
+# compared on the median calibrated time. a case counts as slower when it loses more than
+# --threshold (default 15%) or, if more, --noise times the combined sample spread of the
+# two runs; such cases are measured once more and, if still slow, reported as a
+# regression (exit status 1). the calibration cannot cancel a change in the balance of
+# interpreter, numpy and memory speed between machines, so a baseline from a very
+# different machine is only a rough guide
+import argparse
+import datetime
+import importlib
+import json
+import math
+import os
+import platform
+import sys
+import time
+
+import neat
+import numpy as np
+
+from src.core.environment import Environment
+from src.core.simulation import EpisodeResult, run_episode
+from src.core.trace import flat_rows, make_trace, stack_traces
+from src.neat_utils.config import load_config
+from src.neat_utils.controllers import make_controller
+from src.neat_utils.dummy_controllers import pred_dummy, prey_dummy
+from src.neat_utils.fitness import (predator_fitness, predator_fitness_batch,
+                                    prey_fitness_against_predator,
+                                    prey_fitness_against_predator_batch)
+from src.neat_utils.registry import ROLE_SPEEDS, registry
+
+BASELINE_PATH = os.path.join("src", "benchmarks", "baseline.json")
+RESULTS_PATH = os.path.join("results", "benchmarks", "hot_paths.json")
+
+# registry roles of the trained genomes, each run at its training speed
+ROLES = ("predator", "prey", "predator_vs_prey")
+
+TRAINING_SCRIPTS = ("train_predators", "train_prey", "train_preds_against_evprey")
+
+# obstacle counts stay below what place_obstacles can fit non-overlapping in 100x100
+FULL = {
+    "world": [100, 200],
+    "obstacles": [3, 8, 15],
+    "T": [100, 500],
+    "trace_T": [500, 5000, 50000],
+}
+QUICK = {
+    "world": [100],
+    "obstacles": [3, 15],
+    "T": [500],
+    "trace_T": [5000],
+}
+
+ENV_CALLS = 300
+EPISODES = 10
+BATCH_TRACES = 20
+BUILDS = 20
+
+MIN_SAMPLE = 0.05
+CALIBRATION_SAMPLE = 0.02
+
+
+def calibration_work():
+    # fixed reference work: interpreter loops over small numpy arrays and dicts, the
+    # mix most hot paths are made of
+    x = np.linspace(0.0, 1.0, 64)
+    total = 0.0
+    for i in range(300):
+        total += float(np.hypot(x[i % 64], x[(i * 7) % 64]))
+        x = x * 0.999 + 0.001
+    counts = {}
+    for i in range(300):
+        counts[i % 17] = counts.get(i % 17, 0) + i
+    return total
+
+
+def sample_time(fn, min_sample):
+    # seconds per fn() call: fn runs until min_sample has passed. process cpu time, so
+    # time the vm spends on other tenants and scheduling hiccups stay out
+    calls = 0
+    start = time.process_time()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.process_time() - start
+        if elapsed >= min_sample:
+            return elapsed / calls
+
+
+def timed(fn, repeat, min_sample=MIN_SAMPLE):
+    # -> {"seconds", "calibrated", "spread"}: median seconds per fn() call, the median in
+    # calibration units (each sample divided by the calibration runs either side of it)
+    # and the spread of those (median absolute deviation, relative to the median)
+    seconds, calibrated = [], []
+    before = sample_time(calibration_work, CALIBRATION_SAMPLE)
+    for _ in range(repeat):
+        t = sample_time(fn, min_sample)
+        after = sample_time(calibration_work, CALIBRATION_SAMPLE)
+        seconds.append(t)
+        calibrated.append(t / (0.5 * (before + after)))
+        before = after
+    median = float(np.median(calibrated))
+    return {"seconds": float(np.median(seconds)), "calibrated": median,
+            "spread": float(np.median(np.abs(np.asarray(calibrated) - median))) / median}
+
+
+def result(name, params, value, unit, higher_is_better=True, timing=None):
+    # value: a rate (work / seconds) or a time (scale * seconds) from timing["seconds"];
+    # the same quantity in calibration units goes to "calibrated"
+    record = {"name": name, "params": params, "value": float(value), "unit": unit,
+              "higher_is_better": higher_is_better}
+    if timing is not None:
+        scale = timing["seconds"] / timing["calibrated"]
+        record["calibrated"] = float(value) * (scale if higher_is_better else 1.0 / scale)
+        record["spread"] = timing["spread"]
+    return record
+
+
+def result_key(record):
+    params = ",".join(f"{k}={v}" for k, v in sorted(record["params"].items()))
+    return f"{record['name']}[{params}]"
+
+
+def load_genome(role):
+    return registry.genome(role, "best"), ROLE_SPEEDS[role]
+
+
+# -- cases -----------------------------------------------------------------------
+
+def bench_environment(sweep, repeat):
+    actions = np.random.default_rng(0).uniform(-2.0, 2.0, size=(ENV_CALLS, 2, 2))
+
+    for world in sweep["world"]:
+        for k in sweep["obstacles"]:
+            params = {"world": world, "obstacles": k}
+            np.random.seed(0)
+            env = Environment(width=world, height=world, num_obstacles=k)
+
+            timing = timed(lambda: [env.reset() for _ in range(ENV_CALLS)], repeat)
+            yield result("env.reset", params, ENV_CALLS / timing["seconds"], "calls/s",
+                         timing=timing)
+
+            def steps():
+                for a_pred, a_prey in actions:
+                    env.step(a_pred, a_prey)
+
+            # step and observe on the same seeded layout every run
+            np.random.seed(0)
+            env.reset()
+            timing = timed(steps, repeat)
+            yield result("env.step", params, ENV_CALLS / timing["seconds"], "calls/s",
+                         timing=timing)
+
+            np.random.seed(0)
+            env.reset()
+            timing = timed(lambda: [env.observe() for _ in range(ENV_CALLS)], repeat)
+            yield result("env.observe", params, ENV_CALLS / timing["seconds"], "calls/s",
+                         timing=timing)
+
+
+def bench_episodes(sweep, repeat, config):
+    pred_genome, pred_speed = load_genome("predator")
+    prey_genome, prey_speed = load_genome("prey")
+    controllers = {
+        "episode.dummy": (pred_dummy, prey_dummy),
+        "episode.neat": (make_controller(pred_genome, config, speed=pred_speed),
+                         make_controller(prey_genome, config, speed=prey_speed)),
+    }
+
+    for name, (pred, prey) in controllers.items():
+        for world in sweep["world"]:
+            for k in sweep["obstacles"]:
+                for T in sweep["T"]:
+                    env = Environment(width=world, height=world, num_obstacles=k)
+                    steps = []
+
+                    def episodes():
+                        # same layouts and dummy jitter every repeat
+                        np.random.seed(0)
+                        steps[:] = [run_episode(pred, prey, env=env, T=T).steps for _ in range(EPISODES)]
+
+                    timing = timed(episodes, repeat)
+                    yield result(name, {"world": world, "obstacles": k, "T": T},
+                                 sum(steps) / timing["seconds"], "steps/s", timing=timing)
+
+
+def long_trace(T, seed=0):
+    # random-walk episode of T steps that never ends in a capture
+    rng = np.random.default_rng(seed)
+    trace = make_trace(T)
+    rows = flat_rows(trace)
+    rows[:, :4] = 50.0 + np.cumsum(rng.normal(size=(T, 4)), axis=0)
+    rows[:, 4:8] = rng.uniform(-2.0, 2.0, size=(T, 4))
+    rows[:, 8] = np.hypot(rows[:, 0] - rows[:, 2], rows[:, 1] - rows[:, 3])
+    return EpisodeResult(T, False, float(rows[-1, 8]), trace)
+
+
+def bench_fitness(sweep, repeat):
+    for T in sweep["trace_T"]:
+        ep = long_trace(T)
+        for name, fitness in (("fitness.predator", predator_fitness),
+                              ("fitness.prey_vs_pred", prey_fitness_against_predator)):
+            timing = timed(lambda: fitness(ep), repeat)
+            yield result(name, {"T": T}, T / timing["seconds"], "steps/s", timing=timing)
+
+        episodes = [long_trace(T, seed) for seed in range(BATCH_TRACES)]
+        trace, steps = stack_traces([e.trace for e in episodes])
+        captured = [e.captured for e in episodes]
+        for name, fitness in (("fitness.predator_batch", predator_fitness_batch),
+                              ("fitness.prey_vs_pred_batch", prey_fitness_against_predator_batch)):
+            timing = timed(lambda: fitness(trace, steps, captured), repeat)
+            yield result(name, {"T": T}, steps.sum() / timing["seconds"], "steps/s", timing=timing)
+
+
+def bench_controllers(repeat, config):
+    for role in ROLES:
+        genome, speed = load_genome(role)
+        timing = timed(lambda: [make_controller(genome, config, speed) for _ in range(BUILDS)], repeat)
+        yield result("controller.build", {"genome": role}, 1e6 * timing["seconds"] / BUILDS, "us",
+                     higher_is_better=False, timing=timing)
+
+
+def bench_generations(repeat, config):
+    genomes = list(neat.Population(config, seed=0).population.items())
+    for script in TRAINING_SCRIPTS:
+        module = importlib.import_module(f"src.training.{script}")
+
+        def generation():
+            np.random.seed(0)
+            module.evaluate_genomes(genomes, config)
+
+        # the first call loads and compiles the opponent, which is not per-generation work
+        generation()
+        timing = timed(generation, repeat)
+        yield result(f"generation.{script}", {"genomes": len(genomes)}, timing["seconds"], "s",
+                     higher_is_better=False, timing=timing)
+
+
+def run(quick=False, repeat=5, only=None):
+    config = load_config()
+    sweep = QUICK if quick else FULL
+    cases = [
+        ("env", lambda: bench_environment(sweep, repeat)),
+        ("episode", lambda: bench_episodes(sweep, repeat, config)),
+        ("fitness", lambda: bench_fitness(sweep, repeat)),
+        ("controller", lambda: bench_controllers(repeat, config)),
+        ("generation", lambda: bench_generations(min(repeat, 3) if quick else repeat, config)),
+    ]
+
+    results = {}
+    for prefix, case in cases:
+        if only is not None and not any(o.startswith(prefix) or prefix.startswith(o) for o in only):
+            continue
+        for record in case():
+            if only is not None and not any(record["name"].startswith(o) for o in only):
+                continue
+            results[result_key(record)] = record
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+            "quick": quick,
+            "repeat": repeat,
+            # seconds per calibration_work() call on this machine, and the genome
+            # versions the episode.neat / controller.build cases ran
+            "calibration": timed(calibration_work, repeat, CALIBRATION_SAMPLE)["seconds"],
+            "genomes": {role: registry.resolve(role) for role in ROLES},
+        },
+        "results": results,
+    }
+
+
+# -- baseline --------------------------------------------------------------------
+
+def speed_ratio(record, base):
+    # > 1 faster than the baseline, < 1 slower, whatever the unit; in calibration units
+    # when both runs have them
+    field = "calibrated" if "calibrated" in record and "calibrated" in base else "value"
+    if record["higher_is_better"]:
+        return record[field] / base[field]
+    return base[field] / record[field]
+
+
+def allowed_slowdown(record, base, threshold=0.15, noise=3.0):
+    # threshold, or noise times the two runs' combined relative spread if that is wider
+    spread = math.hypot(record.get("spread", 0.0), base.get("spread", 0.0))
+    return min(max(threshold, noise * spread), 0.9)
+
+
+def compare(current, baseline, threshold=0.15, noise=3.0):
+    # -> rows (key, baseline value, value, unit, speed ratio, regressed, allowed slowdown)
+    # for the keys both runs have
+    rows = []
+    for key, record in current["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        ratio = speed_ratio(record, base)
+        allowed = allowed_slowdown(record, base, threshold, noise)
+        rows.append((key, base["value"], record["value"], record["unit"], ratio,
+                     ratio < 1.0 - allowed, allowed))
+    return rows
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def print_table(current, rows):
+    # speed: calibrated ratio to the baseline, allowed: the slowdown it may show
+    compared = {row[0]: row for row in rows}
+    print(f"{'benchmark':<58} {'baseline':>12} {'current':>12} {'unit':>8} {'speed':>7} {'allowed':>8}")
+    for key, record in current["results"].items():
+        if key in compared:
+            _, base, value, unit, ratio, regressed, allowed = compared[key]
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{key:<58} {base:>12.4g} {value:>12.4g} {unit:>8} {ratio:>6.2f}x {allowed:>7.0%}{flag}")
+        else:
+            print(f"{key:<58} {'-':>12} {record['value']:>12.4g} {record['unit']:>8} {'new':>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="hot path benchmarks against the stored baseline")
+    parser.add_argument("--quick", action="store_true", help="smaller sweep for a fast check")
+    parser.add_argument("--repeat", type=int, default=5, help="median of this many samples per case")
+    parser.add_argument("--only", nargs="+", metavar="NAME",
+                        help="only cases whose name starts with one of these")
+    parser.add_argument("--out", default=RESULTS_PATH, help="where to write this run's JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed slowdown before a case counts as a regression")
+    parser.add_argument("--noise", type=float, default=3.0,
+                        help="allow at least this many times the measured sample spread")
+    parser.add_argument("--no-confirm", action="store_true",
+                        help="report regressions without measuring the slow cases a second time")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="merge this run's numbers into the baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    current = run(quick=args.quick, repeat=args.repeat, only=args.only)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        write_json(args.out, current)
+        # keys measured without calibration can not be compared with the rest
+        if baseline is None or baseline.get("meta", {}).get("calibration") is None:
+            baseline = {"results": {}}
+        baseline["meta"] = current["meta"]
+        baseline["results"].update(current["results"])
+        write_json(args.baseline, baseline)
+        print(f"baseline {args.baseline} updated with {len(current['results'])} results")
+        return 0
+
+    baseline = baseline or {"results": {}}
+    base_genomes = baseline.get("meta", {}).get("genomes")
+    if base_genomes is not None and base_genomes != current["meta"]["genomes"]:
+        print(f"note: the baseline ran genomes {base_genomes}, this run {current['meta']['genomes']}; "
+              f"episode.neat and controller.build compare different networks")
+    rows = compare(current, baseline, args.threshold, args.noise)
+    slow = sorted({current["results"][row[0]]["name"] for row in rows if row[5]})
+    if slow and not args.no_confirm:
+        # measure those cases again with twice as many samples; the larger run decides
+        again = run(quick=args.quick, repeat=2 * args.repeat, only=slow)
+        for key, record in again["results"].items():
+            if key in current["results"]:
+                current["results"][key] = record
+        rows = compare(current, baseline, args.threshold, args.noise)
+    write_json(args.out, current)
+
+    print_table(current, rows)
+    regressions = [row[0] for row in rows if row[5]]
+    print(f"\n{len(rows)} compared with {args.baseline}, {len(regressions)} regressions "
+          f"(threshold {args.threshold:.0%}, {args.noise:g}x spread); results in {args.out}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
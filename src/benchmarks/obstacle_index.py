@@ -0,0 +1,41 @@
+# per-step cost of Environment.step/observe as the obstacle count grows,
+# with and without the uniform grid index
+# run from the repo root: python -m src.benchmarks.obstacle_index
+
+import math
+import time
+import numpy as np
+
+from src.core.environment import Environment
+from src.neat_utils.dummy_controllers import pred_dummy, prey_dummy
+
+OBSTACLE_COUNTS = [3, 10, 30, 100, 300, 1000]
+STEPS = 300
+
+
+def time_steps(num_obstacles, spatial_index, steps=STEPS, seed=0):
+    # keep obstacle density the same as the default 100x100 world with 3 obstacles,
+    # otherwise 1000 obstacles would simply cover the whole map
+    side = 100 * math.sqrt(num_obstacles / 3)
+
+    np.random.seed(seed)
+    env = Environment(width=side, height=side, num_obstacles=num_obstacles,
+                      spatial_index=spatial_index)
+    obs_pred, obs_prey = env.reset()
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        (obs_pred, obs_prey), info = env.step(pred_dummy(obs_pred), prey_dummy(obs_prey))
+    return (time.perf_counter() - start) / steps
+
+
+def main():
+    print(f"{'obstacles':>10} {'scan us/step':>14} {'grid us/step':>14} {'speedup':>9}")
+    for k in OBSTACLE_COUNTS:
+        scan = time_steps(k, spatial_index=False)
+        grid = time_steps(k, spatial_index=True)
+        print(f"{k:>10} {scan * 1e6:>14.1f} {grid * 1e6:>14.1f} {scan / grid:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 from dataclasses import dataclass
 import numpy as np
 
-@dataclass
+@dataclass(slots=True)
 class Agent:
     # each agent has a position (x, y), movement speed, and radius (for collisions)
     x: float
@@ -18,8 +18,9 @@ class Agent:
         new_x = self.x + vx
         new_y = self.y + vy
 
-        new_x = np.clip(new_x, 0, bounds[0])
-        new_y = np.clip(new_y, 0, bounds[1])
+        # plain float clamp - same values as np.clip without going through numpy
+        new_x = min(max(new_x, 0.0), float(bounds[0]))
+        new_y = min(max(new_y, 0.0), float(bounds[1]))
 
         # if obstacles exist -> prevent movement into them
         #if obstacles:
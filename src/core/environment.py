@@ -1,6 +1,13 @@
 # 2D world for the predator and prey - goal is to model movement, distance calculation, and capture detection
+import math
+from time import perf_counter
 import numpy as np
 from .agent import Agent
+from .spatial_index import ObstacleGrid
+from .distance_field import ObstacleField
+from .kernels import get_backend
+from .layout import near_sampler, place_obstacles, predator_sampler, spawn_points
+from .profiling import profiler
 
 from dataclasses import dataclass
 from typing import Tuple, List, Dict
@@ -13,7 +20,9 @@ class Obstacle:
 
 class Environment:
 
-    def __init__(self, width=100, height=100, capture_radius=5.0, num_obstacles=3, min_r=4.0, max_r=12.0):
+    def __init__(self, width=100, height=100, capture_radius=5.0, num_obstacles=3, min_r=4.0, max_r=12.0,
+                 spatial_index=True, field_resolution=None, backend=None, allow_overlap=False,
+                 scenarios=None):
         self.width = width
         self.height = height
         self.capture_radius = capture_radius
@@ -26,7 +35,27 @@ class Environment:
         self.max_r = max_r
         self.obstacles = []
 
-        
+        # obstacles never overlap unless asked for (dense test maps); see layout.py
+        self.allow_overlap = allow_overlap
+
+        # uniform grid over the obstacles, rebuilt whenever the obstacle list changes
+        self.spatial_index = spatial_index
+        self._index = None
+
+        # optional precomputed distance field (grid spacing in world units, None = exact queries)
+        self.field_resolution = field_resolution
+        self._field = None
+
+        # optional batched kernel backend ("numpy"/"numba"/"auto") run with N=1;
+        # None keeps the scalar float path. kernels always test obstacles exactly
+        self.backend = None if backend is None else get_backend(backend)
+        self._kernel = None
+
+        # optional ScenarioBank (src/core/scenarios.py) for reset(scenario=i)
+        self.scenarios = scenarios
+        if scenarios is not None:
+            scenarios.check_world(width, height, num_obstacles)
+
 
 
     #def generate_obstacles(self):
@@ -41,76 +70,117 @@ class Environment:
       #      y = np.random.uniform(0, self.height - h)
       #      self.obstacles.append((x, y, w, h))
 
-    def reset(self):
+    def reset(self, scenario=None):
 
         #self.generate_obstacles()
 
-        self.obstacles = []
-    
-        for _ in range(self.num_obstacles):
-            # random radius
-            r = np.random.uniform(self.min_r, self.max_r)
-
-            # position must stay inside walls with margin = radius
-            x = np.random.uniform(r, self.width - r)
-            y = np.random.uniform(r, self.height - r)
+        if scenario is not None:
+            return self._reset_to(scenario)
 
-            self.obstacles.append(Obstacle(x, y, r))
+        # non-overlapping layout and batched spawn sampling - raises LayoutError if the
+        # map is too crowded rather than looping forever
+        ob = place_obstacles(self.num_obstacles, self.width, self.height, self.min_r, self.max_r,
+                             allow_overlap=self.allow_overlap)
+        self.obstacles = [Obstacle(x, y, r) for x, y, r in ob]
 
+        self._index = None
+        self._field = None
 
         # place predator first
-        while True:
-            px = np.random.uniform(20, self.width - 20)
-            py = np.random.uniform(20, self.height - 20)
-            if not self.collides_with_obstacle(px, py):
-                break
+        px, py = spawn_points(1, predator_sampler(np.random, self.width, self.height), ob,
+                              what="predator spawn")[0]
+        self.predator = Agent(float(px), float(py), speed=2.0)
 
-        self.predator = Agent(px, py, speed=2.0)
+        # place prey NEAR predator (within ±40 units), inside world bounds
+        qx, qy = spawn_points(1, near_sampler(np.random, np.array([[px, py]]), self.width, self.height),
+                              ob, what="prey spawn")[0]
+        self.prey = Agent(float(qx), float(qy), speed=1.1)
+
+    
+            
+        return self.observe()
 
-        # place prey NEAR predator (within ±40 units)
-        while True:
-            qx = px + np.random.uniform(-40, 40)
-            qy = py + np.random.uniform(-40, 40)
+    def _reset_to(self, scenario):
+        # start state read straight from the (memory-mapped) bank row, no sampling
+        if self.scenarios is None:
+            raise ValueError("reset(scenario=...) needs an Environment created with scenarios=ScenarioBank")
+        row = self.scenarios[scenario]
 
-            # must stay inside world bounds
-            if 0 <= qx <= self.width and 0 <= qy <= self.height:
-                if not self.collides_with_obstacle(qx, qy):
-                    break
+        self.obstacles = [Obstacle(x, y, r) for x, y, r in row["obstacles"].tolist()]
+        self._index = None
+        self._field = None
 
+        px, py = row["pred_pos"].tolist()
+        qx, qy = row["prey_pos"].tolist()
+        self.predator = Agent(px, py, speed=2.0)
         self.prey = Agent(qx, qy, speed=1.1)
 
-    
-            
         return self.observe()
 
     def distance(self):
         # return Euclidean distance between predator and prey
-        return np.linalg.norm(self.predator.position() - self.prey.position())
+        dx = self.predator.x - self.prey.x
+        dy = self.predator.y - self.prey.y
+        return math.sqrt(dx * dx + dy * dy)
 
     
     def dist(self, x1, y1, x2, y2):
         return np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
 
 
-    def nearest_obstacle_dir(self, agent):
-        if not self.obstacles:
-            return 0.0, 0.0
-
-        ax, ay = agent.position()
+    def obstacle_index(self):
+        # grid is built lazily after reset() and rebuilt if someone swaps the obstacle list
+        if not self.spatial_index:
+            return None
+        if self._index is None or self._index.obstacles is not self.obstacles \
+                or self._index.size != len(self.obstacles):
+            self._index = ObstacleGrid(self.obstacles, self.width, self.height)
+        return self._index
+
+    def obstacle_field(self):
+        # distance field is rasterized once per obstacle layout, only when enabled
+        if self.field_resolution is None or not self.obstacles:
+            return None
+        if self._field is None or self._field.obstacles is not self.obstacles \
+                or self._field.size != len(self.obstacles):
+            self._field = ObstacleField(self.obstacles, self.width, self.height,
+                                        resolution=self.field_resolution)
+        return self._field
+
+    def nearest_obstacle(self, x, y):
+        # closest obstacle center to (x, y)
+        index = self.obstacle_index()
+        if index is not None:
+            return self.obstacles[index.nearest(x, y)]
 
-        # find closest obstacle center
         best_ob = None
         best_d = float("inf")
 
         for ob in self.obstacles:
-            d = self.dist(ax, ay, ob.x, ob.y)
+            d = self.dist(x, y, ob.x, ob.y)
             if d < best_d:
                 best_d = d
                 best_ob = ob
 
+        return best_ob
+
+    def nearest_obstacle_dir(self, agent):
+        return self._obstacle_dir(agent.x, agent.y)
+
+    def _obstacle_dir(self, ax, ay):
+        if not self.obstacles:
+            return 0.0, 0.0
+
+        field = self.obstacle_field()
+        if field is not None:
+            return field.nearest_dir(ax, ay)
+
+        # find closest obstacle center
+        best_ob = self.nearest_obstacle(ax, ay)
+
         dx = best_ob.x - ax
         dy = best_ob.y - ay
-        norm = np.sqrt(dx*dx + dy*dy)
+        norm = math.sqrt(dx*dx + dy*dy)
 
         if norm == 0:
             return 0.0, 0.0
@@ -119,6 +189,14 @@ class Environment:
 
     
     def collides_with_obstacle(self, x, y, agent_radius=1.0):
+        field = self.obstacle_field()
+        if field is not None:
+            return field.collides(x, y, agent_radius)
+
+        index = self.obstacle_index()
+        if index is not None:
+            return index.collides(x, y, agent_radius)
+
         for ob in self.obstacles:
             d = self.dist(x, y, ob.x, ob.y)
             if d < (agent_radius + ob.radius):
@@ -127,41 +205,81 @@ class Environment:
 
     def observe(self):
         # create observation vectors for both predator and prey. these observations will later become NEAT inputs
+        pred_obs = np.empty(6)
+        prey_obs = np.empty(6)
+        self.observe_into(pred_obs, prey_obs)
+        return pred_obs, prey_obs
 
-        rel = self.prey.position() - self.predator.position()
-        d = self.distance()
+    def _kernel_state(self):
+        # (1,2) / (1,K,3) buffers for the batched kernels, rebuilt when the obstacles change
+        k = self._kernel
+        if k is None or k["source"] is not self.obstacles or k["size"] != len(self.obstacles):
+            k = self._kernel = {
+                "source": self.obstacles,
+                "size": len(self.obstacles),
+                "obstacles": np.array([[(ob.x, ob.y, ob.radius) for ob in self.obstacles]],
+                                      dtype=float).reshape(1, -1, 3),
+                "pred": np.zeros((1, 2)), "prey": np.zeros((1, 2)),
+                "pred_act": np.zeros((1, 2)), "prey_act": np.zeros((1, 2)),
+                "pred_obs": np.zeros((1, 6)), "prey_obs": np.zeros((1, 6)),
+                "active": np.ones(1, dtype=bool), "dist": np.zeros(1),
+            }
+
+        k["pred"][0] = self.predator.x, self.predator.y
+        k["prey"][0] = self.prey.x, self.prey.y
+        return k
+
+    def observe_into(self, pred_obs, prey_obs):
+        # same as observe() but writes into caller-owned buffers and does the 2d math on floats
+        if self.backend is not None:
+            k = self._kernel_state()
+            self.backend.observe(k["pred"], k["prey"], k["obstacles"], k["pred_obs"], k["prey_obs"])
+            pred_obs[:] = k["pred_obs"][0]
+            prey_obs[:] = k["prey_obs"][0]
+            return pred_obs, prey_obs
+
+        px, py = self.predator.x, self.predator.y
+        qx, qy = self.prey.x, self.prey.y
+
+        rel_x = qx - px
+        rel_y = qy - py
+        d = math.sqrt(rel_x * rel_x + rel_y * rel_y)
 
         # normalize relative direction
-        norm = np.linalg.norm(rel)
-        if norm > 0:
-            dx = rel[0] / norm
-            dy = rel[1] / norm
+        if d > 0:
+            dx = rel_x / d
+            dy = rel_y / d
         else:
             dx = dy = 0.0
 
-        # nearest obstacle directions
-        ob_dx_pred, ob_dy_pred = self.nearest_obstacle_dir(self.predator)
-        ob_dx_prey, ob_dy_prey = self.nearest_obstacle_dir(self.prey)
+        # nearest obstacle directions (their own profiler phase, see profiling.py)
+        timed = profiler.enabled
+        if timed:
+            start = perf_counter()
+        ob_dx_pred, ob_dy_pred = self._obstacle_dir(px, py)
+        ob_dx_prey, ob_dy_prey = self._obstacle_dir(qx, qy)
+        if timed:
+            profiler.obstacle(perf_counter() - start)
 
         # for now, predator sees (dx, dy, distance, bias), prey sees (-dx, -dy, distance, bias)
         #pred_obs = np.array([rel[0], rel[1], self.distance(), 1.0])
         #prey_obs = np.array([-rel[0], -rel[1], self.distance(), 1.0])
 
-        # final observation size = 7 for each agent
-        pred_obs = np.array([
-            dx, dy,          # dir to prey
-            d / 150.0,       # scaled distance
-            1.0,             # bias
-            ob_dx_pred, ob_dy_pred  
-        ])
-
-        prey_obs = np.array([
-            -dx, -dy,        # dir away from predator
-            d / 150.0,
-            1.0,
-            ob_dx_prey, ob_dy_prey  
-        ])
-        
+        # final observation size = 6 for each agent
+        pred_obs[0] = dx            # dir to prey
+        pred_obs[1] = dy
+        pred_obs[2] = d / 150.0     # scaled distance
+        pred_obs[3] = 1.0           # bias
+        pred_obs[4] = ob_dx_pred
+        pred_obs[5] = ob_dy_pred
+
+        prey_obs[0] = -dx           # dir away from predator
+        prey_obs[1] = -dy
+        prey_obs[2] = d / 150.0
+        prey_obs[3] = 1.0
+        prey_obs[4] = ob_dx_prey
+        prey_obs[5] = ob_dy_prey
+
         return pred_obs, prey_obs
     
     def obstacle_hide_direction(self, agent, predator):
@@ -173,14 +291,7 @@ class Environment:
         px, py = predator.position()
 
         # find nearest obstacle
-        best_ob = None
-        best_d = float("inf")
-
-        for ob in self.obstacles:
-            d = self.dist(ax, ay, ob.x, ob.y)
-            if d < best_d:
-                best_d = d
-                best_ob = ob
+        best_ob = self.nearest_obstacle(ax, ay)
 
         # vector from predator -> obstacle (so prey tries to put obstacle between them)
         obx, oby = best_ob.x, best_ob.y
@@ -193,29 +304,52 @@ class Environment:
         return hide_vec[0] / norm, hide_vec[1] / norm
 
 
-    def step(self, pred_action, prey_action):
-        # update the world by applying both agents actions, each action is a tuple (vx, vy)
+    def _try_move(self, agent, vx, vy):
+        # an agent only moves if the unclipped target is clear of obstacles (same as Agent.move)
+        new_x = agent.x + vx
+        new_y = agent.y + vy
 
-        
-        # try move predator
-        px, py = self.predator.position()
-        new_px = px + pred_action[0]
-        new_py = py + pred_action[1]
+        timed = profiler.enabled
+        if timed:
+            start = perf_counter()
+        blocked = self.collides_with_obstacle(new_x, new_y, agent_radius=agent.radius)
+        if timed:
+            profiler.obstacle(perf_counter() - start)
 
-        if not self.collides_with_obstacle(new_px, new_py, agent_radius=self.predator.radius):
-            self.predator.move(*pred_action, bounds=(self.width, self.height))
+        if not blocked:
+            agent.x = min(max(new_x, 0.0), float(self.width))
+            agent.y = min(max(new_y, 0.0), float(self.height))
 
-        # try move prey
-        qx, qy = self.prey.position()
-        new_qx = qx + prey_action[0]
-        new_qy = qy + prey_action[1]
+    def step_fast(self, pred_action, prey_action):
+        # allocation-free step: moves both agents and returns (distance, captured)
+        # pair it with observe_into() to get the next observations
+        if self.backend is not None:
+            return self._kernel_step(pred_action, prey_action)
 
-        if not self.collides_with_obstacle(new_qx, new_qy, agent_radius=self.prey.radius):
-            self.prey.move(*prey_action, bounds=(self.width, self.height))
+        self._try_move(self.predator, pred_action[0], pred_action[1])
+        self._try_move(self.prey, prey_action[0], prey_action[1])
 
-        
         dist = self.distance()
-        captured = dist < self.capture_radius
+        return dist, dist < self.capture_radius
+
+    def _kernel_step(self, pred_action, prey_action):
+        k = self._kernel_state()
+        k["pred_act"][0] = pred_action[0], pred_action[1]
+        k["prey_act"][0] = prey_action[0], prey_action[1]
+
+        captured = self.backend.step(
+            k["pred"], k["prey"], k["pred_act"], k["prey_act"], k["obstacles"], k["active"],
+            float(self.width), float(self.height), self.predator.radius, self.prey.radius,
+            float(self.capture_radius), k["dist"],
+        )
+
+        self.predator.x, self.predator.y = float(k["pred"][0, 0]), float(k["pred"][0, 1])
+        self.prey.x, self.prey.y = float(k["prey"][0, 0]), float(k["prey"][0, 1])
+        return float(k["dist"][0]), bool(captured[0])
+
+    def step(self, pred_action, prey_action):
+        # update the world by applying both agents actions, each action is a tuple (vx, vy)
+        dist, captured = self.step_fast(pred_action, prey_action)
 
         pred_vel = np.array(pred_action)
         prey_vel = np.array(prey_action)
@@ -227,4 +361,3 @@ class Environment:
                                 "pred_vel": pred_vel,
                                 "prey_vel": prey_vel
                                 }
-    
@@ -0,0 +1,22 @@
+# crash-safe file writes shared by the scenario bank, the model registry and checkpoints
+#   write_atomic("results/models/index.json", lambda f: json.dump(index, f), mode="w")
+#
+# the data goes to a temp file next to path, is fsynced, then renamed over path:
+# readers (and processes with the old file memory-mapped) see the old file or the new
+# one, never half of one, and a crash cannot leave a renamed but unwritten file
+import os
+
+
+def write_atomic(path, write, mode="wb"):
+    # write(f) fills the temp file opened with mode
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,181 @@
+# step/observe kernels for the batched environments, selectable by name
+#   numpy - whole-array reference implementation, always available
+#   numba - compiled loops (src/core/numba_kernels.py), used when numba is installed
+# every kernel works on N episodes at once and writes its results in place
+#
+# with the phase profiler on, the numpy kernels report their obstacle queries to it
+# (profiler.obstacle, see src/core/profiling.py); the compiled numba loops are not split
+import warnings
+from collections import namedtuple
+from time import perf_counter
+
+import numpy as np
+
+from .profiling import profiler
+
+Backend = namedtuple("Backend", ["name", "step", "observe"])
+
+
+def obstacle_distances(points, obstacles):
+    # points (N,2), obstacles (N,K,3) -> center distances (N,K)
+    dx = obstacles[:, :, 0] - points[:, None, 0]
+    dy = obstacles[:, :, 1] - points[:, None, 1]
+    return np.sqrt(dx * dx + dy * dy)
+
+
+def collides(points, obstacles, agent_radius=1.0):
+    # same test as Environment.collides_with_obstacle, one bool per episode
+    if obstacles.shape[1] == 0:
+        return np.zeros(len(points), dtype=bool)
+
+    d = obstacle_distances(points, obstacles)
+    return np.any(d < (agent_radius + obstacles[:, :, 2]), axis=1)
+
+
+def nearest_obstacle(points, obstacles):
+    # index of the closest obstacle center (first one wins ties, like the scalar loop)
+    d = obstacle_distances(points, obstacles)
+    return np.argmin(d, axis=1)
+
+
+def unit(vx, vy):
+    # normalize 2d vectors, zero-length vectors stay (0, 0)
+    norm = np.sqrt(vx * vx + vy * vy)
+    safe = np.where(norm > 0, norm, 1.0)
+    return np.where(norm > 0, vx / safe, 0.0), np.where(norm > 0, vy / safe, 0.0)
+
+
+def nearest_obstacle_dirs(points, obstacles):
+    # vectorized Environment.nearest_obstacle_dir -> (N,2)
+    out = np.zeros((len(points), 2))
+    if obstacles.shape[1] == 0:
+        return out
+
+    rows = np.arange(len(points))
+    best = obstacles[rows, nearest_obstacle(points, obstacles)]
+    out[:, 0], out[:, 1] = unit(best[:, 0] - points[:, 0], best[:, 1] - points[:, 1])
+    return out
+
+
+def capture_pairs(pred_pos, prey_pos, radius):
+    # all (predator, prey) index pairs closer than radius
+    # broadphase: bucket prey into a grid with cell size = radius, so every
+    # pair that can be in range sits in the 3x3 block around the predator's cell
+    if len(pred_pos) == 0 or len(prey_pos) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    pred_cells = np.floor(pred_pos / radius).astype(np.int64)
+    prey_cells = np.floor(prey_pos / radius).astype(np.int64)
+
+    # shift cells to be non-negative and flatten (x, y) into one sortable key
+    lo = np.minimum(pred_cells.min(axis=0), prey_cells.min(axis=0)) - 1
+    pred_cells -= lo
+    prey_cells -= lo
+    cols = max(pred_cells[:, 1].max(), prey_cells[:, 1].max()) + 2
+
+    prey_keys = prey_cells[:, 0] * cols + prey_cells[:, 1]
+    order = np.argsort(prey_keys, kind="stable")
+    sorted_keys = prey_keys[order]
+
+    pred_idx, prey_idx = [], []
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            keys = (pred_cells[:, 0] + ox) * cols + (pred_cells[:, 1] + oy)
+            start = np.searchsorted(sorted_keys, keys, side="left")
+            counts = np.searchsorted(sorted_keys, keys, side="right") - start
+
+            total = counts.sum()
+            if total == 0:
+                continue
+
+            # expand each predator into its run of candidate prey
+            owners = np.repeat(np.arange(len(pred_pos)), counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            pred_idx.append(owners)
+            prey_idx.append(order[np.repeat(start, counts) + offsets])
+
+    if not pred_idx:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    pred_idx = np.concatenate(pred_idx)
+    prey_idx = np.concatenate(prey_idx)
+
+    # narrowphase: exact distance test on the candidates only
+    rel = prey_pos[prey_idx] - pred_pos[pred_idx]
+    hit = np.sqrt(rel[:, 0] ** 2 + rel[:, 1] ** 2) < radius
+
+    return pred_idx[hit], prey_idx[hit]
+
+
+def step_numpy(pred_pos, prey_pos, pred_act, prey_act, obstacles, active,
+               width, height, pred_radius, prey_radius, capture_radius, dist):
+    # move both agents (blocked if the unclipped target hits an obstacle, then
+    # clipped to the walls), write predator-prey distance into dist, return captures
+    timed = profiler.enabled
+    for pos, act, radius in ((pred_pos, pred_act, pred_radius), (prey_pos, prey_act, prey_radius)):
+        target = pos + act
+        if timed:
+            start = perf_counter()
+        blocked = collides(target, obstacles, agent_radius=radius)
+        if timed:
+            profiler.obstacle(perf_counter() - start)
+        ok = active & ~blocked
+        target[:, 0] = np.clip(target[:, 0], 0, width)
+        target[:, 1] = np.clip(target[:, 1], 0, height)
+        pos[ok] = target[ok]
+
+    rel = prey_pos - pred_pos
+    dist[:] = np.sqrt(rel[:, 0] ** 2 + rel[:, 1] ** 2)
+    return active & (dist < capture_radius)
+
+
+def observe_numpy(pred_pos, prey_pos, obstacles, pred_obs, prey_obs):
+    # same 6-value layout as Environment.observe, one row per episode
+    rel = prey_pos - pred_pos
+    d = np.sqrt(rel[:, 0] ** 2 + rel[:, 1] ** 2)
+    dx, dy = unit(rel[:, 0], rel[:, 1])
+
+    pred_obs[:, 0] = dx
+    pred_obs[:, 1] = dy
+    pred_obs[:, 2] = d / 150.0
+    pred_obs[:, 3] = 1.0
+
+    prey_obs[:, 0] = -dx
+    prey_obs[:, 1] = -dy
+    prey_obs[:, 2] = d / 150.0
+    prey_obs[:, 3] = 1.0
+
+    timed = profiler.enabled
+    if timed:
+        start = perf_counter()
+    pred_obs[:, 4:6] = nearest_obstacle_dirs(pred_pos, obstacles)
+    prey_obs[:, 4:6] = nearest_obstacle_dirs(prey_pos, obstacles)
+    if timed:
+        profiler.obstacle(perf_counter() - start)
+
+
+NUMPY = Backend("numpy", step_numpy, observe_numpy)
+
+
+def numba_available():
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_backend(name="numpy"):
+    # "auto" quietly prefers numba; asking for numba without it installed warns and falls back
+    if isinstance(name, Backend):
+        return name
+    if name in (None, "numpy"):
+        return NUMPY
+    if name in ("numba", "auto"):
+        if numba_available():
+            from .numba_kernels import NUMBA
+            return NUMBA
+        if name == "numba":
+            warnings.warn("numba is not installed, falling back to the numpy kernels")
+        return NUMPY
+    raise ValueError(f"unknown kernel backend {name!r} (expected 'numpy', 'numba' or 'auto')")
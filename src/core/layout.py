@@ -0,0 +1,198 @@
+# obstacle layout and spawn point generation shared by every environment
+#   obstacles - batched rejection sampling (random sequential adsorption), so no
+#               two disks overlap unless allow_overlap=True
+#   spawns    - a batch of candidate points per agent, first clear one wins
+# every sampler has a bounded number of rounds and raises LayoutError when the
+# map is too crowded, instead of spinning forever in a while True loop
+import numpy as np
+
+from .kernels import capture_pairs
+
+# rounds of batched sampling before giving up
+MAX_ROUNDS = 100
+
+# candidate spawn points drawn per agent per round
+SPAWN_TRIES = 4
+
+# up to this many obstacles per world the overlap test is a dense (K,K) comparison,
+# above it place_obstacles switches to the capture_pairs grid broadphase
+DENSE_MAX = 64
+
+
+class LayoutError(RuntimeError):
+    pass
+
+
+def _sample_disks(rng, shape, width, height, min_r, max_r):
+    # random radius, center kept inside the walls with margin = radius
+    r = rng.uniform(min_r, max_r, size=shape)
+    x = rng.uniform(r, width - r)
+    y = rng.uniform(r, height - r)
+    return np.stack([x, y, r], axis=-1)
+
+
+def _check_fits(width, height, min_r):
+    if 2 * min_r > min(width, height):
+        raise LayoutError(f"an obstacle of radius {min_r} does not fit in a {width}x{height} world")
+
+
+def _too_crowded(placed, num, width, height, min_r, max_r, rounds):
+    return LayoutError(
+        f"placed only {placed} of {num} non-overlapping obstacles (radius {min_r}-{max_r}) "
+        f"in a {width}x{height} world after {rounds} rounds - lower num_obstacles or max_r, "
+        f"or pass allow_overlap=True"
+    )
+
+
+def _clear(cand, placed, reach, gap):
+    # mask of candidates that overlap neither a placed disk nor an earlier candidate
+    ok = np.ones(len(cand), dtype=bool)
+
+    if len(placed):
+        i, j = capture_pairs(cand[:, :2], placed[:, :2], reach)
+        d = np.hypot(*(cand[i, :2] - placed[j, :2]).T)
+        ok[i[d < cand[i, 2] + placed[j, 2] + gap]] = False
+
+    # within the batch, the later of two overlapping candidates is dropped
+    idx = np.flatnonzero(ok)
+    sub = cand[idx]
+    i, j = capture_pairs(sub[:, :2], sub[:, :2], reach)
+    d = np.hypot(*(sub[i, :2] - sub[j, :2]).T)
+    hit = (i < j) & (d < sub[i, 2] + sub[j, 2] + gap)
+    ok[idx[j[hit]]] = False
+
+    return ok
+
+
+def place_obstacles(num, width, height, min_r, max_r, rng=None, allow_overlap=False,
+                    gap=0.0, max_rounds=MAX_ROUNDS):
+    # (num, 3) array of (x, y, radius) for one world
+    # large layouts test overlaps through the capture_pairs grid, so thousands of obstacles are cheap
+    rng = np.random if rng is None else rng
+    if num <= DENSE_MAX:
+        # a few obstacles: the dense batch test is cheaper than the grid bookkeeping
+        return place_obstacles_batch(1, num, width, height, min_r, max_r, rng, allow_overlap,
+                                     gap, max_rounds)[0]
+    _check_fits(width, height, min_r)
+    placed = np.zeros((0, 3))
+
+    reach = 2 * max_r + gap
+    for _ in range(max_rounds):
+        need = num - len(placed)
+        if need == 0:
+            return placed
+
+        if allow_overlap:
+            cand = _sample_disks(rng, need, width, height, min_r, max_r)
+        else:
+            cand = _sample_disks(rng, max(2 * need, 16), width, height, min_r, max_r)
+            cand = cand[_clear(cand, placed, reach, gap)]
+
+        placed = np.concatenate([placed, cand[:need]])
+
+    if len(placed) < num:
+        raise _too_crowded(len(placed), num, width, height, min_r, max_r, max_rounds)
+    return placed
+
+
+def _surface_gaps(a, b):
+    # a, b (M,K,3) -> (M,K,K) distance between disk surfaces, a's slots along axis 1
+    dx = a[:, :, None, 0] - b[:, None, :, 0]
+    dy = a[:, :, None, 1] - b[:, None, :, 1]
+    return np.sqrt(dx * dx + dy * dy) - a[:, :, None, 2] - b[:, None, :, 2]
+
+
+def place_obstacles_batch(num_worlds, num, width, height, min_r, max_r, rng=None,
+                          allow_overlap=False, gap=0.0, max_rounds=MAX_ROUNDS):
+    # (num_worlds, num, 3) - every unfilled slot of every world is sampled each round
+    rng = np.random if rng is None else rng
+    out = np.zeros((num_worlds, num, 3))
+    if num_worlds == 0 or num == 0:
+        return out
+    _check_fits(width, height, min_r)
+
+    if allow_overlap:
+        out[:] = _sample_disks(rng, (num_worlds, num), width, height, min_r, max_r)
+        return out
+
+    if num > DENSE_MAX:
+        for w in range(num_worlds):
+            out[w] = place_obstacles(num, width, height, min_r, max_r, rng, gap=gap,
+                                     max_rounds=max_rounds)
+        return out
+
+    filled = np.zeros((num_worlds, num), dtype=bool)
+    earlier = np.tri(num, num, -1, dtype=bool)     # earlier[j, i]: slot i comes before slot j
+
+    for _ in range(max_rounds):
+        rows = np.flatnonzero(~filled.all(axis=1))
+        if len(rows) == 0:
+            return out
+
+        cand = _sample_disks(rng, (len(rows), num), width, height, min_r, max_r)
+        placed, done = out[rows], filled[rows]
+
+        # clear of the disks already placed in that world...
+        ok = ~done & ~np.any((_surface_gaps(cand, placed) < gap) & done[:, None, :], axis=2)
+        # ...and of any earlier candidate from this round
+        ok &= ~np.any((_surface_gaps(cand, cand) < gap) & earlier & ok[:, None, :], axis=2)
+
+        placed[ok] = cand[ok]
+        out[rows] = placed
+        filled[rows] = done | ok
+
+    if not filled.all():
+        worst = int(filled.sum(axis=1).min())
+        raise _too_crowded(worst, num, width, height, min_r, max_r, max_rounds)
+    return out
+
+
+def predator_sampler(rng, width, height, margin=20):
+    # predators start anywhere at least `margin` away from the walls
+    def sample(pending, tries):
+        shape = (len(pending), tries)
+        pts = np.stack([rng.uniform(margin, width - margin, size=shape),
+                        rng.uniform(margin, height - margin, size=shape)], axis=-1)
+        return pts, np.ones(shape, dtype=bool)
+    return sample
+
+
+def near_sampler(rng, anchors, width, height, spread=40):
+    # points within ±spread of anchors[slot] (e.g. the prey's predator), inside the world
+    def sample(pending, tries):
+        pts = anchors[pending][:, None, :] + rng.uniform(-spread, spread, size=(len(pending), tries, 2))
+        inside = ((pts[..., 0] >= 0) & (pts[..., 0] <= width) &
+                  (pts[..., 1] >= 0) & (pts[..., 1] <= height))
+        return pts, inside
+    return sample
+
+
+def spawn_points(n, sample, obstacles, agent_radius=1.0, tries=SPAWN_TRIES,
+                 max_rounds=MAX_ROUNDS, what="spawn point"):
+    # (n, 2) points clear of the obstacles
+    # sample(pending, tries) -> (len(pending), tries, 2) candidates plus a validity mask
+    # obstacles is (K,3) shared by every point, or (n,K,3) with one set per point
+    obstacles = np.asarray(obstacles, dtype=float)
+    out = np.zeros((n, 2))
+    pending = np.arange(n)
+
+    for _ in range(max_rounds):
+        if len(pending) == 0:
+            return out
+
+        pts, ok = sample(pending, tries)
+        ob = obstacles[None] if obstacles.ndim == 2 else obstacles[pending]
+        if ob.shape[1]:
+            dx = pts[:, :, None, 0] - ob[:, None, :, 0]
+            dy = pts[:, :, None, 1] - ob[:, None, :, 1]
+            ok &= ~np.any(np.sqrt(dx * dx + dy * dy) < agent_radius + ob[:, None, :, 2], axis=2)
+
+        hit = ok.any(axis=1)
+        first = np.argmax(ok, axis=1)
+        out[pending[hit]] = pts[hit, first[hit]]
+        pending = pending[~hit]
+
+    if len(pending):
+        raise LayoutError(f"no free {what} for {len(pending)} of {n} agents after "
+                          f"{max_rounds * tries} candidates each - the map is too crowded")
+    return out
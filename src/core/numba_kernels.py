@@ -0,0 +1,90 @@
+# numba-compiled versions of the kernels in kernels.py - same signatures, same results
+# imported lazily by kernels.get_backend, so numba stays an optional dependency
+import math
+
+import numba
+import numpy as np
+
+from .kernels import Backend
+
+
+@numba.njit(cache=True)
+def _blocked(x, y, obstacles, i, radius):
+    for k in range(obstacles.shape[1]):
+        dx = obstacles[i, k, 0] - x
+        dy = obstacles[i, k, 1] - y
+        if math.sqrt(dx * dx + dy * dy) < radius + obstacles[i, k, 2]:
+            return True
+    return False
+
+
+@numba.njit(cache=True)
+def _move(pos, act, obstacles, active, width, height, radius):
+    for i in range(pos.shape[0]):
+        if not active[i]:
+            continue
+        x = pos[i, 0] + act[i, 0]
+        y = pos[i, 1] + act[i, 1]
+        if _blocked(x, y, obstacles, i, radius):
+            continue
+        pos[i, 0] = min(max(x, 0.0), width)
+        pos[i, 1] = min(max(y, 0.0), height)
+
+
+@numba.njit(cache=True)
+def step_numba(pred_pos, prey_pos, pred_act, prey_act, obstacles, active,
+               width, height, pred_radius, prey_radius, capture_radius, dist):
+    _move(pred_pos, pred_act, obstacles, active, width, height, pred_radius)
+    _move(prey_pos, prey_act, obstacles, active, width, height, prey_radius)
+
+    captured = np.zeros(pred_pos.shape[0], dtype=np.bool_)
+    for i in range(pred_pos.shape[0]):
+        rx = prey_pos[i, 0] - pred_pos[i, 0]
+        ry = prey_pos[i, 1] - pred_pos[i, 1]
+        dist[i] = math.sqrt(rx * rx + ry * ry)
+        captured[i] = active[i] and dist[i] < capture_radius
+    return captured
+
+
+@numba.njit(cache=True)
+def _obstacle_dir(x, y, obstacles, i, out, row):
+    best = -1
+    best_d = np.inf
+    for k in range(obstacles.shape[1]):
+        dx = obstacles[i, k, 0] - x
+        dy = obstacles[i, k, 1] - y
+        d = math.sqrt(dx * dx + dy * dy)
+        if d < best_d:
+            best_d = d
+            best = k
+
+    out[row, 4] = 0.0
+    out[row, 5] = 0.0
+    if best >= 0 and best_d > 0:
+        out[row, 4] = (obstacles[i, best, 0] - x) / best_d
+        out[row, 5] = (obstacles[i, best, 1] - y) / best_d
+
+
+@numba.njit(cache=True)
+def observe_numba(pred_pos, prey_pos, obstacles, pred_obs, prey_obs):
+    for i in range(pred_pos.shape[0]):
+        rx = prey_pos[i, 0] - pred_pos[i, 0]
+        ry = prey_pos[i, 1] - pred_pos[i, 1]
+        d = math.sqrt(rx * rx + ry * ry)
+        dx = rx / d if d > 0 else 0.0
+        dy = ry / d if d > 0 else 0.0
+
+        pred_obs[i, 0] = dx
+        pred_obs[i, 1] = dy
+        pred_obs[i, 2] = d / 150.0
+        pred_obs[i, 3] = 1.0
+        _obstacle_dir(pred_pos[i, 0], pred_pos[i, 1], obstacles, i, pred_obs, i)
+
+        prey_obs[i, 0] = -dx
+        prey_obs[i, 1] = -dy
+        prey_obs[i, 2] = d / 150.0
+        prey_obs[i, 3] = 1.0
+        _obstacle_dir(prey_pos[i, 0], prey_pos[i, 1], obstacles, i, prey_obs, i)
+
+
+NUMBA = Backend("numba", step_numba, observe_numba)
@@ -0,0 +1,128 @@
+# per-phase timers and counters for the episode loops and the training evaluators
+#
+#   from src.core.profiling import profiler
+#   profiler.enable()
+#   ... run_episode / run_episodes_batched / play_episodes ...
+#   profiler.take()   # -> {"times": {phase: seconds}, "calls": {...}, "counts": {...},
+#                     #     "lengths": [steps of every episode]}, and reset
+#
+# one process-wide profiler, off by default. the episode loops check a local flag once
+# per step and only call perf_counter when it is on, so the disabled cost is a branch.
+# coarser phases (controller build, fitness scoring) use `with profiler.phase(name):`
+#
+# phases recorded:
+#   controllers   network / dummy controller activation
+#   step          moving the agents, without their obstacle collision queries
+#   observe       building observations, without the nearest-obstacle queries
+#                 (the batched VecEnvironment observes inside step, so only in run_episode)
+#   obstacles     collision and nearest-obstacle queries of step / observe: the query
+#                 sites (Environment, numpy kernels) report them with obstacle(seconds)
+#                 and the episode loops move them out of step / observe. the numba
+#                 kernels are not split, their queries stay in step
+#   trace         trace rows and streaming fitness accumulators
+#   build         compiling genomes into controllers
+#   fitness       scoring finished episodes
+# counters: episodes, steps, captures; lengths: every finished episode's step count
+#
+# several reporters can read the same generation through take_generation(generation)
+#
+# worker processes of a ParallelEvaluator run their own profiler; their totals come back
+# with every chunk and are merged into this one (see parallel.py), from the pool's result
+# thread while the main thread may be recording, so the totals are kept under a lock
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PhaseProfiler:
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.RLock()
+        # obstacle query time not yet moved into a phase, per thread (see obstacle())
+        self._obstacles = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.times = {}
+            self.calls = {}
+            self.counts = {}
+            self.lengths = []
+            # last take_generation() result
+            self._generation = None
+            self._snapshot = None
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def add(self, phase, seconds, calls=1):
+        with self._lock:
+            self.times[phase] = self.times.get(phase, 0.0) + seconds
+            self.calls[phase] = self.calls.get(phase, 0) + calls
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def episodes(self, lengths, captures):
+        # finished episodes: their step counts and how many ended in a capture
+        with self._lock:
+            self.lengths.extend(int(n) for n in lengths)
+            self.count("episodes", len(lengths))
+            self.count("steps", int(sum(lengths)))
+            self.count("captures", int(captures))
+
+    def obstacle(self, seconds):
+        # an obstacle query inside step / observe, held for this thread's episode loop
+        self._obstacles.seconds = getattr(self._obstacles, "seconds", 0.0) + seconds
+
+    def take_obstacles(self):
+        # obstacle query time of this thread since the last call
+        seconds = getattr(self._obstacles, "seconds", 0.0)
+        self._obstacles.seconds = 0.0
+        return seconds
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def merge(self, snapshot):
+        # add the totals of another profiler (e.g. a worker's take())
+        if not snapshot:
+            return
+        with self._lock:
+            for phase, seconds in snapshot["times"].items():
+                self.add(phase, seconds, snapshot["calls"].get(phase, 0))
+            for name, n in snapshot["counts"].items():
+                self.count(name, n)
+            self.lengths.extend(snapshot["lengths"])
+
+    def take(self):
+        # totals since the last take, then start over
+        with self._lock:
+            snapshot = {"times": self.times, "calls": self.calls, "counts": self.counts,
+                        "lengths": self.lengths}
+            self.reset()
+        return snapshot
+
+    def take_generation(self, generation):
+        # take() once per generation, the same totals for every later caller
+        with self._lock:
+            if generation != self._generation or self._snapshot is None:
+                snapshot = self.take()
+                self._generation, self._snapshot = generation, snapshot
+            return self._snapshot
+
+
+profiler = PhaseProfiler()
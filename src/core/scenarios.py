@@ -0,0 +1,168 @@
+# precomputed, seedable bank of episode start states (obstacle layout + spawn points)
+# stored as one structured .npy (memory-mapped on load) with a small .json sidecar
+# for the generation parameters
+#   bank = ScenarioBank.generate(1000, seed=0); bank.save("results/scenarios/default.npy")
+#   env = Environment(scenarios=ScenarioBank.load("results/scenarios/default.npy"))
+#   env.reset(scenario=17)
+# every genome of a generation can then be scored on the same scenarios (common random
+# numbers), so fitness differences come from the genomes and not from the layouts they drew
+import json
+import os
+
+import numpy as np
+
+from .io import write_atomic
+from .layout import near_sampler, place_obstacles_batch, predator_sampler, spawn_points
+
+
+def scenario_dtype(num_obstacles):
+    return np.dtype([
+        ("obstacles", np.float64, (num_obstacles, 3)),
+        ("pred_pos", np.float64, (2,)),
+        ("prey_pos", np.float64, (2,)),
+    ])
+
+
+def _meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+class ScenarioBank:
+
+    def __init__(self, data, meta, path=None):
+        self.data = data
+        self.meta = meta
+
+        # file the bank was loaded from (None for an in-memory bank) - worker
+        # processes reopen it instead of receiving a copy
+        self.path = path
+
+        self.width = meta["width"]
+        self.height = meta["height"]
+        self.num_obstacles = meta["num_obstacles"]
+
+    @classmethod
+    def generate(cls, num_scenarios, seed=0, width=100, height=100, num_obstacles=3,
+                 min_r=4.0, max_r=12.0, allow_overlap=False):
+        # same layout and spawn rules as Environment.reset, from a private seeded stream
+        rng = np.random.default_rng(seed)
+        data = np.zeros(num_scenarios, dtype=scenario_dtype(num_obstacles))
+
+        data["obstacles"] = place_obstacles_batch(num_scenarios, num_obstacles, width, height,
+                                                  min_r, max_r, rng=rng, allow_overlap=allow_overlap)
+        data["pred_pos"] = spawn_points(num_scenarios, predator_sampler(rng, width, height),
+                                        data["obstacles"], what="predator spawn")
+        data["prey_pos"] = spawn_points(num_scenarios, near_sampler(rng, data["pred_pos"], width, height),
+                                        data["obstacles"], what="prey spawn")
+
+        meta = cls._settings(num_scenarios, seed, width, height, num_obstacles, min_r, max_r,
+                             allow_overlap)
+        return cls(data, meta)
+
+    @classmethod
+    def _settings(cls, num_scenarios, seed=0, width=100, height=100, num_obstacles=3,
+                  min_r=4.0, max_r=12.0, allow_overlap=False):
+        # the metadata generate() would write for these arguments
+        return {"num_scenarios": num_scenarios, "seed": seed, "width": width, "height": height,
+                "num_obstacles": num_obstacles, "min_r": min_r, "max_r": max_r,
+                "allow_overlap": allow_overlap}
+
+    def save(self, path):
+        # temp file in the same directory, then a rename: processes that have the old
+        # bank memory-mapped keep reading the old file, never a half-written one
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        def write_data(f):
+            np.save(f, np.asarray(self.data), allow_pickle=False)
+
+        def write_meta(f):
+            json.dump(self.meta, f, indent=2)
+
+        write_atomic(path, write_data)
+        write_atomic(_meta_path(path), write_meta, mode="w")
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        # mmap=True maps the file read-only; rows and columns are views, nothing is copied
+        data = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+        with open(_meta_path(path)) as f:
+            meta = json.load(f)
+        if data.dtype != scenario_dtype(meta["num_obstacles"]):
+            raise ValueError(f"{path} does not match its metadata ({data.dtype} vs "
+                             f"{meta['num_obstacles']} obstacles)")
+        return cls(data, meta, path)
+
+    @classmethod
+    def load_or_create(cls, path, num_scenarios, seed=0, **params):
+        # reuse a saved bank if it was generated with the same settings
+        if os.path.exists(path) and os.path.exists(_meta_path(path)):
+            bank = cls.load(path)
+            if bank.meta == cls._settings(num_scenarios, seed, **params):
+                return bank
+
+        bank = cls.generate(num_scenarios, seed, **params)
+        bank.save(path)
+        return cls.load(path)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        return self.data[i]
+
+    @property
+    def obstacles(self):
+        return self.data["obstacles"]
+
+    @property
+    def pred_pos(self):
+        return self.data["pred_pos"]
+
+    @property
+    def prey_pos(self):
+        return self.data["prey_pos"]
+
+    def check_world(self, width, height, num_obstacles):
+        if (self.width, self.height, self.num_obstacles) != (width, height, num_obstacles):
+            raise ValueError(
+                f"scenario bank is for a {self.width}x{self.height} world with {self.num_obstacles} "
+                f"obstacles, environment is {width}x{height} with {num_obstacles}"
+            )
+
+
+class ScenarioSchedule:
+    # hands every genome of a generation the same `per_generation` scenarios and moves
+    # on to the next block of the bank each generation (wrapping around at the end)
+    # rotate=False keeps the first block for every generation (a fixed scenario set)
+
+    def __init__(self, bank, per_generation, rotate=True):
+        if per_generation > len(bank):
+            raise ValueError(f"need {per_generation} scenarios per generation, bank has {len(bank)}")
+        self.bank = bank
+        self.per_generation = per_generation
+        self.rotate = rotate
+        self.generation = 0
+
+    def indices(self, generation):
+        start = generation * self.per_generation if self.rotate else 0
+        return (start + np.arange(self.per_generation)) % len(self.bank)
+
+    def next(self):
+        idx = self.indices(self.generation)
+        self.generation += 1
+        return idx
+
+    def episode_scenarios(self, num_genomes):
+        # next generation's scenarios for episodes laid out genome-major
+        # (genome 0's episodes, then genome 1's, ...) - every genome gets the same ones
+        return np.tile(self.next(), num_genomes)
+
+
+DEFAULT_BANK = "results/scenarios/default.npy"
+
+
+def training_schedule(per_generation, path=DEFAULT_BANK, num_scenarios=1000, seed=0,
+                      rotate=True, **params):
+    # schedule over the shared on-disk bank, generated on first use
+    return ScenarioSchedule(ScenarioBank.load_or_create(path, num_scenarios, seed, **params),
+                            per_generation, rotate)
@@ -1,5 +1,8 @@
 from dataclasses import dataclass
+from time import perf_counter
 from .environment import Environment
+from .profiling import profiler
+from .trace import make_trace, flat_rows
 import numpy as np
 
 @dataclass
@@ -7,40 +10,244 @@ class EpisodeResult:
     steps: int
     captured: bool
     final_distance: float
-    trace: list
+    trace: np.ndarray       # structured array, see src/core/trace.py (None if not recorded)
 
 def run_episode(pred_controller, prey_controller,
-                env=None, T=500, capture_radius=5.0):
+                env=None, T=500, capture_radius=5.0, backend=None,
+                record_trace=True, accumulators=(), scenario=None):
+    # accumulators: objects with update(px, py, qx, qy, dist), fed the position/distance
+    # part of every trace row (e.g. the streaming fitness classes in neat_utils/fitness.py)
+    # record_trace=False skips the trace buffer entirely when only those are needed
+    # scenario: start from that entry of env.scenarios instead of a random layout
 
     if env is None:
-        env = Environment(capture_radius=capture_radius)
+        env = Environment(capture_radius=capture_radius, backend=backend)
 
     # reset environment
-    env.reset()
-    trace = []
+    env.reset(scenario=scenario)
+
+    # preallocated trace, one 9-float row per step
+    trace = make_trace(T) if record_trace else None
+    rows = flat_rows(trace) if record_trace else None
+
+    # observation buffers are reused every step (controllers must not keep a reference)
+    obs_pred = np.empty(6)
+    obs_prey = np.empty(6)
 
     # INITIAL OBSERVATION (this MUST exist before loop)
-    obs_pred, obs_prey = env.observe()
+    env.observe_into(obs_pred, obs_prey)
+
+    # per-phase timing (src/core/profiling.py), one branch per phase when switched off;
+    # the environment reports its obstacle queries, which are moved out of step / observe
+    timed = profiler.enabled
+    phase = [0.0, 0.0, 0.0, 0.0, 0.0]
+    if timed:
+        profiler.take_obstacles()
 
     for t in range(T):
+        if timed:
+            t0 = perf_counter()
 
         # actions based on CURRENT observations
         a_pred = pred_controller(obs_pred)
         a_prey = prey_controller(obs_prey)
 
-        # apply step -> returns NEW observations
+        if timed:
+            t1 = perf_counter()
+
+        # apply step, then refresh the observation buffers in place
+        dist, captured = env.step_fast(a_pred, a_prey)
+
+        if timed:
+            t2 = perf_counter()
+            step_obstacles = profiler.take_obstacles()
+
+        # record trace / feed the accumulators
+        px, py = env.predator.x, env.predator.y
+        qx, qy = env.prey.x, env.prey.y
+        if record_trace:
+            rows[t] = (px, py, qx, qy, a_pred[0], a_pred[1], a_prey[0], a_prey[1], dist)
+        for acc in accumulators:
+            acc.update(px, py, qx, qy, dist)
+
+        if timed:
+            t3 = perf_counter()
+
+        env.observe_into(obs_pred, obs_prey)
+
+        if timed:
+            observe_obstacles = profiler.take_obstacles()
+            phase[0] += t1 - t0
+            phase[1] += t2 - t1 - step_obstacles
+            phase[2] += t3 - t2
+            phase[3] += perf_counter() - t3 - observe_obstacles
+            phase[4] += step_obstacles + observe_obstacles
+
+        if captured:
+            if timed:
+                _record_episode_phases(phase, [t + 1], 1)
+            # trim to the steps actually played (copy so the full buffer can be freed)
+            return EpisodeResult(t+1, True, dist, trace[:t+1].copy() if record_trace else None)
+
+    if timed:
+        _record_episode_phases(phase, [T], 0)
+    return EpisodeResult(T, False, dist, trace)
+
+
+def _record_episode_phases(phase, lengths, captures, observe=True):
+    steps = int(sum(lengths))
+    profiler.add("controllers", phase[0], steps)
+    profiler.add("step", phase[1], steps)
+    profiler.add("trace", phase[2], steps)
+    if observe:
+        profiler.add("observe", phase[3], steps)
+    profiler.add("obstacles", phase[4], steps)
+    profiler.episodes(lengths, captures)
+
+
+def _batched_actions(controller, obs, active):
+    # a controller can be:
+    #   - batched (has .batched = True): called once with the whole (N,6) array
+    #   - a list with one controller per episode (batched entries are called once
+    #     per distinct controller with all of its rows)
+    #   - a plain per-observation controller shared by every episode
+    actions = np.zeros((len(obs), 2))
+
+    if getattr(controller, "batched", False):
+        actions[:] = controller(obs)
+        return actions
+
+    per_episode = isinstance(controller, (list, tuple))
+    if per_episode and all(getattr(c, "batched", False) for c in controller):
+        # one call per distinct controller (e.g. per genome) over its active episodes
+        groups = {}
+        for i in np.flatnonzero(active):
+            groups.setdefault(id(controller[i]), []).append(i)
+        for rows in groups.values():
+            actions[rows] = controller[rows[0]](obs[rows])
+        return actions
+
+    for i in np.flatnonzero(active):
+        ctrl = controller[i] if per_episode else controller
+        actions[i] = ctrl(obs[i])
+
+    return actions
+
+
+def run_episodes_batched(pred_controller, prey_controller, num_episodes=None,
+                         env=None, T=500, capture_radius=5.0, backend="numpy", scenarios=None):
+    # lockstep version of run_episode: every episode runs in one VecEnvironment
+    # and the result is one EpisodeResult per episode (same trace format)
+    # scenarios: optional bank index per episode (see VecEnvironment.reset)
+    from .vec_environment import VecEnvironment
+
+    if env is None:
+        env = VecEnvironment(num_episodes, capture_radius=capture_radius, backend=backend)
+
+    if env.auto_reset:
+        raise ValueError("run_episodes_batched needs a VecEnvironment with auto_reset=False")
+
+    n = env.num_envs
+    env.reset(scenarios=scenarios)
+    obs_pred, obs_prey = env.observe()
+
+    # one (N,T) trace buffer; each EpisodeResult gets a view of its own row
+    traces = make_trace(T, n)
+    rows = flat_rows(traces)
+
+    steps = np.full(n, T)
+    captured = np.zeros(n, dtype=bool)
+
+    timed = profiler.enabled
+    phase = [0.0, 0.0, 0.0, 0.0, 0.0]
+    if timed:
+        profiler.take_obstacles()
+
+    for t in range(T):
+        active = ~env.done
+        if not active.any():
+            break
+
+        if timed:
+            t0 = perf_counter()
+
+        a_pred = _batched_actions(pred_controller, obs_pred, active)
+        a_prey = _batched_actions(prey_controller, obs_prey, active)
+
+        if timed:
+            t1 = perf_counter()
+
+        (obs_pred, obs_prey), info = env.step(a_pred, a_prey)
+
+        if timed:
+            t2 = perf_counter()
+
+        rows[:, t, 0:2], rows[:, t, 2:4] = info["positions"]
+        rows[:, t, 4:6] = a_pred
+        rows[:, t, 6:8] = a_prey
+        rows[:, t, 8] = info["distance"]
+
+        steps[info["done"]] = t + 1
+        captured |= info["captured"]
+
+        if timed:
+            obstacles = profiler.take_obstacles()
+            phase[0] += t1 - t0
+            phase[1] += t2 - t1 - obstacles
+            phase[2] += perf_counter() - t2
+            phase[4] += obstacles
+
+    if timed:
+        # step includes the observations here, VecEnvironment builds them inside step()
+        _record_episode_phases(phase, steps, int(captured.sum()), observe=False)
+
+    results = []
+    for i in range(n):
+        k = steps[i]
+        trace = traces[i, :k]
+        results.append(EpisodeResult(int(k), bool(captured[i]), trace["distance"][k - 1], trace))
+
+    return results
+
+
+@dataclass
+class SwarmEpisodeResult:
+    steps: int
+    capture_step: np.ndarray    # (Q,) step each prey was caught at, -1 = survived
+    kills: np.ndarray           # (P,) prey caught by each predator
+    pred_trace: np.ndarray      # (steps, P, 2)
+    prey_trace: np.ndarray      # (steps, Q, 2)
+
+    @property
+    def survivors(self):
+        return int(np.sum(self.capture_step < 0))
+
+
+def run_swarm_episode(pred_controller, prey_controller, env, T=500):
+    # controllers follow the same rules as run_episodes_batched, one row per agent
+    env.reset()
+    obs_pred, obs_prey = env.observe()
+
+    pred_trace = np.zeros((T, env.num_predators, 2))
+    prey_trace = np.zeros((T, env.num_prey, 2))
+    capture_step = np.full(env.num_prey, -1)
+    kills = np.zeros(env.num_predators, dtype=int)
+    all_preds = np.ones(env.num_predators, dtype=bool)
+
+    steps = T
+    for t in range(T):
+        a_pred = _batched_actions(pred_controller, obs_pred, all_preds)
+        a_prey = _batched_actions(prey_controller, obs_prey, env.prey_alive)
+
         (obs_pred, obs_prey), info = env.step(a_pred, a_prey)
 
-        # record trace
-        trace.append({
-            "pred_pos": np.array(info["positions"][0], dtype=float),
-            "prey_pos": np.array(info["positions"][1], dtype=float),
-            "pred_vel": np.array(info["pred_vel"], dtype=float),
-            "prey_vel": np.array(info["prey_vel"], dtype=float),
-            "distance": float(info["distance"]),
-        })
+        pred_trace[t] = env.pred_pos
+        prey_trace[t] = env.prey_pos
+        capture_step[info["captured"]] = t + 1
+        kills += info["kills"]
 
-        if info["captured"]:
-            return EpisodeResult(t+1, True, info["distance"], trace)
+        if info["done"]:
+            steps = t + 1
+            break
 
-    return EpisodeResult(T, False, info["distance"], trace)
+    return SwarmEpisodeResult(steps, capture_step, kills, pred_trace[:steps], prey_trace[:steps])
@@ -0,0 +1,120 @@
+# uniform grid over the world for obstacle queries, built once per reset()
+# answers "does this point collide?" and "which obstacle center is closest?"
+# by only looking at a few nearby cells instead of scanning every obstacle
+import math
+
+# below this many obstacles a flat scan over plain tuples beats the cell bookkeeping
+FLAT_SCAN_BELOW = 8
+
+
+class ObstacleGrid:
+
+    def __init__(self, obstacles, width, height, cell_size=None):
+        self.obstacles = obstacles
+        self.size = len(obstacles)
+        self.width = width
+        self.height = height
+
+        max_r = max((ob.radius for ob in obstacles), default=1.0)
+        if cell_size is None:
+            # about one obstacle center per cell, but never smaller than the
+            # largest radius so a disk only spans a handful of cells
+            cell_size = max(math.sqrt(width * height / max(len(obstacles), 1)), max_r)
+        self.cell = float(cell_size)
+
+        self.nx = max(1, int(math.ceil(width / self.cell)))
+        self.ny = max(1, int(math.ceil(height / self.cell)))
+
+        # covers[c]: every obstacle whose disk bounding box touches cell c
+        # centers[c]: obstacles whose center lies in cell c
+        self.covers = [[] for _ in range(self.nx * self.ny)]
+        self.centers = [[] for _ in range(self.nx * self.ny)]
+
+        self.entries = [(ob.x, ob.y, ob.radius, i) for i, ob in enumerate(obstacles)]
+        self.flat = len(obstacles) < FLAT_SCAN_BELOW
+
+        for entry in self.entries:
+            ox, oy, r, _ = entry
+            x0, x1 = self._col(ox - r), self._col(ox + r)
+            y0, y1 = self._row(oy - r), self._row(oy + r)
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    self.covers[cx * self.ny + cy].append(entry)
+
+            self.centers[self._col(ox) * self.ny + self._row(oy)].append(entry)
+
+    def _col(self, x):
+        return min(max(int(math.floor(x / self.cell)), 0), self.nx - 1)
+
+    def _row(self, y):
+        return min(max(int(math.floor(y / self.cell)), 0), self.ny - 1)
+
+    def collides(self, x, y, agent_radius=1.0):
+        # same test as the linear scan: center distance < agent_radius + radius
+        if self.flat:
+            for ox, oy, r, _ in self.entries:
+                dx = x - ox
+                dy = y - oy
+                if math.sqrt(dx * dx + dy * dy) < agent_radius + r:
+                    return True
+            return False
+
+        for cx in range(self._col(x - agent_radius), self._col(x + agent_radius) + 1):
+            for cy in range(self._row(y - agent_radius), self._row(y + agent_radius) + 1):
+                for ox, oy, r, _ in self.covers[cx * self.ny + cy]:
+                    dx = x - ox
+                    dy = y - oy
+                    if math.sqrt(dx * dx + dy * dy) < agent_radius + r:
+                        return True
+        return False
+
+    def nearest(self, x, y):
+        # index of the closest obstacle center (lowest index wins ties, like the scan)
+        if not self.obstacles:
+            return None
+
+        if self.flat:
+            best_i = None
+            best_d = float("inf")
+            for ox, oy, _, i in self.entries:
+                dx = ox - x
+                dy = oy - y
+                d = math.sqrt(dx * dx + dy * dy)
+                if d < best_d:
+                    best_d = d
+                    best_i = i
+            return best_i
+
+        cx, cy = self._col(x), self._row(y)
+        best_i = None
+        best_d = float("inf")
+
+        k = 0
+        while True:
+            # visit the ring of cells at chebyshev distance k
+            for gx in range(cx - k, cx + k + 1):
+                if gx < 0 or gx >= self.nx:
+                    continue
+                edge = gx == cx - k or gx == cx + k
+                for gy in (range(cy - k, cy + k + 1) if edge else (cy - k, cy + k)):
+                    if gy < 0 or gy >= self.ny:
+                        continue
+                    for ox, oy, _, i in self.centers[gx * self.ny + gy]:
+                        dx = ox - x
+                        dy = oy - y
+                        d = math.sqrt(dx * dx + dy * dy)
+                        if d < best_d or (d == best_d and i < best_i):
+                            best_d = d
+                            best_i = i
+
+            # anything not visited yet is at least `bound` away
+            inf = float("inf")
+            bound = min(
+                inf if cx - k <= 0 else x - (cx - k) * self.cell,
+                inf if cx + k >= self.nx - 1 else (cx + k + 1) * self.cell - x,
+                inf if cy - k <= 0 else y - (cy - k) * self.cell,
+                inf if cy + k >= self.ny - 1 else (cy + k + 1) * self.cell - y,
+            )
+            if bound == inf or best_d < bound:
+                return best_i
+            k += 1
@@ -0,0 +1,139 @@
+# swarm version of Environment - P predators and Q prey kept in contiguous
+# (P,2) / (Q,2) arrays, so a step costs a handful of numpy calls no matter
+# how many agents are in the world
+import numpy as np
+
+from .kernels import capture_pairs, collides, nearest_obstacle_dirs, unit
+from .layout import near_sampler, place_obstacles, predator_sampler, spawn_points
+
+
+def nearest_opponent(pos, other, chunk=1024):
+    # index and distance of the closest agent in `other` for every row of `pos`
+    # done in row chunks so a 10k x 10k swarm never builds the full matrix
+    idx = np.zeros(len(pos), dtype=int)
+    dist = np.full(len(pos), np.inf)
+    if len(other) == 0:
+        return idx, dist
+
+    for s in range(0, len(pos), chunk):
+        rel = other[None, :, :] - pos[s:s + chunk, None, :]
+        d = np.sqrt(rel[:, :, 0] ** 2 + rel[:, :, 1] ** 2)
+        idx[s:s + chunk] = np.argmin(d, axis=1)
+        dist[s:s + chunk] = d[np.arange(len(d)), idx[s:s + chunk]]
+
+    return idx, dist
+
+
+class SwarmEnvironment:
+
+    def __init__(self, num_predators=10, num_prey=50, width=100, height=100,
+                 capture_radius=5.0, num_obstacles=3, min_r=4.0, max_r=12.0, rng=None,
+                 allow_overlap=False):
+        self.num_predators = num_predators
+        self.num_prey = num_prey
+        self.width = width
+        self.height = height
+        self.capture_radius = capture_radius
+
+        self.num_obstacles = num_obstacles
+        self.min_r = min_r
+        self.max_r = max_r
+        self.allow_overlap = allow_overlap
+
+        self.rng = np.random if rng is None else rng
+
+        # same radii as the single-agent Agent dataclass
+        self.pred_radius = 5.0
+        self.prey_radius = 5.0
+
+        self.pred_pos = np.zeros((num_predators, 2))
+        self.prey_pos = np.zeros((num_prey, 2))
+        self.prey_alive = np.ones(num_prey, dtype=bool)
+        self.obstacles = np.zeros((num_obstacles, 3))
+
+    def _obstacles_for(self, n):
+        # every agent shares one obstacle set - broadcast it to the (N,K,3) layout
+        return np.broadcast_to(self.obstacles, (n,) + self.obstacles.shape)
+
+    def reset(self):
+        # one shared non-overlapping layout - thousands of obstacles go through the grid sampler
+        self.obstacles[:] = place_obstacles(self.num_obstacles, self.width, self.height,
+                                            self.min_r, self.max_r, rng=self.rng,
+                                            allow_overlap=self.allow_overlap)
+
+        # predators anywhere away from the walls
+        self.pred_pos[:] = spawn_points(self.num_predators,
+                                        predator_sampler(self.rng, self.width, self.height),
+                                        self.obstacles, what="predator spawn")
+
+        # each prey starts near (±40) a random predator, inside the world
+        # (uniform + floor works for both np.random and a Generator)
+        anchors = self.rng.uniform(0, self.num_predators, size=self.num_prey).astype(int)
+        self.prey_pos[:] = spawn_points(self.num_prey,
+                                        near_sampler(self.rng, self.pred_pos[anchors],
+                                                     self.width, self.height),
+                                        self.obstacles, what="prey spawn")
+        self.prey_alive[:] = True
+
+        return self.observe()
+
+    def observe(self):
+        # per-agent observations in the same 6-value layout as Environment.observe:
+        # predators see the nearest living prey, prey see the nearest predator
+        alive = np.flatnonzero(self.prey_alive)
+
+        pred_obs = np.zeros((self.num_predators, 6))
+        pred_obs[:, 3] = 1.0
+        if len(alive):
+            j, d = nearest_opponent(self.pred_pos, self.prey_pos[alive])
+            rel = self.prey_pos[alive[j]] - self.pred_pos
+            pred_obs[:, 0], pred_obs[:, 1] = unit(rel[:, 0], rel[:, 1])
+            pred_obs[:, 2] = d / 150.0
+        pred_obs[:, 4:6] = nearest_obstacle_dirs(self.pred_pos, self._obstacles_for(self.num_predators))
+
+        prey_obs = np.zeros((self.num_prey, 6))
+        prey_obs[:, 3] = 1.0
+        if len(alive):
+            i, d = nearest_opponent(self.prey_pos[alive], self.pred_pos)
+            # same sign convention as Environment: prey obs point at the predator
+            rel = self.pred_pos[i] - self.prey_pos[alive]
+            prey_obs[alive, 0], prey_obs[alive, 1] = unit(rel[:, 0], rel[:, 1])
+            prey_obs[alive, 2] = d / 150.0
+            prey_obs[alive, 4:6] = nearest_obstacle_dirs(self.prey_pos[alive],
+                                                         self._obstacles_for(len(alive)))
+
+        return pred_obs, prey_obs
+
+    def _move(self, pos, action, radius, active):
+        target = pos + action
+        ok = active & ~collides(target, self._obstacles_for(len(pos)), agent_radius=radius)
+        target[:, 0] = np.clip(target[:, 0], 0, self.width)
+        target[:, 1] = np.clip(target[:, 1], 0, self.height)
+        pos[ok] = target[ok]
+
+    def step(self, pred_actions, prey_actions):
+        # actions are (P,2) and (Q,2) velocity arrays; captured prey stay where they died
+        pred_actions = np.asarray(pred_actions, dtype=float).reshape(self.num_predators, 2)
+        prey_actions = np.asarray(prey_actions, dtype=float).reshape(self.num_prey, 2)
+
+        self._move(self.pred_pos, pred_actions, self.pred_radius,
+                   np.ones(self.num_predators, dtype=bool))
+        self._move(self.prey_pos, prey_actions, self.prey_radius, self.prey_alive)
+
+        alive = np.flatnonzero(self.prey_alive)
+        hunters, victims = capture_pairs(self.pred_pos, self.prey_pos[alive], self.capture_radius)
+        victims = alive[victims]
+
+        # a prey touched by several predators is credited to every one of them
+        captured = np.zeros(self.num_prey, dtype=bool)
+        captured[victims] = True
+        self.prey_alive &= ~captured
+
+        kills = np.bincount(hunters, minlength=self.num_predators)
+
+        return self.observe(), {
+            "captured": captured,
+            "kills": kills,
+            "num_alive": int(self.prey_alive.sum()),
+            "done": not self.prey_alive.any(),
+        }
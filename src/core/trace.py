@@ -0,0 +1,55 @@
+# episode trace stored as one preallocated numpy structured array instead of a list of dicts
+#   trace[t]["pred_pos"] -> (2,) position after step t (same lookup as the old dict entries)
+#   trace["pred_pos"]    -> (steps, 2) column, no rebuilding from per-step entries
+import numpy as np
+
+TRACE_FIELDS = ("pred_pos", "prey_pos", "pred_vel", "prey_vel", "distance")
+
+TRACE_DTYPE = np.dtype([
+    ("pred_pos", np.float64, (2,)),
+    ("prey_pos", np.float64, (2,)),
+    ("pred_vel", np.float64, (2,)),
+    ("prey_vel", np.float64, (2,)),
+    ("distance", np.float64),
+])
+
+# every field is float64 with no padding, so a row is also 9 plain floats:
+# (pred x, pred y, prey x, prey y, pred vx, pred vy, prey vx, prey vy, distance)
+ROW_WIDTH = TRACE_DTYPE.itemsize // 8
+
+
+def make_trace(T, num_episodes=None):
+    # (T,) buffer for one episode, or (num_episodes, T) for a batch
+    shape = T if num_episodes is None else (num_episodes, T)
+    return np.zeros(shape, dtype=TRACE_DTYPE)
+
+
+def flat_rows(trace):
+    # writable (..., 9) float view of a trace buffer, one plain row per step
+    return trace.view(np.float64).reshape(trace.shape + (ROW_WIDTH,))
+
+
+def trace_column(trace, name):
+    # column accessor that also accepts old list-of-dict traces
+    if isinstance(trace, np.ndarray) and trace.dtype.names:
+        return trace[name]
+    return np.array([step[name] for step in trace], dtype=float)
+
+
+def stack_traces(traces):
+    # padded (E, T) buffer + lengths for a list of per-episode traces
+    # traces from one run_episodes_batched call are already rows of a shared buffer,
+    # which is returned as-is instead of copied
+    lengths = np.array([len(t) for t in traces], dtype=int)
+
+    base = traces[0].base if len(traces) else None
+    if (isinstance(base, np.ndarray) and base.dtype == TRACE_DTYPE and base.ndim == 2
+            and len(base) == len(traces)
+            and all(t.base is base and t.ctypes.data == base[i].ctypes.data
+                    for i, t in enumerate(traces))):
+        return base, lengths
+
+    out = make_trace(int(lengths.max(initial=0)), len(traces))
+    for i, t in enumerate(traces):
+        out[i, :len(t)] = t
+    return out, lengths
@@ -0,0 +1,151 @@
+# batched version of Environment - holds N independent predator/prey episodes
+# as struct-of-arrays so reset/observe/step are whole-array numpy operations
+# instead of N python-level Environment objects
+import numpy as np
+
+from .kernels import get_backend, nearest_obstacle, unit
+from .layout import near_sampler, place_obstacles_batch, predator_sampler, spawn_points
+# re-exported for older imports
+from .kernels import collides, nearest_obstacle_dirs, obstacle_distances  # noqa: F401
+
+
+class VecEnvironment:
+
+    def __init__(self, num_envs, width=100, height=100, capture_radius=5.0,
+                 num_obstacles=3, min_r=4.0, max_r=12.0, max_steps=None,
+                 auto_reset=False, rng=None, backend="numpy", allow_overlap=False, scenarios=None):
+        self.num_envs = num_envs
+        self.width = width
+        self.height = height
+        self.capture_radius = capture_radius
+
+        self.num_obstacles = num_obstacles
+        self.min_r = min_r
+        self.max_r = max_r
+        self.allow_overlap = allow_overlap
+
+        # optional ScenarioBank for reset(scenarios=...)
+        self.scenarios = scenarios
+        if scenarios is not None:
+            scenarios.check_world(width, height, num_obstacles)
+
+        # episodes are truncated after max_steps (None = never, caller decides)
+        self.max_steps = max_steps
+        self.auto_reset = auto_reset
+
+        # same global np.random stream as Environment unless a Generator is passed
+        self.rng = np.random if rng is None else rng
+
+        # step/observe kernels - "numpy", "numba" or "auto" (see kernels.get_backend)
+        self.backend = get_backend(backend)
+
+        # agent radii match the Agent dataclass defaults used by Environment
+        self.pred_radius = 5.0
+        self.prey_radius = 5.0
+
+        self.pred_pos = np.zeros((num_envs, 2))
+        self.prey_pos = np.zeros((num_envs, 2))
+        self.obstacles = np.zeros((num_envs, num_obstacles, 3))
+        self.steps = np.zeros(num_envs, dtype=int)
+        self.done = np.zeros(num_envs, dtype=bool)
+
+    def reset(self, idx=None, scenarios=None):
+        # reset all episodes, or only the ones listed in idx
+        # scenarios: one bank index per reset episode - start states are read from the
+        # bank instead of sampled
+        if idx is None:
+            idx = np.arange(self.num_envs)
+        idx = np.asarray(idx, dtype=int)
+        n = len(idx)
+        if n == 0:
+            return self.observe()
+
+        if scenarios is not None:
+            if self.scenarios is None:
+                raise ValueError("reset(scenarios=...) needs a VecEnvironment created with "
+                                 "scenarios=ScenarioBank")
+            rows = self.scenarios[np.asarray(scenarios, dtype=int)]
+            self.obstacles[idx] = rows["obstacles"]
+            self.pred_pos[idx] = rows["pred_pos"]
+            self.prey_pos[idx] = rows["prey_pos"]
+            self.steps[idx] = 0
+            self.done[idx] = False
+            return self.observe()
+
+        # non-overlapping obstacles for every reset episode at once (see layout.py)
+        self.obstacles[idx] = place_obstacles_batch(n, self.num_obstacles, self.width, self.height,
+                                                    self.min_r, self.max_r, rng=self.rng,
+                                                    allow_overlap=self.allow_overlap)
+        obstacles = self.obstacles[idx]
+
+        # place predator first
+        self.pred_pos[idx] = spawn_points(n, predator_sampler(self.rng, self.width, self.height),
+                                          obstacles, what="predator spawn")
+
+        # place prey NEAR predator (within ±40 units) and inside world bounds
+        self.prey_pos[idx] = spawn_points(n, near_sampler(self.rng, self.pred_pos[idx],
+                                                          self.width, self.height),
+                                          obstacles, what="prey spawn")
+
+        self.steps[idx] = 0
+        self.done[idx] = False
+
+        return self.observe()
+
+    def distance(self):
+        rel = self.prey_pos - self.pred_pos
+        return np.sqrt(rel[:, 0] ** 2 + rel[:, 1] ** 2)
+
+    def observe(self):
+        # same 6-value observation as Environment.observe, one row per episode
+        pred_obs = np.empty((self.num_envs, 6))
+        prey_obs = np.empty((self.num_envs, 6))
+        self.backend.observe(self.pred_pos, self.prey_pos, self.obstacles, pred_obs, prey_obs)
+        return pred_obs, prey_obs
+
+    def obstacle_hide_direction(self):
+        # vectorized Environment.obstacle_hide_direction(prey, predator) -> (N,2)
+        out = np.zeros((self.num_envs, 2))
+        if self.num_obstacles == 0:
+            return out
+
+        rows = np.arange(self.num_envs)
+        best = self.obstacles[rows, nearest_obstacle(self.prey_pos, self.obstacles)]
+        out[:, 0], out[:, 1] = unit(best[:, 0] - self.pred_pos[:, 0],
+                                    best[:, 1] - self.pred_pos[:, 1])
+        return out
+
+    def step(self, pred_actions, prey_actions):
+        # actions are (N,2) velocity arrays; finished episodes stay frozen
+        pred_actions = np.asarray(pred_actions, dtype=float).reshape(self.num_envs, 2)
+        prey_actions = np.asarray(prey_actions, dtype=float).reshape(self.num_envs, 2)
+        active = ~self.done
+
+        dist = np.empty(self.num_envs)
+        captured = self.backend.step(
+            self.pred_pos, self.prey_pos, pred_actions, prey_actions, self.obstacles, active,
+            float(self.width), float(self.height), self.pred_radius, self.prey_radius,
+            float(self.capture_radius), dist,
+        )
+
+        self.steps[active] += 1
+        finished = captured.copy()
+        if self.max_steps is not None:
+            finished |= active & (self.steps >= self.max_steps)
+        self.done |= finished
+
+        info = {
+            "distance": dist,
+            "captured": captured,
+            "done": finished,
+            "steps": self.steps.copy(),
+            "positions": (self.pred_pos.copy(), self.prey_pos.copy()),
+            "pred_vel": pred_actions,
+            "prey_vel": prey_actions,
+        }
+
+        # finished episodes start over immediately; info keeps their terminal state
+        if self.auto_reset and finished.any():
+            self.reset(np.flatnonzero(finished))
+
+        return self.observe(), info
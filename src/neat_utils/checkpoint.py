@@ -0,0 +1,319 @@
+# crash-safe training checkpoints
+#   checkpointer = AsyncCheckpointer("results/checkpoints/prey", interval=1)
+#   pop.add_reporter(checkpointer)
+#   ...
+#   pop, extra = restore_checkpoint(latest_checkpoint("results/checkpoints/prey"), config)
+#   pop.run(evaluator, n=30 - pop.generation)
+#
+# a checkpoint is one compressed .npz: every genome as genome_codec arrays plus a json
+# record of species, innovation counter, python/numpy RNG state, the best genome so far
+# and whatever extra_state() returns (schedule position, racing noise level, ...).
+# no pickle, so files stay loadable across code changes and are safe to open.
+#
+# the snapshot is taken in end_generation (a few ms); compression and the write run on
+# a background thread, so training does not wait on the disk. files are written to a
+# temp name and renamed, so a crash mid-write never leaves a broken latest checkpoint.
+# old checkpoints are rotated out by count and by total size.
+#
+# start_or_resume() is how a training script begins: continue the newest checkpoint
+# (--resume), or start over after moving an earlier run's checkpoints to archive/
+# (--fresh). it refuses to silently start over on top of an earlier run
+import glob
+import json
+import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import neat
+import numpy as np
+from neat.innovation import InnovationTracker
+from neat.species import Species
+
+from src.core.io import write_atomic
+
+from .genome_codec import decode_genome, encode_genome
+
+FILE_PATTERN = "ckpt-{:06d}.npz"
+_FILE_RE = re.compile(r"ckpt-(\d+)\.npz$")
+
+
+def list_checkpoints(directory):
+    # (generation, path) pairs, oldest first
+    found = []
+    for path in glob.glob(os.path.join(directory, "ckpt-*.npz")):
+        m = _FILE_RE.search(path)
+        if m:
+            found.append((int(m.group(1)), path))
+    return sorted(found)
+
+
+def latest_checkpoint(directory):
+    found = list_checkpoints(directory)
+    return found[-1][1] if found else None
+
+
+def archive_checkpoints(directory):
+    # a fresh run starts numbering at 1 again, so an old run's files must not look newer.
+    # they are moved to <directory>/archive/<time>/ rather than deleted -> that path
+    found = list_checkpoints(directory)
+    if not found:
+        return None
+    base = os.path.join(directory, "archive", time.strftime("%Y%m%d-%H%M%S"))
+    archive, n = base, 1
+    while os.path.exists(archive):
+        n += 1
+        archive = f"{base}-{n}"
+    os.makedirs(archive)
+    for _, path in found:
+        os.replace(path, os.path.join(archive, os.path.basename(path)))
+    return archive
+
+
+def start_or_resume(directory, config, resume=False, fresh=False):
+    # -> (population, extra state) for a training run checkpointing into directory.
+    # resume continues from the newest checkpoint; fresh archives an earlier run's
+    # checkpoints and starts over. with neither, an earlier run's checkpoints are an
+    # error - starting over by accident would bury the crash recovery they are for
+    if resume and fresh:
+        raise ValueError("resume and fresh are mutually exclusive")
+    latest = latest_checkpoint(directory)
+
+    if resume and latest is not None:
+        pop, extra = restore_checkpoint(latest, config)
+        print(f"Resuming from {latest} at generation {pop.generation}")
+        return pop, extra
+
+    if resume:
+        print(f"No checkpoint in {directory}, starting a fresh run")
+    elif latest is not None:
+        if not fresh:
+            raise RuntimeError(f"{directory} holds checkpoints of an earlier run (newest {latest}); "
+                               f"resume it (--resume) or archive them and start over (--fresh)")
+        print(f"Earlier checkpoints moved to {archive_checkpoints(directory)}")
+    return neat.Population(config), {}
+
+
+def _float_or_none(x):
+    return None if x is None else float(x)
+
+
+def _np_state_to_json(state):
+    name, keys, pos, has_gauss, cached = state
+    return [name, keys.tolist(), int(pos), int(has_gauss), float(cached)]
+
+
+def _np_state_from_json(state):
+    name, keys, pos, has_gauss, cached = state
+    return name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached
+
+
+def _random_state_to_json(state):
+    version, internal, gauss = state
+    return [version, list(internal), gauss]
+
+
+def _random_state_from_json(state):
+    version, internal, gauss = state
+    return version, tuple(internal), gauss
+
+
+def snapshot(config, population, species_set, generation, best_genome=None, extra=None):
+    # everything needed to resume at `generation`, as arrays + json-able data
+    genomes = {}
+
+    def add(genome):
+        # genomes are stored once, by key; species representatives may be from an
+        # earlier generation and not in the population any more
+        if genome.key not in genomes:
+            genomes[genome.key] = genome
+
+    for genome in population.values():
+        add(genome)
+    for s in species_set.species.values():
+        if s.representative is not None:
+            add(s.representative)
+    if best_genome is not None:
+        add(best_genome)
+
+    keys = list(genomes)
+    encoded = [encode_genome(genomes[k], config) for k in keys]
+
+    next_species = next(species_set.indexer)
+    species_set.indexer = count(next_species)
+
+    record = {
+        "generation": int(generation),
+        "population": [int(k) for k in population],
+        "best_genome": None if best_genome is None else int(best_genome.key),
+        "species": [{
+            "key": int(s.key),
+            "created": int(s.created),
+            "last_improved": int(s.last_improved),
+            "representative": None if s.representative is None else int(s.representative.key),
+            "members": [int(k) for k in s.members],
+            "fitness": _float_or_none(s.fitness),
+            "adjusted_fitness": _float_or_none(s.adjusted_fitness),
+            "fitness_history": [float(f) for f in s.fitness_history],
+        } for s in species_set.species.values()],
+        "next_species": int(next_species),
+        "innovation_counter": int(config.genome_config.innovation_tracker.global_counter),
+        "random_state": _random_state_to_json(random.getstate()),
+        "np_random_state": _np_state_to_json(np.random.get_state()),
+        "extra": extra or {},
+    }
+
+    return {
+        "record": np.array(json.dumps(record)),
+        "keys": np.array(keys, dtype=np.int64),
+        "fitness": np.array([np.nan if genomes[k].fitness is None else genomes[k].fitness
+                             for k in keys], dtype=np.float64),
+        "node_counts": np.array([len(e["nodes"]) for e in encoded], dtype=np.int64),
+        "conn_counts": np.array([len(e["conns"]) for e in encoded], dtype=np.int64),
+        "nodes": np.concatenate([e["nodes"] for e in encoded]),
+        "conns": np.concatenate([e["conns"] for e in encoded]),
+        "activation_options": np.array(config.genome_config.activation_options),
+        "aggregation_options": np.array(config.genome_config.aggregation_options),
+    }
+
+
+def write_checkpoint(path, arrays):
+    # compressed npz, written atomically (src/core/io.py)
+    write_atomic(path, lambda f: np.savez_compressed(f, **arrays))
+
+
+def restore_checkpoint(path, config):
+    # -> (neat.Population ready to continue at the saved generation, extra dict)
+    with np.load(path, allow_pickle=False) as f:
+        record = json.loads(str(f["record"]))
+        data = {name: f[name] for name in f.files}
+
+    gc = config.genome_config
+    if [str(s) for s in data["activation_options"]] != list(gc.activation_options) or \
+            [str(s) for s in data["aggregation_options"]] != list(gc.aggregation_options):
+        raise ValueError(f"{path} was written with different activation/aggregation options")
+
+    genomes = {}
+    node_end = np.cumsum(data["node_counts"])
+    conn_end = np.cumsum(data["conn_counts"])
+    for i, key in enumerate(data["keys"]):
+        genome = decode_genome({
+            "key": int(key),
+            "nodes": data["nodes"][node_end[i] - data["node_counts"][i]:node_end[i]],
+            "conns": data["conns"][conn_end[i] - data["conn_counts"][i]:conn_end[i]],
+        }, config)
+        fitness = data["fitness"][i]
+        genome.fitness = None if np.isnan(fitness) else float(fitness)
+        genomes[int(key)] = genome
+
+    population = {k: genomes[k] for k in record["population"]}
+
+    species_set = config.species_set_type(config.species_set_config, None)
+    species_set.indexer = count(record["next_species"])
+    for s in record["species"]:
+        sp = Species(s["key"], s["created"])
+        sp.last_improved = s["last_improved"]
+        sp.representative = None if s["representative"] is None else genomes[s["representative"]]
+        sp.members = {k: genomes[k] for k in s["members"]}
+        sp.fitness = s["fitness"]
+        sp.adjusted_fitness = s["adjusted_fitness"]
+        sp.fitness_history = s["fitness_history"]
+        species_set.species[sp.key] = sp
+        for k in s["members"]:
+            species_set.genome_to_species[k] = sp.key
+
+    pop = neat.Population(config, (population, species_set, record["generation"]))
+
+    # continue the innovation numbering instead of starting a fresh tracker
+    tracker = InnovationTracker(record["innovation_counter"])
+    pop.reproduction.innovation_tracker = tracker
+    gc.innovation_tracker = tracker
+
+    if record["best_genome"] is not None:
+        pop.best_genome = genomes[record["best_genome"]]
+
+    # after Population(), which re-seeds `random` from config.seed
+    random.setstate(_random_state_from_json(record["random_state"]))
+    np.random.set_state(_np_state_from_json(record["np_random_state"]))
+
+    return pop, record["extra"]
+
+
+class AsyncCheckpointer(neat.reporting.BaseReporter):
+
+    def __init__(self, directory, interval=1, keep=5, max_bytes=256 << 20,
+                 extra_state=None, best_genome=None, verbose=False):
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        self.max_bytes = max_bytes
+        self.extra_state = extra_state
+        self.verbose = verbose
+
+        self.generation = None
+        # pass the restored population's best_genome when resuming
+        self.best_genome = best_genome
+        self.last_saved = None
+
+        # one writer thread, snapshots are written in order
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self._pending = []
+
+        os.makedirs(directory, exist_ok=True)
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        # same rule Population.run uses for its best_genome
+        if self.best_genome is None or best_genome.fitness > self.best_genome.fitness:
+            self.best_genome = best_genome
+
+    def end_generation(self, config, population, species_set):
+        # population and species_set already belong to the next generation
+        next_generation = self.generation + 1
+        if next_generation % self.interval:
+            return
+
+        extra = None if self.extra_state is None else self.extra_state()
+        arrays = snapshot(config, population, species_set, next_generation, self.best_genome, extra)
+        self._raise_failed()
+        self._pending.append(self._writer.submit(self._write, next_generation, arrays))
+        self.last_saved = next_generation
+
+    def _write(self, generation, arrays):
+        path = os.path.join(self.directory, FILE_PATTERN.format(generation))
+        write_checkpoint(path, arrays)
+        self._rotate()
+        if self.verbose:
+            print(f"checkpoint: generation {generation} -> {path} ({os.path.getsize(path) / 1e3:.0f} kB)")
+        return path
+
+    def _rotate(self):
+        # newest first: keep at most `keep` files and at most max_bytes in total,
+        # but never delete the newest checkpoint
+        found = list_checkpoints(self.directory)[::-1]
+        total = 0
+        for i, (_, path) in enumerate(found):
+            total += os.path.getsize(path)
+            if i > 0 and (i >= self.keep or total > self.max_bytes):
+                os.remove(path)
+
+    def _raise_failed(self):
+        # surface write errors on the training thread instead of losing them
+        done = [f for f in self._pending if f.done()]
+        self._pending = [f for f in self._pending if not f.done()]
+        for f in done:
+            f.result()
+
+    def flush(self):
+        # wait for every queued write
+        for f in self._pending:
+            f.result()
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self._writer.shutdown()
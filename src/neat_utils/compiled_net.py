@@ -0,0 +1,139 @@
+# feed-forward NEAT network compiled to numpy matrices
+#   net = CompiledNetwork.create(genome, config)
+#   net.activate(obs)            -> list of outputs, same as FeedForwardNetwork.activate
+#   net.activate_batch(obs)      -> (N, num_outputs) for an (N, num_inputs) batch
+# nodes are grouped into the same layers neat evaluates them in. every layer is one
+# matrix product over the node values computed so far, restricted to the columns
+# that actually feed it (connections may skip layers), then bias and activation
+import numpy as np
+from neat.graphs import feed_forward_layers
+
+
+def _tanh(z):
+    return np.tanh(np.clip(2.5 * z, -60.0, 60.0))
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(5.0 * z, -60.0, 60.0)))
+
+
+def _relu(z):
+    return np.maximum(z, 0.0)
+
+
+# numpy versions of neat's activation functions (same scaling and clamping)
+ACTIVATIONS = {
+    "tanh": _tanh,
+    "sigmoid": _sigmoid,
+    "relu": _relu,
+}
+
+
+class Layer:
+
+    def __init__(self, src, weights, bias, activations, start):
+        self.src = src                  # value columns feeding this layer
+        self.weights = weights          # (len(src), size), node response folded in
+        self.bias = bias                # (size,)
+        self.activations = activations  # [(function, column indices within the layer)]
+        self.start = start              # first value column written by this layer
+
+
+class CompiledNetwork:
+
+    def __init__(self, num_inputs, num_values, layers, outputs):
+        self.num_inputs = num_inputs
+        self.num_values = num_values
+        self.layers = layers
+        self.outputs = outputs          # value column of each output node
+
+    @staticmethod
+    def create(genome, config):
+        # mirrors FeedForwardNetwork.create: only enabled connections, only nodes
+        # that are needed for the outputs
+        gc = config.genome_config
+        connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+        layers, required = feed_forward_layers(gc.input_keys, gc.output_keys, connections)
+        feeds = required | set(gc.input_keys)
+
+        column = {key: i for i, key in enumerate(gc.input_keys)}
+        compiled = []
+        for layer in layers:
+            nodes = list(layer)
+            start = len(column)
+            for node in nodes:
+                column[node] = len(column)
+
+            links = [(i, o) for i, o in connections if o in layer and i in feeds]
+            src = np.array(sorted({column[i] for i, _ in links}), dtype=int)
+            row = {c: r for r, c in enumerate(src)}
+
+            weights = np.zeros((len(src), len(nodes)))
+            for i, o in links:
+                weights[row[column[i]], column[o] - start] += genome.connections[(i, o)].weight
+
+            bias = np.zeros(len(nodes))
+            groups = {}
+            for j, node in enumerate(nodes):
+                ng = genome.nodes[node]
+                if ng.aggregation != "sum":
+                    raise ValueError(f"node {node}: only sum aggregation can be compiled, got {ng.aggregation!r}")
+                if ng.activation not in ACTIVATIONS:
+                    raise ValueError(f"node {node}: no compiled version of activation {ng.activation!r}")
+                weights[:, j] *= ng.response
+                bias[j] = ng.bias
+                groups.setdefault(ng.activation, []).append(j)
+
+            activations = [(ACTIVATIONS[name], np.array(cols)) for name, cols in groups.items()]
+            compiled.append(Layer(src, weights, bias, activations, start))
+
+        # an output missing from every layer stays 0.0, like FeedForwardNetwork's
+        # initial values (neat 2.0 itself puts unconnected outputs in a bias layer)
+        num_values = len(column)
+        outputs = []
+        for key in gc.output_keys:
+            if key not in column:
+                column[key] = num_values
+                num_values += 1
+            outputs.append(column[key])
+
+        return CompiledNetwork(len(gc.input_keys), num_values, compiled, np.array(outputs))
+
+    def activate_batch(self, obs):
+        obs = np.asarray(obs, dtype=np.float64)
+        if obs.ndim != 2 or obs.shape[1] != self.num_inputs:
+            raise RuntimeError(f"Expected (N, {self.num_inputs}) inputs, got {obs.shape}")
+
+        values = np.zeros((len(obs), self.num_values))
+        values[:, :self.num_inputs] = obs
+
+        for layer in self.layers:
+            z = values[:, layer.src] @ layer.weights + layer.bias
+            if len(layer.activations) == 1:
+                out = layer.activations[0][0](z)
+            else:
+                out = np.empty_like(z)
+                for act, cols in layer.activations:
+                    out[:, cols] = act(z[:, cols])
+            values[:, layer.start:layer.start + out.shape[1]] = out
+
+        return values[:, self.outputs]
+
+    def activate(self, inputs):
+        # single observation: same steps on 1-d vectors, which skips most of the
+        # 2-d indexing overhead per call
+        if len(inputs) != self.num_inputs:
+            raise RuntimeError(f"Expected {self.num_inputs:n} inputs, got {len(inputs):n}")
+
+        values = np.zeros(self.num_values)
+        values[:self.num_inputs] = inputs
+
+        for layer in self.layers:
+            z = values[layer.src] @ layer.weights + layer.bias
+            if len(layer.activations) == 1:
+                values[layer.start:layer.start + len(z)] = layer.activations[0][0](z)
+            else:
+                for act, cols in layer.activations:
+                    values[layer.start + cols] = act(z[cols])
+
+        return values[self.outputs].tolist()
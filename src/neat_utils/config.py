@@ -0,0 +1,16 @@
+# the project's neat config, built the same way everywhere (scripts, workers, registry)
+import os
+
+import neat
+
+CONFIG_PATH = os.path.join("config", "neat_config.txt")
+
+
+def load_config(config_path=CONFIG_PATH):
+    return neat.Config(
+        neat.DefaultGenome,
+        neat.DefaultReproduction,
+        neat.DefaultSpeciesSet,
+        neat.DefaultStagnation,
+        config_path,
+    )
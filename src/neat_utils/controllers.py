@@ -3,14 +3,59 @@ from typing import Callable, Sequence, Tuple
 import numpy as np
 import neat
 
+from .compiled_net import CompiledNetwork
+from .population_net import PopulationNetwork
+
 def _preprocess_obs(obs: Sequence[float]) -> np.ndarray:
-   
+
     # right now our obs are already scaled reasonably:
     # dx, dy in [-(world), +(world)] but direction gets normalized,
     # distance >= 0, bias = 1
-    
+
     return np.asarray(obs, dtype=np.float32)
 
+
+class NetworkController:
+    # function(obs)->(vx, vy) for one observation, or (N,6)->(N,2) for a batch
+    # batched = True lets run_episodes_batched hand it every episode's observation at once
+    batched = True
+
+    def __init__(self, genome: neat.DefaultGenome, config: neat.Config, speed: float = 2.0):
+        self.speed = speed
+
+        # each call path builds its own network on first use: batches run the compiled
+        # numpy matrices, while for a handful of nodes neat's plain python loop beats numpy
+        # call overhead on a single observation
+        self._genome = genome
+        self._config = config
+        self._net = None
+        self._ff = None
+
+    @property
+    def net(self) -> CompiledNetwork:
+        if self._net is None:
+            self._net = CompiledNetwork.create(self._genome, self._config)
+        return self._net
+
+    def act_batch(self, obs: np.ndarray) -> np.ndarray:
+        out = self.net.activate_batch(_preprocess_obs(obs))
+        # most activations are tanh/sigmoid; ensure safe bounds anyway
+        return np.clip(out[:, :2], -1.0, 1.0) * self.speed
+
+    def __call__(self, obs):
+        v = _preprocess_obs(obs)
+        if v.ndim == 2:
+            return self.act_batch(v)
+
+        if self._ff is None:
+            self._ff = neat.nn.FeedForwardNetwork.create(self._genome, self._config)
+        out = self._ff.activate(v)          # length = 2
+
+        vx = float(np.clip(out[0], -1.0, 1.0)) * self.speed
+        vy = float(np.clip(out[1], -1.0, 1.0)) * self.speed
+        return vx, vy
+
+
 def make_controller(
     genome: neat.DefaultGenome,
     config: neat.Config,
@@ -18,17 +63,77 @@ def make_controller(
 ) -> Callable[[Sequence[float]], Tuple[float, float]]:
     # turn a NEAT genome into a function(obs)->(vx, vy)
     # assumes config.num_outputs == 2 and num_inputs matches env observations
-    
-    net = neat.nn.FeedForwardNetwork.create(genome, config)
+    # batches of observations run on a network compiled to numpy matrices (compiled_net.py),
+    # one call instead of one FeedForwardNetwork.activate per row
+    return NetworkController(genome, config, speed)
 
-    def controller(obs: Sequence[float]) -> Tuple[float, float]:
-        v = _preprocess_obs(obs)
-        out = net.activate(v)          # length = 2
 
-        
-        # most activations are tanh/sigmoid; ensure safe bounds anyway
-        vx = float(np.clip(out[0], -1.0, 1.0)) * speed
-        vy = float(np.clip(out[1], -1.0, 1.0)) * speed
-        return vx, vy
+class PopulationController:
+    # batched controller for a whole population: rows are laid out genome-major,
+    # episodes_per_genome consecutive rows per genome (the training scripts' layout),
+    # and every step is one PopulationNetwork forward pass
+    batched = True
+
+    def __init__(self, net: PopulationNetwork, episodes_per_genome: int, speed: float = 2.0):
+        self.net = net
+        self.episodes_per_genome = episodes_per_genome
+        self.speed = speed
+
+    def __call__(self, obs: np.ndarray) -> np.ndarray:
+        v = _preprocess_obs(obs).reshape(self.net.num_genomes, self.episodes_per_genome, -1)
+        out = self.net.activate(v)[:, :, :2].reshape(-1, 2)
+        return np.clip(out, -1.0, 1.0) * self.speed
+
+
+def make_population_controller(
+    genomes: Sequence[neat.DefaultGenome],
+    config: neat.Config,
+    episodes_per_genome: int,
+    speed: float = 2.0,
+    cache=None,
+) -> PopulationController:
+    # one controller for len(genomes) * episodes_per_genome episodes
+    # cache: optional GenomeCache holding already compiled networks
+    net = PopulationNetwork.create(genomes, config, cache)
+    return PopulationController(net, episodes_per_genome, speed)
+
 
-    return controller
\ No newline at end of file
+class IndexedPopulationController:
+    # batched controller for a population whose episodes come in any order and in any
+    # number per genome: row i is played by genome genome_of_row[i]. rows are scattered
+    # into a (G, max episodes per genome) block, zero-padded, for the forward pass
+    batched = True
+
+    def __init__(self, net: PopulationNetwork, genome_of_row: Sequence[int], speed: float = 2.0):
+        genome_of_row = np.asarray(genome_of_row, dtype=np.intp)
+        counts = np.bincount(genome_of_row, minlength=net.num_genomes)
+
+        # position of each row among its genome's rows
+        order = np.argsort(genome_of_row, kind="stable")
+        slot = np.empty(len(genome_of_row), dtype=np.intp)
+        slot[order] = np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        self.net = net
+        self.genome_of_row = genome_of_row
+        self.slot = slot
+        self.width = int(counts.max(initial=1))
+        self.speed = speed
+
+    def __call__(self, obs: np.ndarray) -> np.ndarray:
+        obs = _preprocess_obs(obs)
+        v = np.zeros((self.net.num_genomes, self.width, obs.shape[1]), dtype=obs.dtype)
+        v[self.genome_of_row, self.slot] = obs
+        out = self.net.activate(v)[self.genome_of_row, self.slot, :2]
+        return np.clip(out, -1.0, 1.0) * self.speed
+
+
+def make_indexed_population_controller(
+    genomes: Sequence[neat.DefaultGenome],
+    config: neat.Config,
+    genome_of_row: Sequence[int],
+    speed: float = 2.0,
+    cache=None,
+) -> IndexedPopulationController:
+    # one controller for len(genome_of_row) episodes, row i played by genomes[genome_of_row[i]]
+    net = PopulationNetwork.create(genomes, config, cache)
+    return IndexedPopulationController(net, genome_of_row, speed)
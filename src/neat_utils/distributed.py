@@ -0,0 +1,433 @@
+# genome evaluation across machines: one coordinator (the training process) hands out
+# chunks of genomes to any number of workers connected over TCP
+#
+#   coordinator (training machine):
+#       pool = Coordinator(("0.0.0.0", 6000), authkey, setup_kwargs={"bank_path": ...})
+#       pop.run(RacingEvaluator(pool.play, ...), n=30)      # same play() as ParallelEvaluator
+#       SteadyStateEvolution(pop, pool, ...).run(30)        # and the same submit()
+#   worker (every other machine, same repo checkout and results/ files):
+#       run_worker(("trainer-host", 6000), authkey, play_episodes, setup=worker_setup)
+#
+# messages go over multiprocessing.connection: length-framed, with an HMAC handshake
+# on authkey. they are pickled, so only ever share the key with machines you trust.
+# a worker loads the config and runs setup(config, **setup_kwargs) once when it joins
+# (opponent controllers, scenario bank, network cache), then only receives genome_codec
+# arrays and sends back score arrays.
+#
+# a worker that disconnects (or, with task_timeout, stops answering) has its chunk put
+# back on the queue for the others. chunks are cut when a worker asks for one, sized for
+# the workers connected at that moment, so workers that join mid-call get their share.
+# with no worker connected for worker_timeout seconds play() hands what is left to
+# fallback (an in-process play function) or raises TimeoutError. stats / nodes report
+# throughput per worker
+#
+# a worker that joins while the phase profiler (src/core/profiling.py) is on profiles its
+# episodes and sends its totals back with every chunk; they are merged into the
+# coordinator's profiler, as with a ParallelEvaluator
+import itertools
+import os
+import queue
+import socket
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+
+import numpy as np
+
+from src.core.profiling import profiler
+
+from .config import CONFIG_PATH, load_config
+from .genome_codec import decode_genome, encode_genome
+from .parallel import chunk_sizes, cost_order
+
+AUTHKEY_ENV = "EVAL_AUTHKEY"
+HANDSHAKE_TIMEOUT = 10.0    # seconds a connecting worker gets to introduce itself
+
+
+def parse_address(text, default_host="127.0.0.1"):
+    # "host:port" or ":port" -> (host, port)
+    host, _, port = text.rpartition(":")
+    return host or default_host, int(port)
+
+
+def authkey_from_env():
+    key = os.environ.get(AUTHKEY_ENV, "")
+    if not key:
+        raise RuntimeError(f"set {AUTHKEY_ENV} to the same secret on the coordinator and its workers")
+    return key.encode()
+
+
+class _Job:
+    # one play() call: genomes in expected-cost order, handed out chunk by chunk
+    def __init__(self, genomes, config, order, scenarios, n_episodes):
+        self.genomes = genomes
+        self.config = config
+        self.order = order
+        self.scenarios = scenarios
+        self.n_episodes = n_episodes
+
+        self.next = 0
+        # task id -> genome indices out with a worker
+        self.pending = {}
+        self.scores = np.zeros((len(genomes), n_episodes))
+        self.left = len(genomes)
+        self.done = threading.Event()
+        if not genomes:
+            self.done.set()
+
+        # per node: busy seconds / episodes; seconds per episode by genome key
+        self.busy = {}
+        self.episodes = {}
+        self.cost = {}
+        self.lock = threading.Lock()
+
+    @property
+    def handed_out(self):
+        return self.next >= len(self.order)
+
+    def take(self, task_id, num_workers, min_chunk, factor):
+        # next chunk, sized for the workers connected now (guided self-scheduling)
+        # -> task for the queue, None once every genome is out
+        with self.lock:
+            left = len(self.order) - self.next
+            if left == 0:
+                return None
+            size = chunk_sizes(left, max(num_workers, 1), min_chunk, factor)[0]
+            idx = self.order[self.next:self.next + size]
+            self.next += size
+            self.pending[task_id] = idx
+        return self, task_id, (idx, [encode_genome(self.genomes[i][1], self.config) for i in idx],
+                               self.scenarios, self.n_episodes)
+
+    def reclaim(self, task_id):
+        # every genome without scores yet, as one chunk under task_id; results of the
+        # chunks it replaces are ignored if they still come in
+        with self.lock:
+            idx = np.concatenate([*self.pending.values(), self.order[self.next:]]).astype(int)
+            self.next = len(self.order)
+            self.pending = {task_id: idx}
+        return idx
+
+    def finish(self, task_id, scores, name, seconds):
+        # -> genome indices the result filled in, None for a replaced or repeated chunk
+        with self.lock:
+            idx = self.pending.pop(task_id, None)
+            if idx is None:
+                return None
+            self.scores[idx] = scores
+            self.left -= len(idx)
+            n = len(idx) * self.n_episodes
+            self.busy[name] = self.busy.get(name, 0.0) + seconds
+            self.episodes[name] = self.episodes.get(name, 0) + n
+            for i in idx:
+                self.cost[self.genomes[i][0]] = seconds / max(n, 1)
+            if self.left == 0:
+                self.done.set()
+        return idx
+
+
+class Coordinator:
+
+    def __init__(self, address=("0.0.0.0", 6000), authkey=None, n_episodes=5, schedule=None,
+                 setup_kwargs=None, task_timeout=None, worker_timeout=60.0, fallback=None,
+                 handshake_timeout=HANDSHAKE_TIMEOUT, min_chunk=1, chunk_factor=2, verbose=False):
+        self.n_episodes = n_episodes
+        self.schedule = schedule
+        self.setup_kwargs = setup_kwargs or {}
+        self.task_timeout = task_timeout
+        # play(genomes, config, scenarios, n_episodes) for when no worker is left
+        self.worker_timeout = worker_timeout
+        self.fallback = fallback
+        self.handshake_timeout = handshake_timeout
+        self.min_chunk = min_chunk
+        self.chunk_factor = chunk_factor
+        self.verbose = verbose
+
+        # the HMAC challenge runs in _handshake, off the accept thread
+        self._authkey = authkey
+        self._listener = Listener(address)
+        self.address = self._listener.address
+
+        # _Jobs with chunks to hand out, and (job, task id, payload) chunks to re-send
+        self._tasks = queue.Queue()
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # per worker: connected flag and cumulative tasks / genomes / episodes / busy seconds
+        self.nodes = {}
+        self.cost = {}
+        self.stats = {}
+
+        self._accept_thread = threading.Thread(target=self._accept, daemon=True)
+        self._accept_thread.start()
+
+    @property
+    def num_workers(self):
+        with self._lock:
+            return sum(node["connected"] for node in self.nodes.values())
+
+    def wait_for_workers(self, n=1, timeout=None):
+        start = time.monotonic()
+        while self.num_workers < n:
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise TimeoutError(f"{self.num_workers} of {n} workers connected after {timeout}s")
+            time.sleep(0.05)
+
+    def _accept(self):
+        # only accepts: every connection is authenticated on its own thread, so a peer
+        # that connects and goes quiet holds up nobody else
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._closed:
+                    return
+                continue
+            threading.Thread(target=self._handshake, args=(conn,), daemon=True).start()
+
+    def _handshake(self, conn):
+        try:
+            if self._authkey is not None:
+                deliver_challenge(conn, self._authkey)
+                answer_challenge(conn, self._authkey)
+            if not conn.poll(self.handshake_timeout):
+                raise TimeoutError(f"no hello in {self.handshake_timeout}s")
+            _, name = conn.recv()
+            conn.send(("setup", self.setup_kwargs, profiler.enabled))
+        except (OSError, EOFError, AuthenticationError, TimeoutError):
+            # a peer without the key, or one that hung up or stalled during the handshake
+            conn.close()
+            return
+
+        with self._lock:
+            # a reconnecting worker keeps its counters
+            node = self._node(name)
+            node["connected"] = True
+        if self.verbose:
+            print(f"distributed: worker {name} joined ({self.num_workers} connected)")
+        self._serve(conn, name)
+
+    def _node(self, name):
+        return self.nodes.setdefault(name, {"connected": False, "tasks": 0, "genomes": 0,
+                                            "episodes": 0, "busy": 0.0})
+
+    def _next_task(self):
+        # -> (job, task id, payload), or None to stop
+        while True:
+            item = self._tasks.get()
+            if not isinstance(item, _Job):
+                return item
+            task = item.take(next(self._task_ids), self.num_workers, self.min_chunk, self.chunk_factor)
+            if not item.handed_out:
+                self._tasks.put(item)
+            if task is not None:
+                return task
+
+    def _serve(self, conn, name):
+        # one thread per worker: send a chunk, wait for its scores, repeat
+        while True:
+            task = self._next_task()
+            if task is None:
+                try:
+                    conn.send(("stop",))
+                except OSError:
+                    pass
+                break
+
+            job, task_id, payload = task
+            try:
+                conn.send(("task", task_id, payload))
+                if self.task_timeout is not None and not conn.poll(self.task_timeout):
+                    raise TimeoutError(f"no answer in {self.task_timeout}s")
+                _, done_id, (_, scores), seconds, phases = conn.recv()
+            except (OSError, EOFError, TimeoutError) as e:
+                # somebody else plays this chunk
+                self._tasks.put(task)
+                if self.verbose:
+                    print(f"distributed: lost worker {name} ({type(e).__name__}), chunk re-queued")
+                break
+
+            self._finish(job, done_id, scores, name, seconds, phases)
+
+        with self._lock:
+            self.nodes[name]["connected"] = False
+        conn.close()
+
+    def _finish(self, job, task_id, scores, name, seconds, phases=None):
+        idx = job.finish(task_id, scores, name, seconds)
+        if idx is None:
+            return
+        # a repeated chunk's episodes were already counted with its first result
+        profiler.merge(phases)
+        with self._lock:
+            node = self._node(name)
+            node["tasks"] += 1
+            node["genomes"] += len(idx)
+            node["episodes"] += len(idx) * job.n_episodes
+            node["busy"] += seconds
+
+    def _play_locally(self, job):
+        # no workers: the fallback plays every genome of job still without scores
+        task_id = next(self._task_ids)
+        idx = job.reclaim(task_id)
+        if self.verbose:
+            print(f"distributed: no workers for {self.worker_timeout}s, "
+                  f"playing {len(idx)} genomes locally")
+        start = time.perf_counter()
+        scores = self.fallback([job.genomes[i] for i in idx], job.config, job.scenarios, job.n_episodes)
+        self._finish(job, task_id, np.asarray(scores, dtype=float), "local", time.perf_counter() - start)
+
+    def _wait(self, job):
+        # until job is scored; with no worker connected for worker_timeout seconds the
+        # fallback plays the rest, or TimeoutError without one
+        alone_since = None
+        while not job.done.wait(0.1):
+            if self.num_workers:
+                alone_since = None
+                continue
+            now = time.monotonic()
+            alone_since = now if alone_since is None else alone_since
+            if self.worker_timeout is None or now - alone_since < self.worker_timeout:
+                continue
+            if self.fallback is None:
+                raise TimeoutError(f"no evaluation workers connected for {self.worker_timeout}s")
+            self._play_locally(job)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in range(self.num_workers):
+            self._tasks.put(None)
+        self._listener.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def play(self, genomes, config, scenarios=None, n_episodes=None):
+        # distributed drop-in for the script's play function (RacingEvaluator protocol)
+        genomes = list(genomes)
+        if n_episodes is None:
+            n_episodes = self.n_episodes
+        if scenarios is not None:
+            n_episodes = len(scenarios)
+
+        if self.num_workers == 0 and self.verbose:
+            print("distributed: waiting for workers to connect")
+
+        # most expensive genomes first, by the cost measured on the last call
+        job = _Job(genomes, config, cost_order(genomes, self.cost), scenarios, n_episodes)
+        start = time.perf_counter()
+        self._tasks.put(job)
+        self._wait(job)
+        wall = time.perf_counter() - start
+
+        busy, episodes = job.busy, job.episodes
+        self.cost = job.cost
+        self.stats = {
+            "wall": wall,
+            "busy": busy,
+            "episodes": episodes,
+            # episodes per second of each node's own busy time
+            "throughput": {name: episodes[name] / b for name, b in busy.items() if b > 0},
+            "utilization": {name: b / wall for name, b in busy.items()} if wall > 0 else {},
+        }
+        if self.verbose:
+            per_node = " ".join(f"{name} {self.stats['throughput'].get(name, 0):.0f} ep/s "
+                                f"({self.stats['utilization'].get(name, 0):.0%})" for name in busy)
+            print(f"distributed: {len(genomes)} genomes x {n_episodes} episodes in {wall:.2f}s "
+                  f"on {len(busy)} nodes | {per_node}")
+        return job.scores
+
+    def submit(self, genomes, config, scenarios=None, n_episodes=None, callback=None,
+               error_callback=None):
+        # asynchronous play of one chunk, as ParallelEvaluator.submit (steady-state
+        # evolution): callback(scores, worker name, seconds) or error_callback(exception)
+        # runs on a coordinator thread
+        genomes = list(genomes)
+        if n_episodes is None:
+            n_episodes = self.n_episodes
+        if scenarios is not None:
+            n_episodes = len(scenarios)
+
+        job = _Job(genomes, config, np.arange(len(genomes)), scenarios, n_episodes)
+        task = job.take(next(self._task_ids), 1, max(len(genomes), 1), 1)
+        if task is not None:
+            self._tasks.put(task)
+
+        def wait():
+            try:
+                self._wait(job)
+            except TimeoutError as e:
+                if error_callback is not None:
+                    error_callback(e)
+                return
+            if callback is not None:
+                name = max(job.busy, key=job.busy.get) if job.busy else None
+                callback(job.scores, name, sum(job.busy.values()))
+
+        threading.Thread(target=wait, daemon=True).start()
+        return job
+
+    def __call__(self, genomes, config):
+        # full evaluation: mean score over n_episodes (on the schedule's scenarios if any)
+        genomes = list(genomes)
+        scenarios = None if self.schedule is None else self.schedule.next()
+        scores = self.play(genomes, config, scenarios)
+
+        for (gid, genome), row in zip(genomes, scores):
+            genome.fitness = float(row.mean())
+
+
+def _connect(address, authkey, retry_interval, max_retries):
+    for attempt in itertools.count():
+        try:
+            return Client(address, authkey=authkey)
+        except (ConnectionRefusedError, socket.timeout, OSError):
+            if max_retries is not None and attempt >= max_retries:
+                raise
+            time.sleep(retry_interval)
+
+
+def run_worker(address, authkey, play, config_path=CONFIG_PATH, setup=None, name=None,
+               retry_interval=1.0, max_retries=None, verbose=False):
+    # serve a coordinator until it sends stop or goes away
+    # play / setup: the same functions a ParallelEvaluator is given
+    config = load_config(config_path)
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+
+    conn = _connect(address, authkey, retry_interval, max_retries)
+    conn.send(("hello", name))
+    _, setup_kwargs, profile = conn.recv()
+    if profile:
+        profiler.enable()
+    context = {} if setup is None else setup(config, **setup_kwargs)
+    if verbose:
+        print(f"worker {name}: connected to {address[0]}:{address[1]}")
+
+    played = 0
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message[0] == "stop":
+            break
+
+        _, task_id, (idx, encoded, scenarios, n_episodes) = message
+        start = time.perf_counter()
+        genomes = [(data["key"], decode_genome(data, config)) for data in encoded]
+        scores = play(genomes, config, scenarios, n_episodes, **context)
+        conn.send(("result", task_id, (idx, np.asarray(scores, dtype=float)),
+                   time.perf_counter() - start, profiler.take() if profiler.enabled else None))
+        played += len(idx) * n_episodes
+
+    conn.close()
+    if verbose:
+        print(f"worker {name}: done, {played} episodes played")
+    return played
@@ -88,4 +88,35 @@ class GreedyPreyDummy:
         if norm > 0:
             v = v / norm
 
-        return v * 1.8
\ No newline at end of file
+        return v * 1.8
+
+class BatchedGreedyPreyDummy:
+    # GreedyPreyDummy for a VecEnvironment - one call produces every episode's action
+    batched = True
+
+    def __init__(self, vec_env):
+        self.env = vec_env
+
+    def __call__(self, obs):
+        flee = -obs[:, 0:2]
+        avoid_ob = -obs[:, 4:6]
+        hide_vec = self.env.obstacle_hide_direction()
+
+        px = self.env.prey_pos[:, 0]
+        py = self.env.prey_pos[:, 1]
+        wall = np.column_stack([
+            np.where(px < 10, 0.2, np.where(px > self.env.width - 10, -0.2, 0.0)),
+            np.where(py < 10, 0.2, np.where(py > self.env.height - 10, -0.2, 0.0)),
+        ])
+
+        v = (
+            1.0 * flee +
+            0.5 * avoid_ob +
+            0.7 * hide_vec +
+            0.3 * wall
+        )
+
+        norm = np.linalg.norm(v, axis=1, keepdims=True)
+        v = np.where(norm > 0, v / np.where(norm > 0, norm, 1.0), v)
+
+        return v * 1.8
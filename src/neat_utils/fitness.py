@@ -1,8 +1,12 @@
 # define separate, simple reward signals for predator vs prey so that
 # evolution has a clear optimization target. these are intentionally lightweight
 # because NEAT will repeatedly call them thousands of times
+import math
+
 import numpy as np
 
+from src.core.trace import trace_column
+
 ''''' too complex - as we are retraining pred
 def predator_fitness(ep):
     trace = ep.trace
@@ -100,13 +104,14 @@ def predator_fitness(ep):
 
 
     # 2. sum of distance reductions each step
-    start_d = trace[0]["distance"]
-    end_d = trace[-1]["distance"]
+    distances = trace_column(trace, "distance")
+    start_d = distances[0]
+    end_d = distances[-1]
     dist_reward = 0
 
-    for i in range(1, len(trace)):
-        prev = trace[i-1]["distance"]
-        curr = trace[i]["distance"]
+    for i in range(1, len(distances)):
+        prev = distances[i-1]
+        curr = distances[i]
         dist_reward += (prev - curr)  # positive if closing in
 
     
@@ -115,7 +120,7 @@ def predator_fitness(ep):
 
 
     # 3. movement bonus  - helps prevent freezing
-    predator_positions = np.array([t["pred_pos"] for t in trace])
+    predator_positions = trace_column(trace, "pred_pos")
     deltas = np.linalg.norm(np.diff(predator_positions, axis=0), axis=1)
     movement = np.sum(deltas) * 0.2  
 
@@ -125,7 +130,7 @@ def predator_fitness(ep):
     prev_pred_pos = predator_positions[-2]
     move_vec = pred_pos - prev_pred_pos
 
-    prey_pos = np.array(trace[-1]["prey_pos"])
+    prey_pos = trace_column(trace, "prey_pos")[-1]
     vec_to_prey = prey_pos - pred_pos
 
 
@@ -182,11 +187,11 @@ def prey_fitness_against_predator(ep):
     fitness = ep.steps * 2.0
 
     # 2. average distance
-    avg_dist = np.mean([step["distance"] for step in trace])
+    avg_dist = np.mean(trace_column(trace, "distance"))
     fitness += avg_dist
 
     # 3. movement reward (no freezing)
-    prey_positions = np.array([step["prey_pos"] for step in trace])
+    prey_positions = trace_column(trace, "prey_pos")
     deltas = np.diff(prey_positions, axis=0)
     total_motion = np.sum(np.linalg.norm(deltas, axis=1))
     fitness += 0.5 * total_motion
@@ -195,4 +200,190 @@ def prey_fitness_against_predator(ep):
     if ep.captured:
         fitness -= 800
 
-    return fitness
\ No newline at end of file
+    return fitness
+
+
+# streaming versions of the two trace-based fitness functions above
+# run_episode(..., accumulators=[acc]) calls acc.update() once per step with the
+# same values that go into a trace row, so the score can be computed without
+# keeping the trace around (record_trace=False) - O(1) memory per episode
+# results match the trace versions up to float summation order
+
+class PredatorFitnessAccumulator:
+
+    def __init__(self):
+        self.count = 0
+        self.start_d = 0.0
+        self.end_d = 0.0
+        self.dist_reward = 0.0
+        self.movement = 0.0
+
+        # last two predator positions (heading) and the last prey position
+        self.pred = (0.0, 0.0)
+        self.prev_pred = (0.0, 0.0)
+        self.prey = (0.0, 0.0)
+
+    def update(self, px, py, qx, qy, dist):
+        if self.count == 0:
+            self.start_d = dist
+        else:
+            self.dist_reward += self.end_d - dist
+            dx = px - self.pred[0]
+            dy = py - self.pred[1]
+            self.movement += math.sqrt(dx * dx + dy * dy)
+
+        self.count += 1
+        self.end_d = dist
+        self.prev_pred = self.pred
+        self.pred = (px, py)
+        self.prey = (qx, qy)
+
+    def fitness(self, ep):
+        # same terms as predator_fitness(ep)
+        if self.count < 3:
+            return 0.0
+
+        if ep.captured:
+            return 5000 + (500 - ep.steps) * 20
+
+        x, y = self.pred
+        mx, my = x - self.prev_pred[0], y - self.prev_pred[1]
+        tx, ty = self.prey[0] - x, self.prey[1] - y
+        move_len = math.sqrt(mx * mx + my * my)
+        prey_len = math.sqrt(tx * tx + ty * ty)
+
+        if prey_len > 1e-6 and move_len > 1e-6:
+            heading_reward = 3.0 * (mx * tx + my * ty) / (move_len * prey_len)
+        else:
+            heading_reward = 0
+
+        runaway_penalty = max(0, self.end_d - self.start_d) * 2.0
+
+        margin = 10
+        world_size = 100
+        wall_pen = 0
+        if x < margin: wall_pen += (margin - x)
+        if x > (world_size - margin): wall_pen += (x - (world_size - margin))
+        if y < margin: wall_pen += (margin - y)
+        if y > (world_size - margin): wall_pen += (y - (world_size - margin))
+        wall_pen *= 0.5
+
+        return self.dist_reward * 15 + self.movement * 0.2 + heading_reward - runaway_penalty - wall_pen
+
+
+class PreyFitnessAccumulator:
+
+    def __init__(self):
+        self.count = 0
+        self.mean_d = 0.0
+        self.motion = 0.0
+        self.prey = (0.0, 0.0)
+
+    def update(self, px, py, qx, qy, dist):
+        if self.count:
+            dx = qx - self.prey[0]
+            dy = qy - self.prey[1]
+            self.motion += math.sqrt(dx * dx + dy * dy)
+
+        # running mean, so no distance history is kept
+        self.count += 1
+        self.mean_d += (dist - self.mean_d) / self.count
+        self.prey = (qx, qy)
+
+    def fitness(self, ep):
+        # same terms as prey_fitness_against_predator(ep)
+        fitness = ep.steps * 2.0 + self.mean_d + 0.5 * self.motion
+        if ep.captured:
+            fitness -= 800
+        return fitness
+
+
+
+# batched versions for scoring a whole generation at once
+# trace is an (E, T) structured trace buffer (see src/core/trace.py stack_traces),
+# steps the (E,) episode lengths - anything past steps[e] is padding and ignored
+# same branches and terms as the per-episode functions, one value per episode
+
+def _trim(trace, steps):
+    # drop padding columns that no episode reaches
+    return trace[:, :max(int(steps.max(initial=0)), 1)]
+
+
+def _step_lengths(pos, pair_ok):
+    # (E, T-1) distance moved per step, zero outside the played steps
+    # x and y are differenced separately - much cheaper than np.diff + a norm over the
+    # last axis on the strided structured-array field
+    dx = pos[:, 1:, 0] - pos[:, :-1, 0]
+    dy = pos[:, 1:, 1] - pos[:, :-1, 1]
+    return np.where(pair_ok, np.sqrt(dx * dx + dy * dy), 0.0)
+
+
+def predator_fitness_batch(trace, steps, captured):
+    steps = np.asarray(steps, dtype=int)
+    captured = np.asarray(captured, dtype=bool)
+    trace = _trim(trace, steps)
+    E, T = trace.shape
+    if T < 3:
+        return np.zeros(E)
+
+    rows = np.arange(E)
+    last = np.maximum(steps - 1, 0)
+    prev = np.maximum(steps - 2, 0)
+
+    # 2. distance reductions - cumsum adds left to right exactly like the loop
+    d = trace["distance"]
+    pair_ok = np.arange(T - 1)[None, :] < (steps - 1)[:, None]
+    deltas = np.where(pair_ok, d[:, :-1] - d[:, 1:], 0.0)
+    dist_reward = np.cumsum(deltas, axis=1)[rows, prev] * 15
+
+    # 3. movement bonus
+    pos = trace["pred_pos"]
+    movement = np.sum(_step_lengths(pos, pair_ok), axis=1) * 0.2
+
+    # 4. heading alignment
+    pred_pos = pos[rows, last]
+    move_vec = pred_pos - pos[rows, prev]
+    vec_to_prey = trace["prey_pos"][rows, last] - pred_pos
+    move_len = np.sqrt(np.sum(move_vec ** 2, axis=1))
+    prey_len = np.sqrt(np.sum(vec_to_prey ** 2, axis=1))
+    aligned = (move_len > 1e-6) & (prey_len > 1e-6)
+    cos = np.sum(move_vec * vec_to_prey, axis=1) / np.where(aligned, move_len * prey_len, 1.0)
+    heading_reward = np.where(aligned, 3.0 * cos, 0.0)
+
+    # 5. runaway penalty
+    runaway_penalty = np.maximum(0, d[rows, last] - d[:, 0]) * 2.0
+
+    # 6. wall penalty
+    x, y = pred_pos[:, 0], pred_pos[:, 1]
+    margin = 10
+    world_size = 100
+    wall_pen = (np.maximum(margin - x, 0) + np.maximum(x - (world_size - margin), 0)
+                + np.maximum(margin - y, 0) + np.maximum(y - (world_size - margin), 0)) * 0.5
+
+    shaped = dist_reward + movement + heading_reward - runaway_penalty - wall_pen
+    fitness = np.where(captured, 5000 + (500 - steps) * 20, shaped)
+    return np.where(steps < 3, 0.0, fitness)
+
+
+def prey_fitness_batch(steps, captured, final_distance):
+    steps = np.asarray(steps, dtype=int)
+    capture_penalty = np.where(np.asarray(captured, dtype=bool), -500, 0)
+    return steps + 0.5 * np.asarray(final_distance, dtype=float) + capture_penalty
+
+
+def prey_fitness_against_predator_batch(trace, steps, captured):
+    steps = np.asarray(steps, dtype=int)
+    captured = np.asarray(captured, dtype=bool)
+    trace = _trim(trace, steps)
+    E, T = trace.shape
+    valid = np.arange(T)[None, :] < steps[:, None]
+
+    # average distance over the played steps only
+    d = np.where(valid, trace["distance"], 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_dist = np.sum(d, axis=1) / steps
+
+    total_motion = np.sum(_step_lengths(trace["prey_pos"], valid[:, 1:]), axis=1)
+
+    fitness = steps * 2.0 + avg_dist + 0.5 * total_motion
+    return fitness - np.where(captured, 800, 0)
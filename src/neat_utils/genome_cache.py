@@ -0,0 +1,187 @@
+# cache keyed by what a genome computes (its nodes and enabled, weighted links),
+# not by its id - an elite carried into the next generation, or two identical
+# offspring, hit the same entries
+#   cache = GenomeCache(max_bytes=64 << 20)
+#   net = cache.network(genome, config)          # compiled once per distinct genome
+#   play = cache.wrap_play(play)                 # reuse scores on bank scenarios
+#   pop.add_reporter(CacheReporter(cache))       # hit/miss line every generation
+# scores are only reused for bank scenarios: with a fixed start state the episode is
+# deterministic, random layouts are always played. the score cache only pays off when
+# the same scenarios come back - a fixed scenario set (ScenarioSchedule(rotate=False))
+# or repeated opponents - with the default rotating schedule every generation plays
+# new scenarios and it would never hit, so the training scripts only wrap play with
+# --fixed-scenarios.
+# the genome hash wrap_play computes is reused by network() within the same call
+import hashlib
+from collections import OrderedDict
+
+import neat
+import numpy as np
+
+from .compiled_net import CompiledNetwork
+from .genome_codec import encode_genome
+
+# rough per-entry bookkeeping cost (dict slot, key, python objects) on top of array data
+ENTRY_OVERHEAD = 512
+
+
+def genome_hash(genome, config):
+    # digest of the genome's behaviour: node genes + enabled links, in a fixed order.
+    # the genome key, innovation numbers, time constants and disabled links do not matter
+    data = encode_genome(genome, config)
+    nodes = data["nodes"][:, :5]
+    conns = data["conns"]
+    conns = conns[conns[:, 3] > 0][:, :3]
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(nodes[np.lexsort(nodes[:, ::-1].T)].tobytes())
+    h.update(conns[np.lexsort(conns[:, ::-1].T)].tobytes())
+    return h.hexdigest()
+
+
+def _network_bytes(net):
+    arrays = [net.outputs]
+    for layer in net.layers:
+        arrays += [layer.src, layer.weights, layer.bias]
+    return ENTRY_OVERHEAD * (1 + len(net.layers)) + sum(a.nbytes for a in arrays)
+
+
+class LRUCache:
+    # least-recently-used mapping with a byte budget (sizeof(value) estimates each entry)
+
+    def __init__(self, max_bytes, sizeof=lambda value: ENTRY_OVERHEAD):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._data = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key][0]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        if key in self._data:
+            self.nbytes -= self._data.pop(key)[1]
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        self._data[key] = (value, size)
+        self.nbytes += size
+
+        while self.nbytes > self.max_bytes:
+            _, (_, old) = self._data.popitem(last=False)
+            self.nbytes -= old
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+        self.nbytes = 0
+
+    def take_stats(self):
+        # counters since the last call
+        stats = {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                 "entries": len(self._data), "bytes": self.nbytes}
+        self.hits = self.misses = self.evictions = 0
+        return stats
+
+
+class GenomeCache:
+
+    def __init__(self, max_bytes=64 << 20, score_fraction=0.25):
+        # the byte budget is split between compiled networks and episode scores
+        self.networks = LRUCache(int(max_bytes * (1 - score_fraction)), _network_bytes)
+        self.scores = LRUCache(int(max_bytes * score_fraction))
+
+        # id(genome) -> hash for the genomes of the play call in progress
+        self._keys = {}
+
+    def key(self, genome, config):
+        # genome_hash, unless wrap_play already computed it for this call
+        key = self._keys.get(id(genome))
+        return genome_hash(genome, config) if key is None else key
+
+    def network(self, genome, config, key=None):
+        key = self.key(genome, config) if key is None else key
+        net = self.networks.get(key)
+        if net is None:
+            net = CompiledNetwork.create(genome, config)
+            self.networks.put(key, net)
+        return net
+
+    def wrap_play(self, play):
+        # play with the RacingEvaluator signature that only plays the (genome, scenario)
+        # pairs it has not scored yet. a genome missing any of the requested scenarios
+        # is played on all of them (episodes are cheap next to a second play call)
+        def cached_play(genomes, config, scenarios=None, n_episodes=None):
+            genomes = list(genomes)
+            if scenarios is None:
+                return play(genomes, config, scenarios, n_episodes)
+
+            scenarios = [int(s) for s in scenarios]
+            keys = [genome_hash(g, config) for _, g in genomes]
+            scores = np.empty((len(genomes), len(scenarios)))
+
+            todo = []
+            for i, key in enumerate(keys):
+                row = [self.scores.get((key, s)) for s in scenarios]
+                if any(v is None for v in row):
+                    todo.append(i)
+                else:
+                    scores[i] = row
+
+            if todo:
+                # compiling the networks inside play reuses these hashes
+                self._keys = {id(genomes[i][1]): keys[i] for i in todo}
+                try:
+                    played = play([genomes[i] for i in todo], config, np.asarray(scenarios), len(scenarios))
+                finally:
+                    self._keys = {}
+                for i, row in zip(todo, played):
+                    scores[i] = row
+                    for s, value in zip(scenarios, row):
+                        self.scores.put((keys[i], s), float(value))
+
+            return scores
+
+        return cached_play
+
+    def take_stats(self):
+        return {"networks": self.networks.take_stats(), "scores": self.scores.take_stats()}
+
+
+class CacheReporter(neat.reporting.BaseReporter):
+    # prints the cache's hit/miss counters after every generation
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.history = []
+
+    def end_generation(self, config, population, species_set):
+        stats = self.cache.take_stats()
+        self.history.append(stats)
+
+        parts = []
+        for name, s in stats.items():
+            lookups = s["hits"] + s["misses"]
+            if not lookups and not s["entries"]:
+                # e.g. the score cache when play is not wrapped
+                continue
+            rate = s["hits"] / lookups if lookups else 0.0
+            parts.append(f"{name} {s['hits']}/{lookups} hits ({rate:.0%}), {s['entries']} entries, "
+                         f"{s['bytes'] / 1e6:.1f} MB, {s['evictions']} evicted")
+        if parts:
+            print("cache: " + "; ".join(parts))
@@ -0,0 +1,70 @@
+# compact array form of a DefaultGenome - what gets shipped to worker processes
+# (and written to disk) instead of pickled genome objects or controllers
+#   data = encode_genome(genome, config)
+#   genome = decode_genome(data, config)
+# nodes: (M, 6) rows of (key, bias, response, activation, aggregation, time_constant),
+#        activation/aggregation as indices into the config's option lists. feed-forward
+#        nets ignore time_constant, but crossover, mutation and speciation use it.
+#        5-column arrays (written before it was stored) decode with its init mean
+# conns: (C, 5) rows of (in, out, weight, enabled, innovation), innovation -1 = none
+# rows keep the genome's dict order, so a decoded network sums its inputs in the same
+# order and activates bit-for-bit like the original
+import numpy as np
+import neat
+
+NODE_COLUMNS = ("key", "bias", "response", "activation", "aggregation", "time_constant")
+CONN_COLUMNS = ("in", "out", "weight", "enabled", "innovation")
+
+
+def _option_index(options, name, what):
+    try:
+        return options.index(name)
+    except ValueError:
+        raise ValueError(f"{what} {name!r} is not in the config options {options}") from None
+
+
+def encode_genome(genome, config):
+    gc = config.genome_config
+
+    nodes = np.array([
+        (key, ng.bias, ng.response,
+         _option_index(gc.activation_options, ng.activation, "activation"),
+         _option_index(gc.aggregation_options, ng.aggregation, "aggregation"),
+         ng.time_constant)
+        for key, ng in genome.nodes.items()
+    ], dtype=np.float64).reshape(-1, len(NODE_COLUMNS))
+
+    conns = np.array([
+        (i, o, cg.weight, cg.enabled, -1 if cg.innovation is None else cg.innovation)
+        for (i, o), cg in genome.connections.items()
+    ], dtype=np.float64).reshape(-1, len(CONN_COLUMNS))
+
+    return {"key": int(genome.key), "nodes": nodes, "conns": conns}
+
+
+def decode_genome(data, config, genome_type=neat.DefaultGenome):
+    gc = config.genome_config
+    genome = genome_type(int(data["key"]))
+
+    nodes = np.asarray(data["nodes"])
+    if nodes.shape[1] < len(NODE_COLUMNS):
+        default = getattr(gc, "time_constant_init_mean", 1.0)
+        nodes = np.column_stack([nodes, np.full(len(nodes), default)])
+
+    for key, bias, response, act, agg, time_constant in nodes:
+        ng = gc.node_gene_type(int(key))
+        ng.bias = float(bias)
+        ng.response = float(response)
+        ng.activation = gc.activation_options[int(act)]
+        ng.aggregation = gc.aggregation_options[int(agg)]
+        ng.time_constant = float(time_constant)
+        genome.nodes[ng.key] = ng
+
+    for i, o, weight, enabled, innovation in np.asarray(data["conns"]):
+        key = (int(i), int(o))
+        cg = gc.connection_gene_type(key, None if innovation < 0 else int(innovation))
+        cg.weight = float(weight)
+        cg.enabled = bool(enabled)
+        genome.connections[key] = cg
+
+    return genome
@@ -0,0 +1,78 @@
+# hall of fame: champions of earlier coevolution rounds, kept as opponents so a
+# population cannot drift back into strategies an old champion already beats
+#   hof = HallOfFame(max_size=20)
+#   hof.add(champion, config, round=3)   # hashed and compiled once, here
+#   chosen = hof.sample(2, rng)          # Champions, informative ones preferred
+#   ...play against chosen[i].network...
+#   chosen[i].record(captures, games)
+import copy
+
+import numpy as np
+
+from .compiled_net import CompiledNetwork
+from .genome_cache import genome_hash
+
+
+class Champion:
+
+    def __init__(self, genome, config, round=None, index=0):
+        # a copy - the population keeps mutating its own genome objects' fitness
+        self.genome = copy.deepcopy(genome)
+        self.round = round
+        # serial number in the hall
+        self.index = index
+        self.key = genome_hash(genome, config)
+        self.network = CompiledNetwork.create(genome, config)
+
+        # captures in recent games against this champion, decayed as the populations move on
+        self.games = 0.0
+        self.captures = 0.0
+
+    @property
+    def capture_rate(self):
+        # beta(1, 1) prior: an unplayed champion counts as a coin flip
+        return (self.captures + 1.0) / (self.games + 2.0)
+
+    @property
+    def informativeness(self):
+        # outcome variance: a champion everyone beats (or nobody does) teaches nothing
+        p = self.capture_rate
+        return p * (1.0 - p)
+
+    def record(self, captures, games, decay=0.8):
+        self.captures = decay * self.captures + captures
+        self.games = decay * self.games + games
+
+
+class HallOfFame:
+
+    def __init__(self, max_size=20):
+        self.max_size = max_size
+        # oldest first
+        self.members = []
+        self._added = 0
+
+    def __len__(self):
+        return len(self.members)
+
+    def genomes(self):
+        return [c.genome for c in self.members]
+
+    def add(self, genome, config, round=None):
+        self.members.append(Champion(genome, config, round, self._added))
+        self._added += 1
+        if len(self.members) > self.max_size:
+            self.members.pop(0)
+        return self.members[-1]
+
+    def sample(self, k, rng, informative=True):
+        # k distinct champions (all of them if there are fewer), by default drawn in
+        # proportion to how evenly games against them have been split
+        if len(self.members) <= k:
+            return list(self.members)
+        p = None
+        if informative:
+            w = np.array([c.informativeness for c in self.members])
+            p = w / w.sum()
+        idx = rng.choice(len(self.members), size=k, replace=False, p=p)
+        return [self.members[i] for i in sorted(idx)]
@@ -0,0 +1,237 @@
+# process-pool genome evaluation
+# every worker builds the neat config and its play context (fixed opponent, scenario
+# bank, ...) once, in the pool initializer. per call only compact genome arrays
+# (genome_codec) go out to the workers and only score arrays come back
+#
+#   with ParallelEvaluator(play, config_path, setup=worker_setup, num_workers=4) as pool:
+#       pop.run(pool, n=30)                                  # full evaluation
+#       pop.run(RacingEvaluator(pool.play, ...), n=30)       # or racing on top
+#
+# play(genomes, config, scenarios, n_episodes, **setup(config)) -> (G, n_episodes) scores,
+# the RacingEvaluator protocol plus the worker context as keyword arguments.
+# play and setup must be module-level functions so spawn-based pools can import them
+#
+# map(fn, tasks) runs other work shapes on the same workers (e.g. coevolution's
+# predator/prey match chunks): fn(task, config, **setup(config)) per task.
+# submit(genomes, ...) plays one chunk asynchronously (steady-state evolution)
+#
+# when the phase profiler (src/core/profiling.py) is on as the pool starts, workers run
+# theirs too and every chunk brings its phase totals back into the parent's
+#
+# load balancing: episodes stop at capture, so genomes cost very different amounts.
+# genomes are sorted by expected cost (measured on earlier calls, the running mean for
+# unseen genomes) and cut into chunks that shrink towards the end (guided
+# self-scheduling). idle workers pull the next chunk off the shared queue, so the cheap
+# small chunks at the tail fill in behind the expensive ones
+import math
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from src.core.profiling import profiler
+
+from .config import load_config
+from .genome_codec import decode_genome, encode_genome
+
+
+def chunk_sizes(n, num_workers, min_chunk=1, factor=2):
+    # guided self-scheduling: each chunk is 1/(factor * workers) of what is left
+    sizes = []
+    while n > 0:
+        size = min(n, max(min_chunk, math.ceil(n / (factor * num_workers))))
+        sizes.append(size)
+        n -= size
+    return sizes
+
+
+def cost_order(genomes, cost):
+    # genome indices, most expensive first
+    # cost: seconds per episode by genome key from earlier calls
+    known = [cost[gid] for gid, _ in genomes if gid in cost]
+    default = float(np.mean(known)) if known else 0.0
+    expected = np.array([cost.get(gid, default) for gid, _ in genomes])
+    return np.argsort(-expected, kind="stable")
+
+
+def plan_chunks(genomes, cost, num_workers, min_chunk=1, factor=2):
+    # genome index arrays, most expensive genomes first, in shrinking chunks
+    order = cost_order(genomes, cost)
+
+    chunks = []
+    start = 0
+    for size in chunk_sizes(len(genomes), num_workers, min_chunk, factor):
+        chunks.append(order[start:start + size])
+        start += size
+    return chunks
+
+
+# per-process state, filled by _init_worker
+_worker = {}
+
+
+def _init_worker(config_path, play, setup, profile=False):
+    if profile:
+        profiler.enable()
+    config = load_config(config_path)
+    _worker["config"] = config
+    _worker["play"] = play
+    _worker["context"] = {} if setup is None else setup(config)
+
+
+def _play_chunk(task):
+    idx, encoded, scenarios, n_episodes = task
+    start = time.perf_counter()
+
+    config = _worker["config"]
+    genomes = [(data["key"], decode_genome(data, config)) for data in encoded]
+    scores = _worker["play"](genomes, config, scenarios, n_episodes, **_worker["context"])
+
+    return (idx, np.asarray(scores, dtype=float), os.getpid(), time.perf_counter() - start,
+            profiler.take() if profiler.enabled else None)
+
+
+def _call_task(job):
+    fn, task = job
+    start = time.perf_counter()
+    result = fn(task, _worker["config"], **_worker["context"])
+    return (result, os.getpid(), time.perf_counter() - start,
+            profiler.take() if profiler.enabled else None)
+
+
+class ParallelEvaluator:
+
+    def __init__(self, play, config_path, setup=None, num_workers=None, n_episodes=5,
+                 schedule=None, min_chunk=1, chunk_factor=2, verbose=False):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.n_episodes = n_episodes
+        self.schedule = schedule
+        self.min_chunk = min_chunk
+        self.chunk_factor = chunk_factor
+        self.verbose = verbose
+
+        self._pool = multiprocessing.Pool(self.num_workers, initializer=_init_worker,
+                                          initargs=(config_path, play, setup, profiler.enabled))
+
+        # seconds per episode for every genome key seen on the last call
+        self.cost = {}
+
+        self.stats = {}
+        # busy seconds per worker pid over the pool's lifetime (telemetry diffs it)
+        self.busy = {}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is not None:
+            self._pool.terminate()
+        self.close()
+
+    def __del__(self):
+        if getattr(self, "_pool", None) is not None:
+            self._pool.terminate()
+
+    def _tasks(self, genomes, config, scenarios, n_episodes):
+        for idx in plan_chunks(genomes, self.cost, self.num_workers, self.min_chunk, self.chunk_factor):
+            yield idx, [encode_genome(genomes[i][1], config) for i in idx], scenarios, n_episodes
+
+    def play(self, genomes, config, scenarios=None, n_episodes=None):
+        # parallel drop-in for the script's play function
+        genomes = list(genomes)
+        if n_episodes is None:
+            n_episodes = self.n_episodes
+        if scenarios is not None:
+            n_episodes = len(scenarios)
+
+        scores = np.zeros((len(genomes), n_episodes))
+        cost = {}
+        busy = {}
+        tasks = 0
+
+        start = time.perf_counter()
+        for idx, chunk_scores, pid, seconds, phases in self._pool.imap_unordered(
+                _play_chunk, self._tasks(genomes, config, scenarios, n_episodes)):
+            scores[idx] = chunk_scores
+            profiler.merge(phases)
+            busy[pid] = busy.get(pid, 0.0) + seconds
+            tasks += 1
+            for i in idx:
+                cost[genomes[i][0]] = seconds / (len(idx) * max(n_episodes, 1))
+        wall = time.perf_counter() - start
+
+        # only the current genomes are kept, so the table never outgrows a generation
+        self.cost = cost
+
+        self._record(wall, tasks, busy, f"{len(genomes)} genomes x {n_episodes} episodes")
+        return scores
+
+    def submit(self, genomes, config, scenarios=None, n_episodes=None, callback=None,
+               error_callback=None):
+        # asynchronous play of one chunk, for callers that keep their own pipeline full
+        # (steady-state evolution). callback(scores, pid, seconds) runs on the pool's
+        # result thread
+        genomes = list(genomes)
+        if n_episodes is None:
+            n_episodes = self.n_episodes
+        if scenarios is not None:
+            n_episodes = len(scenarios)
+        task = (np.arange(len(genomes)), [encode_genome(g, config) for _, g in genomes],
+                scenarios, n_episodes)
+        def done(result):
+            _, scores, pid, seconds, phases = result
+            profiler.merge(phases)
+            self.busy[pid] = self.busy.get(pid, 0.0) + seconds
+            if callback is not None:
+                callback(scores, pid, seconds)
+
+        return self._pool.apply_async(_play_chunk, (task,), callback=done,
+                                      error_callback=error_callback)
+
+    def map(self, fn, tasks):
+        # fn(task, config, **context) on the workers -> results in completion order
+        results = []
+        busy = {}
+
+        start = time.perf_counter()
+        for result, pid, seconds, phases in self._pool.imap_unordered(_call_task, ((fn, t) for t in tasks)):
+            results.append(result)
+            profiler.merge(phases)
+            busy[pid] = busy.get(pid, 0.0) + seconds
+        wall = time.perf_counter() - start
+
+        self._record(wall, len(results), busy, f"{len(results)} tasks")
+        return results
+
+    def _record(self, wall, tasks, busy, what):
+        for pid, b in busy.items():
+            self.busy[pid] = self.busy.get(pid, 0.0) + b
+        utilization = {pid: b / wall for pid, b in busy.items()} if wall > 0 else {}
+        self.stats = {
+            "wall": wall,
+            "tasks": tasks,
+            "busy": busy,
+            "utilization": utilization,
+            # workers that never got a chunk count as idle
+            "mean_utilization": sum(busy.values()) / (wall * self.num_workers) if wall > 0 else 0.0,
+        }
+        if self.verbose:
+            per_worker = " ".join(f"{u:.0%}" for u in utilization.values())
+            print(f"parallel: {what} in {wall:.2f}s, "
+                  f"{tasks} chunks, utilization {self.stats['mean_utilization']:.0%} [{per_worker}]")
+
+    def __call__(self, genomes, config):
+        # full evaluation: mean score over n_episodes (on the schedule's scenarios if any)
+        genomes = list(genomes)
+        scenarios = None if self.schedule is None else self.schedule.next()
+        scores = self.play(genomes, config, scenarios)
+
+        for (gid, genome), row in zip(genomes, scores):
+            genome.fitness = float(row.mean())
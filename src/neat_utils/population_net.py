@@ -0,0 +1,112 @@
+# a whole population's feed-forward networks packed into padded block tensors, so
+# one forward pass produces the outputs of every (genome, episode) pair
+#   net = PopulationNetwork.create(genomes, config)
+#   out = net.activate(obs)      # (G, E, num_inputs) -> (G, E, num_outputs)
+# every genome is compiled first (compiled_net.py); then layer d of every genome goes
+# into block d, padded to the widest genome at that depth. a block is one batched
+# matmul (G, E, V_d) @ (G, V_d, S_d) over all value columns written before it,
+# with zero weights where a genome has no connection or no node.
+# cost per step is a few numpy calls per depth instead of one call per genome
+import numpy as np
+
+from .compiled_net import ACTIVATIONS, CompiledNetwork
+
+_ACTIVATION_FUNCS = list(ACTIVATIONS.values())
+
+
+class Block:
+
+    def __init__(self, weights, bias, activation, start):
+        self.weights = weights          # (G, start, size) from every earlier column
+        self.bias = bias                # (G, size)
+        self.activation = activation    # (G, size) index into ACTIVATIONS, -1 = padding
+        self.start = start              # first value column written by this block
+        # activations that actually occur, with their (G, 1, size) masks
+        self.masks = [(_ACTIVATION_FUNCS[k], (activation == k)[:, None, :])
+                      for k in np.unique(activation) if k >= 0]
+
+
+class PopulationNetwork:
+
+    def __init__(self, num_inputs, num_values, blocks, outputs):
+        self.num_inputs = num_inputs
+        self.num_values = num_values
+        self.blocks = blocks
+        self.outputs = outputs          # (G, num_outputs) value column per genome
+
+    @property
+    def num_genomes(self):
+        return len(self.outputs)
+
+    @staticmethod
+    def create(genomes, config, cache=None):
+        # cache: optional GenomeCache, so unchanged genomes are not compiled again
+        if cache is None:
+            nets = [CompiledNetwork.create(g, config) for g in genomes]
+        else:
+            nets = [cache.network(g, config) for g in genomes]
+        return PopulationNetwork.from_networks(nets)
+
+    @staticmethod
+    def from_networks(nets):
+        G = len(nets)
+        num_inputs = nets[0].num_inputs
+        depth = max(len(net.layers) for net in nets)
+        widths = [max((len(net.layers[d].bias) for net in nets if d < len(net.layers)), default=0)
+                  for d in range(depth)]
+        starts = num_inputs + np.concatenate([[0], np.cumsum(widths)]).astype(int)
+
+        # last column stays 0.0: outputs a genome never computes point there
+        num_values = int(starts[-1]) + 1
+        zero = num_values - 1
+
+        # every genome's own value columns -> columns of the packed layout
+        columns = []
+        for net in nets:
+            cols = np.full(net.num_values, zero)
+            cols[:num_inputs] = np.arange(num_inputs)
+            for d, layer in enumerate(net.layers):
+                cols[layer.start:layer.start + len(layer.bias)] = starts[d] + np.arange(len(layer.bias))
+            columns.append(cols)
+
+        blocks = []
+        for d, size in enumerate(widths):
+            start = int(starts[d])
+            weights = np.zeros((G, start, size))
+            bias = np.zeros((G, size))
+            activation = np.full((G, size), -1)
+
+            for g, net in enumerate(nets):
+                if d >= len(net.layers):
+                    continue
+                layer = net.layers[d]
+                n = len(layer.bias)
+                weights[g, columns[g][layer.src], :n] = layer.weights
+                bias[g, :n] = layer.bias
+                for act, cols in layer.activations:
+                    activation[g, cols] = _ACTIVATION_FUNCS.index(act)
+
+            blocks.append(Block(weights, bias, activation, start))
+
+        outputs = np.array([columns[g][net.outputs] for g, net in enumerate(nets)])
+        return PopulationNetwork(num_inputs, num_values, blocks, outputs)
+
+    def activate(self, obs):
+        # obs (G, E, num_inputs), E episodes per genome -> (G, E, num_outputs)
+        obs = np.asarray(obs, dtype=np.float64)
+        G, E = obs.shape[:2]
+        if G != self.num_genomes or obs.shape[2] != self.num_inputs:
+            raise RuntimeError(f"Expected ({self.num_genomes}, E, {self.num_inputs}) inputs, "
+                               f"got {obs.shape}")
+
+        values = np.zeros((G, E, self.num_values))
+        values[:, :, :self.num_inputs] = obs
+
+        for block in self.blocks:
+            z = values[:, :, :block.start] @ block.weights + block.bias[:, None, :]
+            out = np.zeros_like(z)
+            for act, mask in block.masks:
+                out = np.where(mask, act(z), out)
+            values[:, :, block.start:block.start + z.shape[2]] = out
+
+        return np.take_along_axis(values, self.outputs[:, None, :], axis=2)
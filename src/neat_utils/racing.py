@@ -0,0 +1,151 @@
+# racing evaluation: episodes are played in rounds and a genome stops getting new
+# episodes once its upper confidence bound can no longer reach the top of the
+# generation - clearly hopeless genomes cost one round instead of the full budget
+#
+# capture bonuses make single episodes very noisy, so the bounds alone rarely rule
+# anyone out early; eta adds successive halving on top: after each round at most
+# 1/eta of the remaining genomes (never fewer than the top_fraction) carry on.
+# with eta=2 (as the training scripts use it) the cap makes nearly every cut and the
+# bound only matters when the noise is low - stats["cut_by_bound"] / ["cut_by_cap"]
+# count per round which of the two removed genomes
+#
+#   evaluator = RacingEvaluator(play, max_episodes=5, eta=2, schedule=schedule)
+#   pop.run(evaluator, n=30)
+#
+# play(genomes, config, scenarios, n_episodes) -> (len(genomes), n_episodes) scores
+# where genomes is a list of (gid, genome) and scenarios the bank indices for those
+# episodes (None = random layouts). with a ScenarioSchedule every genome plays the same
+# scenario in the same slot, so means are compared on equal footing
+#
+# every genome still gets a fitness, ranked by how far it got: the survivors by their
+# mean over all max_episodes, below them the genomes cut in the last round, and so on.
+# genomes cut in the same round played the same scenarios and keep their mean's order,
+# shifted to sit strictly below every genome that outlasted them - a genome cut after
+# one easy scenario never outranks one that went on to play the harder ones
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+
+def ranked_fitness(scores):
+    # (G, max_episodes) race scores, nan where a genome was cut -> one fitness per genome.
+    # genomes that played more episodes rank strictly above those cut earlier; within
+    # the same number of episodes (the same scenarios) the mean decides
+    played = np.sum(~np.isnan(scores), axis=1)
+    means = np.nanmean(scores, axis=1)
+    fitness = means.copy()
+
+    floor = None
+    for n in sorted(set(played), reverse=True):
+        group = played == n
+        if floor is not None:
+            shift = max(0.0, means[group].max() - floor)
+            fitness[group] = np.minimum(means[group] - shift, np.nextafter(floor, -np.inf))
+        floor = fitness[group].min()
+    return fitness
+
+
+class RacingEvaluator:
+
+    def __init__(self, play, max_episodes=5, min_episodes=1, round_size=1, confidence=0.9,
+                 top_fraction=0.2, eta=None, schedule=None, verbose=False):
+        if schedule is not None and schedule.per_generation != max_episodes:
+            raise ValueError(f"schedule hands out {schedule.per_generation} scenarios per "
+                             f"generation, racing needs max_episodes={max_episodes}")
+        self.play = play
+        self.max_episodes = max_episodes
+        self.min_episodes = min_episodes
+        self.round_size = round_size
+        self.top_fraction = top_fraction
+        self.eta = eta
+        self.schedule = schedule
+        self.verbose = verbose
+
+        # one-sided normal quantile for the confidence bounds
+        self.z = NormalDist().inv_cdf(confidence)
+
+        # within-genome score spread from the last generation, used while a genome
+        # has too few episodes to estimate its own
+        self.sigma = None
+
+        self.stats = {}
+
+    def _spread(self, scores):
+        # pooled within-genome standard deviation, falling back to the spread across
+        # genomes (an overestimate, so nothing is dropped too eagerly)
+        if scores.shape[1] >= 2:
+            return float(np.sqrt(np.mean(np.var(scores, axis=1, ddof=1))))
+        if self.sigma is not None:
+            return self.sigma
+        return float(np.std(scores))
+
+    def survivors(self, scores, num_genomes):
+        # indices (into scores) of the genomes whose upper bound still reaches the
+        # lower bound of the k-th best, k = top_fraction of the whole generation
+        return self._survivors(scores, num_genomes)[0]
+
+    def _survivors(self, scores, num_genomes):
+        # -> (survivors, how many were still in after the bound, before the eta cap)
+        n = scores.shape[1]
+        means = scores.mean(axis=1)
+        half_width = self.z * self._spread(scores) / math.sqrt(n)
+
+        k = min(max(1, math.ceil(self.top_fraction * num_genomes)), len(means))
+        threshold = np.sort(means)[-k] - half_width
+        keep = np.flatnonzero(means + half_width >= threshold)
+        within_bound = len(keep)
+
+        if self.eta is not None:
+            cap = max(k, math.ceil(len(means) / self.eta))
+            keep = keep[np.argsort(means[keep], kind="stable")[::-1][:cap]]
+        return np.sort(keep), within_bound
+
+    def __call__(self, genomes, config):
+        genomes = list(genomes)
+        G = len(genomes)
+        scenarios = None if self.schedule is None else self.schedule.next()
+
+        scores = np.full((G, self.max_episodes), np.nan)
+        alive = np.arange(G)
+        played = 0
+        rounds = []
+        cut_by_bound = []
+        cut_by_cap = []
+
+        while played < self.max_episodes and len(alive):
+            count = self.min_episodes if played == 0 else self.round_size
+            count = min(count, self.max_episodes - played)
+            cols = slice(played, played + count)
+
+            scores[alive, cols] = self.play([genomes[i] for i in alive], config,
+                                            None if scenarios is None else scenarios[cols], count)
+            played += count
+            rounds.append(len(alive))
+
+            if played < self.max_episodes:
+                keep, within_bound = self._survivors(scores[alive, :played], G)
+                cut_by_bound.append(len(alive) - within_bound)
+                cut_by_cap.append(within_bound - len(keep))
+                alive = alive[keep]
+
+        # remember the noise level for the next generation's first round
+        full = scores[~np.isnan(scores).any(axis=1)]
+        if full.shape[1] >= 2 and len(full) >= 2:
+            self.sigma = float(np.sqrt(np.mean(np.var(full, axis=1, ddof=1))))
+
+        for (gid, genome), fitness in zip(genomes, ranked_fitness(scores)):
+            genome.fitness = float(fitness)
+
+        episodes = int(np.sum(~np.isnan(scores)))
+        self.stats = {
+            "episodes": episodes,
+            "budget": G * self.max_episodes,
+            "genomes_per_round": rounds,
+            "cut_by_bound": cut_by_bound,
+            "cut_by_cap": cut_by_cap,
+        }
+        if self.verbose:
+            print(f"racing: {episodes}/{G * self.max_episodes} episodes "
+                  f"({episodes / max(G * self.max_episodes, 1):.0%}), genomes per round {rounds}, "
+                  f"cut by bound {cut_by_bound} / by halving {cut_by_cap}")
@@ -0,0 +1,221 @@
+# model registry: versioned genome artifacts in a pickle-free format
+#   results/models/<role>/v0001.npz   genome arrays (genome_codec) + json metadata
+#   results/models/index.json         versions and tags ("best", ...) per role
+#
+#   from src.neat_utils.registry import registry
+#   prey_ctrl = registry.get("prey", "best")               # compiled controller, cached
+#   genome = registry.genome("predator", "v0001")
+#   registry.save("prey", winner, config, tags=("best",))  # -> "v0002"
+#
+# roles: "predator" (train_predators), "prey" (train_prey), "predator_vs_prey"
+# (train_preds_against_evprey), "coevolved_predator" and "coevolved_prey"
+# (coevolution). nothing is read until the first lookup, and every version is
+# decoded and compiled once per process, so workers and repeated generations
+# reuse the same controller
+#
+# several trainers may save into the same registry: save() takes an exclusive lock on
+# results/models/index.lock, re-reads the index from disk, adds its version and writes
+# the index back through a temp file and a rename, so no entry is lost and readers
+# never see half an index. lookups keep using the index as first read (reload() to
+# pick up other processes' saves)
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:     # windows: no advisory locks, saves are not serialised
+    fcntl = None
+
+from src.core.io import write_atomic
+
+from .config import load_config
+from .controllers import make_controller
+from .genome_codec import decode_genome, encode_genome
+
+DEFAULT_ROOT = os.path.join("results", "models")
+
+# agent speed each role is trained and evaluated with
+ROLE_SPEEDS = {
+    "predator": 2.0,
+    "prey": 1.3,
+    "predator_vs_prey": 2.0,
+    "coevolved_predator": 2.0,
+    "coevolved_prey": 1.3,
+}
+
+
+class RegistryError(KeyError):
+    pass
+
+
+class ModelRegistry:
+
+    def __init__(self, root=DEFAULT_ROOT, config=None):
+        self.root = root
+        self._config = config
+        self._index = None
+
+        # process-wide caches: (role, version) -> genome, (role, version, speed) -> controller
+        self._genomes = {}
+        self._controllers = {}
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = load_config()
+        return self._config
+
+    def _index_path(self):
+        return os.path.join(self.root, "index.json")
+
+    @property
+    def index(self):
+        if self._index is None:
+            self.reload()
+        return self._index
+
+    def reload(self):
+        # re-read the index from disk (versions other processes saved since)
+        path = self._index_path()
+        if os.path.exists(path):
+            with open(path) as f:
+                self._index = json.load(f)
+        else:
+            self._index = {}
+        return self._index
+
+    @contextmanager
+    def _locked(self):
+        # exclusive lock across processes for the read-modify-write of the index
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "index.lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def roles(self):
+        return sorted(self.index)
+
+    def versions(self, role):
+        return sorted(self.index.get(role, {}).get("versions", {}))
+
+    def resolve(self, role, version="best"):
+        # tag or version name -> version name
+        entry = self.index.get(role)
+        if entry is None:
+            raise RegistryError(f"no models registered for role {role!r} (have {self.roles()})")
+        if version in entry["versions"]:
+            return version
+        if version in entry["tags"]:
+            return entry["tags"][version]
+        raise RegistryError(f"{role!r} has no version or tag {version!r} "
+                            f"(versions {self.versions(role)}, tags {sorted(entry['tags'])})")
+
+    def path(self, role, version="best"):
+        version = self.resolve(role, version)
+        return os.path.join(self.root, self.index[role]["versions"][version]["file"])
+
+    def meta(self, role, version="best"):
+        return self.index[role]["versions"][self.resolve(role, version)]
+
+    def genome(self, role, version="best"):
+        key = (role, self.resolve(role, version))
+        if key not in self._genomes:
+            self._genomes[key] = load_genome(self.path(*key), self.config)
+        return self._genomes[key]
+
+    def get(self, role, version="best", speed=None):
+        # compiled controller for a stored genome, built once per process
+        version = self.resolve(role, version)
+        speed = ROLE_SPEEDS.get(role, 2.0) if speed is None else speed
+        key = (role, version, speed)
+        if key not in self._controllers:
+            self._controllers[key] = make_controller(self.genome(role, version), self.config, speed)
+        return self._controllers[key]
+
+    def save(self, role, genome, config=None, tags=("best",), **meta):
+        # store genome as the next version of role and point tags at it
+        config = self.config if config is None else config
+        with self._locked():
+            # versions other processes saved since this one last read the index
+            entry = self.reload().setdefault(role, {"versions": {}, "tags": {}})
+            version = f"v{len(entry['versions']) + 1:04d}"
+            file = os.path.join(role, f"{version}.npz")
+
+            os.makedirs(os.path.join(self.root, role), exist_ok=True)
+            save_genome(os.path.join(self.root, file), genome, config)
+
+            entry["versions"][version] = {
+                "file": file,
+                "fitness": None if genome.fitness is None else float(genome.fitness),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                **meta,
+            }
+            for tag in tags:
+                entry["tags"][tag] = version
+
+            write_atomic(self._index_path(), lambda f: json.dump(self._index, f, indent=2, sort_keys=True),
+                         mode="w")
+
+        # a tag may now point somewhere else, cached lookups by version stay valid
+        return version
+
+    def import_pickle(self, role, path, tags=("best",)):
+        # one-off migration of an old pickled winner (only for files you trust -
+        # unpickling runs arbitrary code)
+        import pickle
+        with open(path, "rb") as f:
+            genome = pickle.load(f)
+        return self.save(role, genome, tags=tags, source=path)
+
+
+def save_genome(path, genome, config):
+    # npz with the genome_codec arrays plus the option names the indices refer to,
+    # so an artifact stays readable if the config's option lists are reordered
+    data = encode_genome(genome, config)
+    gc = config.genome_config
+
+    def write(f):
+        np.savez_compressed(
+            f,
+            key=np.array(data["key"]),
+            nodes=data["nodes"],
+            conns=data["conns"],
+            fitness=np.array(np.nan if genome.fitness is None else genome.fitness),
+            activation_options=np.array(gc.activation_options),
+            aggregation_options=np.array(gc.aggregation_options),
+        )
+    write_atomic(path, write)
+
+
+def load_genome(path, config):
+    gc = config.genome_config
+    with np.load(path, allow_pickle=False) as f:
+        nodes = f["nodes"].copy()
+
+        # map the stored option indices onto this config's option lists
+        for col, stored, current in ((3, f["activation_options"], gc.activation_options),
+                                     (4, f["aggregation_options"], gc.aggregation_options)):
+            names = [str(s) for s in stored]
+            missing = set(names[int(i)] for i in nodes[:, col]) - set(current)
+            if missing:
+                raise ValueError(f"{path}: {sorted(missing)} not in the config's options {current}")
+            nodes[:, col] = [current.index(names[int(i)]) for i in nodes[:, col]]
+
+        genome = decode_genome({"key": int(f["key"]), "nodes": nodes, "conns": f["conns"]}, config)
+        fitness = float(f["fitness"])
+
+    genome.fitness = None if np.isnan(fitness) else fitness
+    return genome
+
+
+# shared process-wide registry over results/models
+registry = ModelRegistry()
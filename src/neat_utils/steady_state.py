@@ -0,0 +1,324 @@
+# steady-state (asynchronous) evolution in the style of rtNEAT: no generation barrier.
+# a fixed number of genome chunks is always out on the workers; whenever one comes
+# back its genomes join the population, the worst ones (by species-shared fitness)
+# leave, and as many new children are bred and sent out straight away
+#
+#   pop = neat.Population(config)
+#   pop.add_reporter(neat.StdOutReporter(True))
+#   with ParallelEvaluator(play_episodes, config_path, setup=..., num_workers=4) as pool:
+#       winner = SteadyStateEvolution(pop, pool, schedule=schedule).run(30)
+#
+# the evaluator is a ParallelEvaluator or Coordinator (asynchronous, via submit) or a
+# plain play function with the RacingEvaluator signature (one chunk at a time, in-process).
+#
+# with a ScenarioSchedule every generation plays a new block of scenarios, and only
+# genomes scored on the same block may compete (common random numbers). when the block
+# moves on, the survivors are played again on the new one before anything is culled;
+# children already out on the old block are re-played too. that costs up to pop_size
+# extra evaluations per generation (stats["rescored"]), so steady state only pays off
+# where the generation barrier leaves many workers idle
+#
+# neat_config.txt is used as is: pop_size is the population size, parents come from
+# the top survival_threshold of a species picked in proportion to its adjusted fitness,
+# each species' best member is protected while elitism > 0, and crossover, mutation,
+# compatibility and stagnation are neat's own. every pop_size evaluations count as a
+# generation: the population is re-speciated, stagnant species are dropped and the
+# reporters get their start_generation / post_evaluate / end_generation calls, so
+# StdOutReporter, StatisticsReporter, checkpoints etc. work unchanged
+import math
+import queue
+import random
+import time
+
+import neat
+import numpy as np
+
+MIN_BATCH = 10
+
+
+class SteadyStateEvolution:
+
+    def __init__(self, pop, evaluator, schedule=None, n_episodes=5, batch_size=None, in_flight=None):
+        self.pop = pop
+        self.config = pop.config
+        self.evaluator = evaluator
+        self.schedule = schedule
+        self.n_episodes = n_episodes
+
+        self.asynchronous = hasattr(evaluator, "submit")
+        self._max_in_flight = in_flight
+        if batch_size is None:
+            # about half a population out at once: play_episodes steps a whole chunk as
+            # one vectorized batch, so chunks much smaller than that play slower per genome
+            batch_size = max(MIN_BATCH, pop.config.pop_size // (2 * self.max_in_flight))
+        self.batch_size = batch_size
+
+        # evaluated genomes only; unevaluated ones live in the pipeline
+        self.population = {}
+        self.evaluations = 0
+        self.rescored = 0
+        self.stats = {}
+
+        self._results = queue.Queue()
+        self._in_flight = 0
+        self._scenarios = None
+        # scenario block of the current generation, and the block each genome was scored on
+        self._block = 0
+        self._scored_on = {}
+        # population genomes still to be played on the current block
+        self._rescore = []
+        self._busy = {}
+
+    @property
+    def max_in_flight(self):
+        if self._max_in_flight is not None:
+            return self._max_in_flight
+        # two chunks per worker: one playing, one waiting, so no worker ever idles
+        # (a Coordinator's worker count changes as machines join and leave)
+        return 2 * max(self.evaluator.num_workers, 1) if self.asynchronous else 1
+
+    # -- evaluation pipeline -------------------------------------------------------
+
+    def _launch(self, genomes):
+        self._in_flight += 1
+        block = self._block
+        if self.asynchronous:
+            self.evaluator.submit(genomes, self.config, self._scenarios, self.n_episodes,
+                                  callback=lambda scores, pid, seconds: self._results.put(
+                                      (genomes, block, scores, pid, seconds)),
+                                  error_callback=self._results.put)
+        else:
+            start = time.perf_counter()
+            scores = self.evaluator(genomes, self.config, self._scenarios, self.n_episodes)
+            self._results.put((genomes, block, scores, None, time.perf_counter() - start))
+
+    def _fill(self):
+        # keep max_in_flight chunks out: genomes owed a replay on the current block
+        # first, then children of the genomes already scored on it
+        while self._in_flight < self.max_in_flight:
+            if self._rescore:
+                batch, self._rescore = self._rescore[:self.batch_size], self._rescore[self.batch_size:]
+                batch = [(gid, g) for gid, g in batch if gid in self.population]
+                if batch:
+                    self.rescored += len(batch)
+                    self._launch(batch)
+                continue
+            children = self._breed(self.batch_size)
+            if not children:
+                return
+            self._launch(children)
+
+    def _next_result(self):
+        result = self._results.get()
+        if isinstance(result, BaseException):
+            raise result
+        self._in_flight -= 1
+        return result
+
+    # -- population --------------------------------------------------------------
+
+    def _fresh(self, gid):
+        # scored on the current scenario block
+        return self._scored_on.get(gid) == self._block
+
+    def _insert(self, gid, genome):
+        # a new genome joins the species with the closest representative
+        # (proper speciation happens at every generation boundary)
+        self.population[gid] = genome
+        species_set = self.pop.species
+        if not species_set.species:
+            return
+        gc = self.config.genome_config
+        sid = min(species_set.species,
+                  key=lambda k: genome.distance(species_set.species[k].representative, gc))
+        species_set.species[sid].members[gid] = genome
+        species_set.genome_to_species[gid] = sid
+
+    def _remove(self, gid):
+        del self.population[gid]
+        self._scored_on.pop(gid, None)
+        species_set = self.pop.species
+        sid = species_set.genome_to_species.pop(gid, None)
+        if sid in species_set.species:
+            members = species_set.species[sid].members
+            members.pop(gid, None)
+            if not members:
+                del species_set.species[sid]
+
+    def _cull(self):
+        # drop the genomes with the lowest shared fitness until the population fits;
+        # every species keeps its best member while elitism is on. waits while any genome
+        # still has a score from an earlier scenario block
+        excess = len(self.population) - self.config.pop_size
+        if excess <= 0 or not all(self._fresh(gid) for gid in self.population):
+            return
+        fitness = np.array([g.fitness for g in self.population.values()])
+        low, span = fitness.min(), max(1.0, fitness.max() - fitness.min())
+
+        species_set = self.pop.species
+        protected = set()
+        if self.config.reproduction_config.elitism > 0:
+            protected = {max(s.members, key=lambda k: s.members[k].fitness)
+                         for s in species_set.species.values() if s.members}
+
+        def shared(gid):
+            sid = species_set.genome_to_species.get(gid)
+            size = len(species_set.species[sid].members) if sid in species_set.species else 1
+            return (self.population[gid].fitness - low) / span / size
+
+        candidates = [gid for gid in self.population if gid not in protected] or list(self.population)
+        for gid in sorted(candidates, key=shared)[:excess]:
+            self._remove(gid)
+
+    def _breed(self, n):
+        # n children: species by adjusted fitness, parents from its top survival_threshold;
+        # only genomes scored on the current scenario block are compared
+        rc = self.config.reproduction_config
+        reproduction = self.pop.reproduction
+        species = [{gid: g for gid, g in s.members.items() if self._fresh(gid)}
+                   for s in self.pop.species.species.values()]
+        species = [members for members in species if members]
+        if not species:
+            return []
+
+        fitness = [g.fitness for members in species for g in members.values()]
+        low, span = min(fitness), max(1.0, max(fitness) - min(fitness))
+        weights = [np.mean([m.fitness for m in members.values()]) - low for members in species]
+        weights = [w / span + 1e-3 for w in weights]
+
+        children = []
+        for members in random.choices(species, weights, k=n):
+            members = sorted(members.items(), reverse=True, key=lambda x: (x[1].fitness, x[0]))
+            members = members[:max(2, int(math.ceil(rc.survival_threshold * len(members))))]
+            (id1, parent1), (id2, parent2) = random.choice(members), random.choice(members)
+
+            gid = next(reproduction.genome_indexer)
+            child = self.config.genome_type(gid)
+            child.configure_crossover(parent1, parent2, self.config.genome_config)
+            child.mutate(self.config.genome_config)
+            reproduction.ancestors[gid] = (id1, id2)
+            children.append((gid, child))
+        return children
+
+    # -- generation boundaries -----------------------------------------------------
+
+    def _end_generation(self):
+        # -> True when the fitness threshold is reached
+        pop, config = self.pop, self.config
+        population = self.population
+
+        best = max(population.values(), key=lambda g: g.fitness)
+        pop.species.speciate(config, population, pop.generation)
+        pop.reporters.post_evaluate(config, population, pop.species, best)
+        if pop.best_genome is None or best.fitness > pop.best_genome.fitness:
+            pop.best_genome = best
+
+        if not config.no_fitness_termination:
+            if pop.fitness_criterion(g.fitness for g in population.values()) >= config.fitness_threshold:
+                pop.reporters.found_solution(config, pop.generation, best)
+                return True
+
+        # stagnant species leave; the pipeline refills the population
+        for sid, s, stagnant in pop.reproduction.stagnation.update(pop.species, pop.generation):
+            if stagnant:
+                pop.reporters.species_stagnant(sid, s)
+                for gid in list(s.members):
+                    self._remove(gid)
+
+        if not population:
+            pop.reporters.complete_extinction()
+            if not config.reset_on_extinction:
+                raise neat.CompleteExtinctionException()
+            fresh = pop.reproduction.create_new(config.genome_type, config.genome_config, config.pop_size)
+            pop.species.speciate(config, fresh, pop.generation)
+            for batch in self._batches(list(fresh.items())):
+                self._launch(batch)
+
+        pop.reporters.end_generation(config, population, pop.species)
+        pop.generation += 1
+        self._start_generation()
+        return False
+
+    def _start_generation(self):
+        # same-generation mutations share innovation numbers, as in reproduce()
+        self.pop.reproduction.innovation_tracker.reset_generation()
+        if self.schedule is not None:
+            # a new block: every survivor is played on it before it competes again
+            self._scenarios = self.schedule.next()
+            self._block += 1
+            self._rescore = list(self.population.items())
+        self.pop.reporters.start_generation(self.pop.generation)
+
+    def _batches(self, genomes):
+        return [genomes[i:i + self.batch_size] for i in range(0, len(genomes), self.batch_size)]
+
+    def run(self, n):
+        # n generations' worth (n * pop_size) of evaluations -> best genome seen
+        pop, config = self.pop, self.config
+        # crossover and mutation happen here, outside reproduce(), which normally sets this
+        config.genome_config.innovation_tracker = pop.reproduction.innovation_tracker
+
+        # already evaluated genomes (e.g. restored from a checkpoint) go straight in
+        waiting = []
+        for gid, genome in pop.population.items():
+            if genome.fitness is None:
+                waiting.append((gid, genome))
+            else:
+                self.population[gid] = genome
+                self._scored_on[gid] = self._block
+        for s in pop.species.species.values():
+            s.members = {gid: g for gid, g in s.members.items() if gid in self.population}
+
+        start = time.perf_counter()
+        generations = 0
+        since_boundary = 0
+        self._start_generation()
+        for batch in self._batches(waiting):
+            self._launch(batch)
+
+        while generations < n:
+            # top up whenever fewer chunks than workers can take are out
+            self._fill()
+
+            genomes, block, scores, pid, seconds = self._next_result()
+            self._busy[pid] = self._busy.get(pid, 0.0) + seconds
+            children = 0
+            for (gid, genome), row in zip(genomes, np.asarray(scores)):
+                if gid in self.population:
+                    # a replay on a new block
+                    genome.fitness = float(np.mean(row))
+                elif genome.fitness is not None:
+                    # replayed after it was culled or its species went stagnant
+                    continue
+                else:
+                    genome.fitness = float(np.mean(row))
+                    self._insert(gid, genome)
+                    children += 1
+                self._scored_on[gid] = block
+                if block != self._block:
+                    # played on a block that has since moved on
+                    self._rescore.append((gid, genome))
+            self._cull()
+
+            self.evaluations += children
+            since_boundary += children
+            if since_boundary >= config.pop_size:
+                since_boundary -= config.pop_size
+                generations += 1
+                if self._end_generation():
+                    break
+
+        wall = time.perf_counter() - start
+        workers = max(self.evaluator.num_workers, 1) if self.asynchronous else 1
+        self.stats = {
+            "evaluations": self.evaluations,
+            "rescored": self.rescored,
+            "wall": wall,
+            "evaluations_per_sec": self.evaluations / wall if wall > 0 else 0.0,
+            "busy": dict(self._busy),
+            "mean_utilization": sum(self._busy.values()) / (wall * workers) if wall > 0 else 0.0,
+        }
+
+        # chunks still out are dropped with the pool
+        pop.population = dict(self.population)
+        return pop.best_genome
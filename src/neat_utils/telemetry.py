@@ -0,0 +1,198 @@
+# one JSON line per generation: throughput, episode lengths, memory and worker load,
+# for graphing training efficiency over long runs and catching memory growth
+#   telemetry = TelemetryReporter("results/telemetry/prey.jsonl")   # before the pool starts
+#   pop.add_reporter(telemetry)
+#   telemetry.pool = pool          # ParallelEvaluator / Coordinator, for per-worker busy time
+#   ...
+#   telemetry.close()              # switches the profiler back off
+#
+# a record:
+#   run, generation, time (unix), wall / evaluate seconds, episodes, steps,
+#   episodes_per_sec, steps_per_sec (over the evaluation's wall time),
+#   episode_length {mean, p10, p50, p90, p99, max}, capture_rate,
+#   rss_mb (now) and peak_rss_mb of this process, gc_objects (python objects the
+#   garbage collector tracks - a StatisticsReporter deep-copying genomes shows up here),
+#   workers {id: {busy, utilization}} with a pool,
+#   tracemalloc {current_mb, peak_mb, top: [{where, size_kb, growth_kb, count}]} when on
+#
+# episode counts come from the phase profiler (src/core/profiling.py), which this switches
+# on; process pool workers only count if the profiler is on when the pool starts, remote
+# workers if it is on when they join. tracemalloc_top=N traces every allocation (several
+# times slower), so it is off by default; its top list is ranked by growth since the
+# previous generation.
+#
+# a new run starts the file over; resume=True appends and keeps the run id of the file's
+# last record, so a resumed run continues its own series. run is a fresh id otherwise
+# (start time and pid), or the run_id given
+import gc
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import neat
+import numpy as np
+
+from src.core.profiling import profiler
+
+PERCENTILES = (10, 50, 90, 99)
+
+
+def rss_mb():
+    # resident set size of this process right now (None where /proc is not available)
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def worker_busy(pool):
+    # cumulative busy seconds per worker of a ParallelEvaluator or Coordinator
+    if pool is None:
+        return {}
+    if hasattr(pool, "nodes"):
+        return {name: node["busy"] for name, node in dict(pool.nodes).items()}
+    return dict(getattr(pool, "busy", {}))
+
+
+def episode_stats(lengths):
+    if not lengths:
+        return None
+    lengths = np.asarray(lengths)
+    stats = {"mean": float(lengths.mean()), "max": int(lengths.max())}
+    for p, value in zip(PERCENTILES, np.percentile(lengths, PERCENTILES)):
+        stats[f"p{p}"] = float(value)
+    return stats
+
+
+class TelemetryReporter(neat.reporting.BaseReporter):
+
+    def __init__(self, path, pool=None, tracemalloc_top=0, resume=False, run_id=None):
+        self.path = path
+        self.pool = pool
+        self.tracemalloc_top = tracemalloc_top
+        # records of this session, also kept in memory
+        self.history = []
+
+        previous = load_telemetry(path) if resume and os.path.exists(path) else []
+        if run_id is None and previous:
+            run_id = previous[-1].get("run")
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        if not resume:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            open(path, "w").close()
+
+        self._was_enabled = profiler.enabled
+        profiler.enable()
+        if tracemalloc_top and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._snapshot = None
+
+        self._generation = None
+        self._start = None
+        self._evaluated = None
+        self._busy = {}
+
+    def start_generation(self, generation):
+        self._generation = generation
+        self._start = time.perf_counter()
+        self._evaluated = None
+        self._busy = worker_busy(self.pool)
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self._evaluated = time.perf_counter()
+
+    def end_generation(self, config, population, species_set):
+        end = time.perf_counter()
+        start = self._start if self._start is not None else end
+        evaluate = (self._evaluated if self._evaluated is not None else end) - start
+        wall = end - start
+
+        phases = profiler.take_generation(self._generation)
+        counts = phases["counts"]
+        episodes, steps = counts.get("episodes", 0), counts.get("steps", 0)
+
+        record = {
+            "run": self.run_id,
+            "generation": self._generation,
+            "time": time.time(),
+            "wall": wall,
+            "evaluate": evaluate,
+            "episodes": episodes,
+            "steps": steps,
+            "episodes_per_sec": episodes / evaluate if evaluate > 0 else None,
+            "steps_per_sec": steps / evaluate if evaluate > 0 else None,
+            "episode_length": episode_stats(phases["lengths"]),
+            "capture_rate": counts.get("captures", 0) / episodes if episodes else None,
+            "rss_mb": rss_mb(),
+            "peak_rss_mb": peak_rss_mb(),
+            "gc_objects": len(gc.get_objects()),
+        }
+
+        if self.pool is not None:
+            busy = worker_busy(self.pool)
+            record["workers"] = {
+                str(worker): {"busy": b - self._busy.get(worker, 0.0),
+                              "utilization": (b - self._busy.get(worker, 0.0)) / wall if wall > 0 else None}
+                for worker, b in busy.items()}
+
+        if self.tracemalloc_top:
+            record["tracemalloc"] = self._tracemalloc()
+
+        self.history.append(record)
+        self.write(record)
+
+    def _tracemalloc(self):
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        if self._snapshot is None:
+            stats = snapshot.statistics("lineno")
+        else:
+            stats = snapshot.compare_to(self._snapshot, "lineno")
+        self._snapshot = snapshot
+
+        top = []
+        for stat in stats[:self.tracemalloc_top]:
+            frame = stat.traceback[0]
+            top.append({
+                "where": f"{frame.filename}:{frame.lineno}",
+                "size_kb": stat.size / 1024,
+                "growth_kb": getattr(stat, "size_diff", stat.size) / 1024,
+                "count": stat.count,
+            })
+        return {"current_mb": current / 2**20, "peak_mb": peak / 2**20, "top": top}
+
+    def found_solution(self, config, generation, best):
+        self.close()
+
+    def close(self):
+        # stop timing episodes (unless the profiler was already on before this reporter)
+        if not self._was_enabled:
+            profiler.disable()
+
+    def write(self, record):
+        # one line per generation, opened per write so a crash loses at most that line
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def load_telemetry(path):
+    # the records of a telemetry file, oldest first
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
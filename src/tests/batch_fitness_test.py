@@ -0,0 +1,61 @@
+# batched fitness over padded (E,T) traces must agree with scoring episodes one by one
+import numpy as np
+import pytest
+
+from src.core.simulation import run_episode, run_episodes_batched
+from src.core.trace import stack_traces
+from src.neat_utils.fitness import (predator_fitness, predator_fitness_batch, prey_fitness,
+                                    prey_fitness_batch, prey_fitness_against_predator,
+                                    prey_fitness_against_predator_batch)
+
+
+def mixed_episodes(seed, n=40, T=150):
+    # per-episode predator gains so some episodes capture and some run to T
+    np.random.seed(seed)
+    gains = np.linspace(0.1, 2.5, n)
+    preds = [lambda obs, g=g: (obs[0] * g, obs[1] * g) for g in gains]
+    return run_episodes_batched(preds, lambda obs: (-obs[0] * 1.3, -obs[1] * 1.3),
+                                num_episodes=n, T=T)
+
+
+def score_all(episodes):
+    trace, steps = stack_traces([ep.trace for ep in episodes])
+    captured = np.array([ep.captured for ep in episodes])
+    final = np.array([ep.final_distance for ep in episodes])
+    return (predator_fitness_batch(trace, steps, captured),
+            prey_fitness_batch(steps, captured, final),
+            prey_fitness_against_predator_batch(trace, steps, captured))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_batch_matches_per_episode(seed):
+    episodes = mixed_episodes(seed)
+    assert 0 < sum(ep.captured for ep in episodes) < len(episodes)
+
+    pred, prey, prey_vs = score_all(episodes)
+    for i, ep in enumerate(episodes):
+        assert pred[i] == pytest.approx(predator_fitness(ep), rel=1e-9, abs=1e-9)
+        assert prey[i] == pytest.approx(prey_fitness(ep), rel=1e-12)
+        assert prey_vs[i] == pytest.approx(prey_fitness_against_predator(ep), rel=1e-9)
+
+
+def test_batched_run_buffer_is_reused():
+    episodes = mixed_episodes(3, n=6, T=40)
+    trace, steps = stack_traces([ep.trace for ep in episodes])
+
+    assert trace is episodes[0].trace.base
+    assert list(steps) == [ep.steps for ep in episodes]
+
+
+def test_separate_episodes_are_padded():
+    # short and very short (< 3 steps) episodes, padded into one buffer
+    episodes = []
+    for seed, T in [(4, 90), (5, 30), (6, 2)]:
+        np.random.seed(seed)
+        episodes.append(run_episode(lambda obs: (obs[0] * 2, obs[1] * 2), lambda obs: (0.0, 0.0), T=T))
+
+    pred, _, prey_vs = score_all(episodes)
+    assert pred[2] == 0.0
+    for i, ep in enumerate(episodes):
+        assert pred[i] == pytest.approx(predator_fitness(ep), rel=1e-9, abs=1e-9)
+        assert prey_vs[i] == pytest.approx(prey_fitness_against_predator(ep), rel=1e-9)
@@ -0,0 +1,69 @@
+# hot path benchmarks: result keys, baseline comparison and the regression exit status
+import json
+
+from src.benchmarks import hot_paths
+from src.benchmarks.hot_paths import compare, result, result_key, run
+
+
+def test_compare_flags_slowdowns_in_either_unit():
+    baseline = {"results": {}}
+    current = {"results": {}}
+    for name, base, now, higher in (("fast", 100.0, 90.0, True), ("slow", 100.0, 50.0, True),
+                                    ("build", 10.0, 20.0, False), ("quicker", 10.0, 5.0, False)):
+        for data, value in ((baseline, base), (current, now)):
+            record = result(name, {"T": 500}, value, "steps/s", higher)
+            data["results"][result_key(record)] = record
+    current["results"]["new[T=500]"] = result("new", {"T": 500}, 1.0, "steps/s")
+
+    rows = {row[0]: row for row in compare(current, baseline, threshold=0.25)}
+    assert set(rows) == {"fast[T=500]", "slow[T=500]", "build[T=500]", "quicker[T=500]"}
+    assert [rows[k][5] for k in ("fast[T=500]", "slow[T=500]", "build[T=500]", "quicker[T=500]")] == \
+        [False, True, True, False]
+    assert rows["quicker[T=500]"][4] == 2.0
+
+
+def test_compare_uses_calibrated_speed_and_allows_for_noise():
+    def record(value, calibrated, spread):
+        return dict(result("case", {}, value, "steps/s"), calibrated=calibrated, spread=spread)
+
+    baseline = {"results": {"slower_machine": record(100.0, 10.0, 0.02),
+                            "slower_code": record(100.0, 10.0, 0.02),
+                            "noisy": record(100.0, 10.0, 0.1)}}
+    current = {"results": {"slower_machine": record(50.0, 10.0, 0.02),     # 2x slower, both
+                           "slower_code": record(70.0, 7.0, 0.02),
+                           "noisy": record(70.0, 7.0, 0.1)}}
+
+    rows = {row[0]: row for row in compare(current, baseline, threshold=0.15, noise=3.0)}
+    assert rows["slower_machine"][4] == 1.0 and not rows["slower_machine"][5]
+    assert rows["slower_code"][5] and rows["slower_code"][6] == 0.15
+    # 3x the combined spread of two 10% runs is about 42%, wider than the 30% loss
+    assert not rows["noisy"][5] and rows["noisy"][6] > 0.4
+
+
+def test_run_measures_only_the_selected_cases():
+    data = run(quick=True, repeat=1, only=["fitness.predator"])
+    names = {r["name"] for r in data["results"].values()}
+    assert names == {"fitness.predator", "fitness.predator_batch"}
+    assert all(r["value"] > 0 and r["calibrated"] > 0 and r["spread"] >= 0
+               for r in data["results"].values())
+    assert data["meta"]["quick"] and data["meta"]["calibration"] > 0
+
+
+def test_main_compares_against_the_stored_baseline(tmp_path):
+    baseline, out = str(tmp_path / "baseline.json"), str(tmp_path / "out.json")
+    args = ["--quick", "--repeat", "1", "--only", "fitness.prey_vs_pred_batch",
+            "--baseline", baseline, "--out", out, "--no-confirm"]
+    assert hot_paths.main(args + ["--update-baseline"]) == 0
+
+    # a baseline ten times faster than this machine can manage
+    with open(baseline) as f:
+        data = json.load(f)
+    for record in data["results"].values():
+        record["value"] *= 10
+        record["calibrated"] *= 10
+    with open(baseline, "w") as f:
+        json.dump(data, f)
+
+    assert hot_paths.main(args) == 1
+    with open(out) as f:
+        assert list(json.load(f)["results"]) == ["fitness.prey_vs_pred_batch[T=5000]"]
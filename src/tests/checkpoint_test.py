@@ -0,0 +1,105 @@
+# checkpoints: pickle-free, rotated under a budget, a resumed run continues the same run
+import os
+
+import neat
+import numpy as np
+import pytest
+
+from src.neat_utils.checkpoint import (AsyncCheckpointer, latest_checkpoint, list_checkpoints,
+                                       restore_checkpoint, start_or_resume)
+from src.neat_utils.config import load_config
+
+
+@pytest.fixture
+def config():
+    # fresh per test: restoring installs an innovation tracker on the genome config
+    return load_config()
+
+
+def fitness(genomes, config):
+    # cheap deterministic stand-in for play_episodes
+    for _, g in genomes:
+        g.fitness = sum(c.weight for c in g.connections.values() if c.enabled) \
+                    - 0.1 * len(g.nodes)
+
+
+def summary(pop):
+    return sorted((k, len(g.nodes), len(g.connections),
+                   round(sum(c.weight for c in g.connections.values()), 9))
+                  for k, g in pop.population.items())
+
+
+def run_with_checkpoints(config, directory, generations, **kwargs):
+    pop = neat.Population(config, seed=7)
+    checkpointer = AsyncCheckpointer(str(directory), **kwargs)
+    pop.add_reporter(checkpointer)
+    pop.run(fitness, generations)
+    checkpointer.close()
+    return pop
+
+
+def test_resumed_run_matches_uninterrupted_run(tmp_path, config):
+    full = run_with_checkpoints(config, tmp_path / "full", 5, keep=10)
+
+    run_with_checkpoints(load_config(), tmp_path / "crashed", 3, keep=10)
+    path = latest_checkpoint(str(tmp_path / "crashed"))
+    assert path.endswith("ckpt-000003.npz")
+
+    with np.load(path, allow_pickle=False) as f:
+        assert {"record", "nodes", "conns"} <= set(f.files)
+
+    resumed_config = load_config()
+    pop, extra = restore_checkpoint(path, resumed_config)
+    assert pop.generation == 3 and extra == {}
+    pop.run(fitness, 2)
+
+    assert pop.generation == full.generation
+    assert summary(pop) == summary(full)
+    assert sorted(pop.species.species) == sorted(full.species.species)
+    assert pop.best_genome.fitness == full.best_genome.fitness
+
+
+def test_rotation_keeps_newest_within_budget(tmp_path, config):
+    run_with_checkpoints(config, tmp_path, 4, keep=2)
+    assert [g for g, _ in list_checkpoints(str(tmp_path))] == [3, 4]
+
+    # a budget smaller than one file still keeps the newest checkpoint
+    run_with_checkpoints(load_config(), tmp_path / "tiny", 3, max_bytes=1)
+    assert [g for g, _ in list_checkpoints(str(tmp_path / "tiny"))] == [3]
+    assert not [n for n in os.listdir(tmp_path / "tiny") if ".tmp" in n]
+
+
+def test_extra_state_and_interval(tmp_path, config):
+    pop = neat.Population(config, seed=7)
+    checkpointer = AsyncCheckpointer(str(tmp_path), interval=2, keep=10,
+                                     extra_state=lambda: {"schedule": pop.generation * 10})
+    pop.add_reporter(checkpointer)
+    pop.run(fitness, 4)
+    checkpointer.close()
+
+    assert [g for g, _ in list_checkpoints(str(tmp_path))] == [2, 4]
+    _, extra = restore_checkpoint(latest_checkpoint(str(tmp_path)), load_config())
+    assert extra == {"schedule": 30}
+
+
+def test_earlier_run_is_resumed_or_archived_never_deleted(tmp_path, config):
+    run_with_checkpoints(config, tmp_path, 3, keep=10)
+    saved = sorted(os.listdir(tmp_path))
+
+    # neither flag: refuse rather than start over on top of the crashed run
+    with pytest.raises(RuntimeError, match="--resume"):
+        start_or_resume(str(tmp_path), load_config())
+    assert sorted(os.listdir(tmp_path)) == saved
+
+    pop, _ = start_or_resume(str(tmp_path), load_config(), resume=True)
+    assert pop.generation == 3
+
+    # fresh: the old files move to archive/<time>/ and the directory starts empty
+    pop, extra = start_or_resume(str(tmp_path), load_config(), fresh=True)
+    assert pop.generation == 0 and extra == {}
+    assert list_checkpoints(str(tmp_path)) == []
+    (archive,) = os.listdir(tmp_path / "archive")
+    assert sorted(os.listdir(tmp_path / "archive" / archive)) == saved
+
+    # nothing to resume or archive: a fresh run either way
+    assert start_or_resume(str(tmp_path / "none"), load_config(), resume=True)[0].generation == 0
@@ -0,0 +1,134 @@
+# coevolution: match schedule, scattered-row controllers, both populations advance together
+import numpy as np
+import pytest
+
+from conftest import first_genomes
+from src.core.scenarios import ScenarioBank, ScenarioSchedule
+from src.neat_utils.controllers import make_controller, make_indexed_population_controller
+from src.neat_utils.hall_of_fame import HallOfFame
+from src.training.coevolution import Coevolution, schedule_matches
+
+
+@pytest.fixture(scope="module")
+def schedule(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("bank") / "bank.npy")
+    ScenarioBank.generate(16, seed=5).save(path)
+    return lambda: ScenarioSchedule(ScenarioBank.load(path), 2)
+
+
+def test_schedule_shares_episodes_and_scores_hof_one_side():
+    rng = np.random.default_rng(0)
+    hof_pred = np.array([[90, 91], [92, 93]])
+    hof_prey = np.array([[94, 95], [96, 97], [98, 99]])
+    m = schedule_matches(10, 8, np.array([40, 41, 42]), n_episodes=3, rng=rng,
+                         hof_pred=hof_pred, hof_prey=hof_prey)
+
+    shared = m["score_pred"] & m["score_prey"]
+    assert shared.sum() == 10 * 3
+    # every current genome plays every round of shared episodes at least once
+    assert np.bincount(m["pred"][shared], minlength=10).min() == 3
+    assert np.bincount(m["prey"][shared], minlength=8).min() >= 3
+    assert set(m["scenario"][shared]) == {40, 41, 42}
+
+    # hall-of-fame genomes (index >= current size) only ever appear as opponents,
+    # every current genome meets every drawn champion on that champion's scenarios
+    assert np.all(m["pred"][m["score_pred"]] < 10)
+    assert np.all(m["prey"][m["score_prey"]] < 8)
+    vs_hof_prey = m["score_pred"] & ~m["score_prey"]
+    assert vs_hof_prey.sum() == 10 * 3 * 2
+    pairs = set(zip(m["prey"][vs_hof_prey] - 8, m["scenario"][vs_hof_prey]))
+    assert pairs == {(0, 94), (0, 95), (1, 96), (1, 97), (2, 98), (2, 99)}
+
+    none = schedule_matches(10, 8, np.array([1]), n_episodes=2, rng=rng)
+    assert len(none["pred"]) == 20
+
+
+def test_indexed_controller_matches_per_genome_controllers(config):
+    genomes = [g for _, g in first_genomes(config, 3, 4)]
+    for g in genomes:
+        for _ in range(5):
+            g.mutate(config.genome_config)
+
+    rows = np.array([2, 0, 2, 3, 2, 1, 0])
+    obs = np.random.default_rng(2).normal(size=(len(rows), 6))
+    out = make_indexed_population_controller(genomes, config, rows, speed=1.3)(obs)
+
+    for i, gid in enumerate(rows):
+        expected = make_controller(genomes[gid], config, speed=1.3)(obs[i:i + 1])
+        assert np.allclose(out[i], expected[0])
+
+
+def test_hall_of_fame_keeps_compiled_copies_of_recent_champions(config):
+    genome = first_genomes(config, 3, 1)[0][1]
+    genome.fitness = 1.0
+    hof = HallOfFame(max_size=2)
+    for r in range(3):
+        hof.add(genome, config, r)
+    genome.fitness = 5.0
+
+    assert [c.round for c in hof.members] == [1, 2]
+    assert [c.index for c in hof.members] == [1, 2]
+    assert all(g.fitness == 1.0 for g in hof.genomes())
+    assert hof.members[0].network is not hof.members[1].network
+    assert len(hof.sample(5, np.random.default_rng(0))) == 2
+
+
+def test_sampling_prefers_champions_with_split_games(config):
+    genome = first_genomes(config, 3, 1)[0][1]
+    hof = HallOfFame()
+    for r in range(3):
+        hof.add(genome, config, r)
+    hof.members[0].record(100, 100)     # always caught
+    hof.members[1].record(50, 100)      # a coin flip
+    hof.members[2].record(0, 100)       # never caught
+
+    rng = np.random.default_rng(0)
+    drawn = [hof.sample(1, rng)[0].index for _ in range(300)]
+    assert np.bincount(drawn, minlength=3)[1] > 250
+    assert {c.index for c in hof.sample(3, rng)} == {0, 1, 2}
+
+
+def test_hall_of_fame_games_follow_the_scenario_schedule(schedule):
+    with Coevolution(n_episodes=2, hof_episodes=1, T=40, schedule=schedule(), verbose=False) as coevo:
+        config = coevo.predators.config
+        coevo.hof_predators.add(next(iter(coevo.predators.population.values())), config)
+        coevo.hof_prey.add(next(iter(coevo.prey.population.values())), config)
+
+        played = []
+        play = coevo._play
+
+        def recording_play(preds, prey, matches, config):
+            played.append(matches)
+            return play(preds, prey, matches, config)
+
+        coevo._play = recording_play
+        coevo.evaluate()
+        coevo.evaluate()
+
+    # champions are met on the generation's own scenarios, which move on every generation
+    blocks = [{0, 1}, {2, 3}]
+    for matches, block in zip(played, blocks):
+        vs_hof = matches["score_pred"] ^ matches["score_prey"]
+        assert vs_hof.sum() > 0
+        assert set(matches["scenario"][vs_hof]) <= block
+
+
+def test_both_populations_evolve_in_lockstep(schedule):
+    with Coevolution(n_episodes=2, hof_episodes=1, T=40, schedule=schedule(), verbose=False) as coevo:
+        coevo.run(rounds=2, generations_per_round=1)
+
+    assert coevo.predators.generation == coevo.prey.generation == 2
+    assert len(coevo.hof_predators) == len(coevo.hof_prey) == 2
+    assert coevo.history[0]["episodes"] == coevo.history[0]["shared"]
+    assert coevo.history[1]["episodes"] > coevo.history[1]["shared"]
+
+
+def test_parallel_scores_match_in_process(schedule):
+    results = []
+    for workers in (1, 2):
+        with Coevolution(n_episodes=2, T=40, workers=workers, schedule=schedule(),
+                         verbose=False) as coevo:
+            coevo.evaluate()
+            results.append([g.fitness for g in coevo.predators.population.values()] +
+                           [g.fitness for g in coevo.prey.population.values()])
+    assert np.allclose(results[0], results[1])
@@ -0,0 +1,88 @@
+# compiled networks must compute what neat's FeedForwardNetwork computes
+import neat
+import numpy as np
+import pytest
+
+from src.core.simulation import run_episodes_batched
+from src.core.vec_environment import VecEnvironment
+from src.neat_utils.compiled_net import CompiledNetwork
+from src.neat_utils.controllers import make_controller
+
+
+@pytest.fixture(scope="module")
+def genomes(config):
+    # evolved-looking genomes: hidden nodes, skip connections, disabled links and
+    # every activation from the config
+    rng = np.random.default_rng(0)
+    pop = neat.Population(config, seed=5)
+    genomes = [g for _, g in list(pop.population.items())[:40]]
+    for g in genomes:
+        for _ in range(int(rng.integers(0, 15))):
+            g.mutate(config.genome_config)
+        for ng in g.nodes.values():
+            ng.activation = rng.choice(config.genome_config.activation_options)
+    return genomes
+
+
+def test_matches_feed_forward_network(config, genomes):
+    obs = np.random.default_rng(1).normal(scale=3.0, size=(64, 6))
+    assert any(len(g.nodes) > 2 for g in genomes)
+
+    for genome in genomes:
+        ff = neat.nn.FeedForwardNetwork.create(genome, config)
+        net = CompiledNetwork.create(genome, config)
+
+        expected = np.array([ff.activate(o) for o in obs])
+        assert np.allclose(net.activate_batch(obs), expected, rtol=1e-12, atol=1e-12)
+        assert np.allclose(net.activate(obs[0]), expected[0], rtol=1e-12, atol=1e-12)
+
+
+def test_unconnected_output_is_a_bias_neuron(config):
+    # neat 2.0 evaluates a required node without inputs as act(bias)
+    genome = neat.Population(config, seed=0).population[1]
+    for cg in genome.connections.values():
+        if cg.key[1] == 1:
+            cg.enabled = False
+
+    net = CompiledNetwork.create(genome, config)
+    expected = neat.nn.FeedForwardNetwork.create(genome, config).activate([1.0] * 6)
+    assert np.allclose(net.activate_batch(np.ones((3, 6))), expected)
+
+
+def test_controller_single_and_batch_agree(config, genomes):
+    ctrl = make_controller(genomes[3], config, speed=1.3)
+    obs = np.random.default_rng(2).normal(size=(16, 6))
+
+    batch = ctrl(obs)
+    assert batch.shape == (16, 2)
+    assert np.allclose(batch, [ctrl(o) for o in obs], atol=1e-5)
+    assert np.all(np.abs(batch) <= 1.3)
+
+
+def test_controller_builds_only_the_network_its_calls_use(config, genomes):
+    single = make_controller(genomes[3], config)
+    single(np.ones(6))
+    assert single._net is None and single._ff is not None
+
+    batch = make_controller(genomes[3], config)
+    batch(np.ones((2, 6)))
+    assert batch._net is not None and batch._ff is None
+
+
+def test_per_genome_lists_run_batched(config, genomes):
+    # one call per distinct controller gives the same episodes as row-by-row calls
+    preds = [make_controller(g, config) for g in genomes[:4]]
+    prey = make_controller(genomes[4], config, speed=1.3)
+    per_episode = [c for c in preds for _ in range(3)]
+
+    def episodes(pred, prey_ctrl):
+        np.random.seed(7)
+        return run_episodes_batched(pred, prey_ctrl, env=VecEnvironment(12), T=150)
+
+    fast = episodes(per_episode, prey)
+    slow = episodes([lambda o, c=c: c.act_batch(o[None])[0] for c in per_episode],
+                    lambda o: prey.act_batch(o[None])[0])
+
+    for a, b in zip(fast, slow):
+        assert (a.steps, a.captured) == (b.steps, b.captured)
+        assert np.allclose(a.trace["pred_pos"], b.trace["pred_pos"])
@@ -0,0 +1,40 @@
+# fixtures and stand-in play functions shared by the evaluation tests
+# (process pool, distributed, steady-state, caches, coevolution)
+#
+# the play functions follow the ParallelEvaluator protocol and live at module level,
+# so pool and worker processes can import them
+import neat
+import numpy as np
+import pytest
+
+from src.neat_utils.config import load_config
+
+
+@pytest.fixture(scope="module")
+def config():
+    return load_config()
+
+
+def first_genomes(config, seed, k):
+    # (genome id, genome) of the first k genomes of a fresh population
+    return list(neat.Population(config, seed=seed).population.items())[:k]
+
+
+def id_play(genomes, config, scenarios, n_episodes, offset=0.0):
+    # genome id * 100 + scenario (episode number without scenarios) + offset: every
+    # score says which genome and episode it came from
+    n = n_episodes if scenarios is None else len(scenarios)
+    episodes = np.arange(n) if scenarios is None else np.asarray(scenarios, dtype=float)
+    return np.array([gid for gid, _ in genomes], dtype=float)[:, None] * 100 + episodes + offset
+
+
+def weight_sum(genome):
+    return sum(cg.weight for cg in genome.connections.values() if cg.enabled)
+
+
+def weight_play(genomes, config, scenarios, n_episodes, offset=0.0):
+    # score depends only on the genome: more total connection weight scores higher,
+    # so selection has something to climb
+    n = n_episodes if scenarios is None else len(scenarios)
+    w = np.array([weight_sum(g) for _, g in genomes])
+    return w[:, None] + offset + np.arange(n)
@@ -0,0 +1,150 @@
+# distributed evaluation: coordinator + workers on localhost, dropped work is re-queued
+import multiprocessing
+import os
+import socket
+import threading
+
+import neat
+import numpy as np
+import pytest
+
+from conftest import first_genomes, id_play, weight_play
+from src.neat_utils.distributed import Coordinator, _Job, parse_address, run_worker
+from src.neat_utils.steady_state import SteadyStateEvolution
+
+AUTHKEY = b"test-key"
+
+
+@pytest.fixture(scope="module")
+def genomes(config):
+    return first_genomes(config, 6, 20)
+
+
+def fake_setup(config, offset=0.0):
+    # stands in for worker_setup: resident context built from the coordinator's kwargs
+    return {"offset": offset}
+
+
+def dying_play(genomes, config, scenarios, n_episodes, offset=0.0):
+    # the machine goes away in the middle of its first chunk
+    os._exit(1)
+
+
+def expected(genomes, n, offset):
+    return id_play(genomes, None, None, n, offset)
+
+
+def start_worker(address, play, name):
+    proc = multiprocessing.Process(target=run_worker, args=(address, AUTHKEY, play),
+                                   kwargs={"setup": fake_setup, "name": name}, daemon=True)
+    proc.start()
+    return proc
+
+
+def test_parse_address():
+    assert parse_address("example.org:6000") == ("example.org", 6000)
+    assert parse_address(":7000") == ("127.0.0.1", 7000)
+
+
+def test_workers_score_genomes_and_report_per_node(config, genomes):
+    with Coordinator(("127.0.0.1", 0), AUTHKEY, n_episodes=3, setup_kwargs={"offset": 0.5}) as pool:
+        procs = [start_worker(pool.address, id_play, name) for name in ("a", "b")]
+        pool.wait_for_workers(2, timeout=30)
+
+        scores = pool.play(genomes, config)
+        assert np.array_equal(scores, expected(genomes, 3, 0.5))
+        assert sum(pool.stats["episodes"].values()) == len(genomes) * 3
+        assert set(pool.stats["throughput"]) <= {"a", "b"}
+
+        # scenarios decide the episode count, costs from the last call order the chunks
+        again = pool.play(genomes, config, scenarios=np.array([4, 5]))
+        assert again.shape == (len(genomes), 2)
+        assert set(pool.cost) == {gid for gid, _ in genomes}
+        assert sum(node["genomes"] for node in pool.nodes.values()) == 2 * len(genomes)
+
+    for proc in procs:
+        proc.join(timeout=30)
+        assert proc.exitcode == 0
+
+
+def test_dropped_worker_chunk_is_requeued(config, genomes):
+    with Coordinator(("127.0.0.1", 0), AUTHKEY, n_episodes=2) as pool:
+        dying = start_worker(pool.address, dying_play, "dying")
+        pool.wait_for_workers(1, timeout=30)
+
+        # the first chunk goes to the dying worker; a healthy one joins later and
+        # picks up everything, including the lost chunk
+        result = {}
+
+        def play():
+            result["scores"] = pool.play(genomes, config)
+
+        thread = threading.Thread(target=play)
+        thread.start()
+        dying.join(timeout=30)
+        steady = start_worker(pool.address, id_play, "steady")
+        thread.join(timeout=60)
+
+        assert np.array_equal(result["scores"], expected(genomes, 2, 0.0))
+        assert pool.nodes["dying"]["connected"] is False
+        assert pool.nodes["steady"]["genomes"] == len(genomes)
+
+    steady.join(timeout=30)
+    assert dying.exitcode == 1 and steady.exitcode == 0
+
+
+def test_wrong_key_is_refused(config, genomes):
+    with Coordinator(("127.0.0.1", 0), AUTHKEY) as pool:
+        proc = multiprocessing.Process(target=run_worker, args=(pool.address, b"wrong", id_play),
+                                       kwargs={"max_retries": 0}, daemon=True)
+        proc.start()
+        proc.join(timeout=30)
+        assert proc.exitcode != 0
+        assert pool.num_workers == 0
+
+
+def test_silent_peer_does_not_hold_up_workers(config, genomes):
+    with Coordinator(("127.0.0.1", 0), AUTHKEY, n_episodes=1) as pool:
+        # connects, never authenticates
+        silent = socket.create_connection(pool.address)
+        proc = start_worker(pool.address, id_play, "a")
+        pool.wait_for_workers(1, timeout=30)
+        assert np.array_equal(pool.play(genomes, config), expected(genomes, 1, 0.0))
+        silent.close()
+    proc.join(timeout=30)
+
+
+def test_no_workers_times_out_or_falls_back(config, genomes):
+    with Coordinator(("127.0.0.1", 0), AUTHKEY, n_episodes=2, worker_timeout=0.2) as pool:
+        with pytest.raises(TimeoutError, match="no evaluation workers"):
+            pool.play(genomes, config)
+
+    with Coordinator(("127.0.0.1", 0), AUTHKEY, n_episodes=2, worker_timeout=0.2,
+                     fallback=id_play) as pool:
+        assert np.array_equal(pool.play(genomes, config), expected(genomes, 2, 0.0))
+        assert pool.nodes["local"]["genomes"] == len(genomes)
+
+
+def test_chunks_are_sized_for_the_workers_connected_when_handed_out(config, genomes):
+    job = _Job(genomes, config, np.arange(len(genomes)), None, 1)
+    sizes = [len(job.take(0, 1, 1, 2)[2][0]), len(job.take(1, 4, 1, 2)[2][0])]
+    # half of 20 for one worker, then 1/8 of the remaining 10 once four are connected
+    assert sizes == [10, 2]
+    assert job.take(2, 1, 10, 2)[2][0].tolist() == list(range(12, 20))
+    assert job.take(3, 1, 1, 2) is None and job.handed_out
+
+
+def test_steady_state_submits_to_remote_workers(config):
+    pop = neat.Population(config, seed=7)
+    with Coordinator(("127.0.0.1", 0), AUTHKEY, n_episodes=1) as pool:
+        procs = [start_worker(pool.address, weight_play, name) for name in ("a", "b")]
+        pool.wait_for_workers(2, timeout=30)
+        evolution = SteadyStateEvolution(pop, pool, n_episodes=1, batch_size=5)
+        evolution.run(2)
+
+        assert evolution.asynchronous and evolution.max_in_flight == 4
+        assert pop.generation == 2 and len(pop.population) == config.pop_size
+        assert sum(node["genomes"] for node in pool.nodes.values()) >= 2 * config.pop_size
+        assert set(evolution.stats["busy"]) <= {"a", "b"}
+    for proc in procs:
+        proc.join(timeout=30)
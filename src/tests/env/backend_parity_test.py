@@ -0,0 +1,99 @@
+# every kernel backend must produce the same results as the numpy reference
+import warnings
+
+import numpy as np
+import pytest
+
+from src.core import kernels
+from src.core.environment import Environment
+from src.core.vec_environment import VecEnvironment
+from src.core.simulation import run_episode, run_episodes_batched
+from src.neat_utils.dummy_controllers import pred_dummy
+
+
+def prey_escape(obs):
+    step = -np.array([obs[0], obs[1]])
+    return step / (np.linalg.norm(step) + 1e-8) * 1.8
+
+
+def random_state(n=64, k=5, seed=0):
+    rng = np.random.default_rng(seed)
+    obstacles = np.concatenate([rng.uniform(0, 100, size=(n, k, 2)),
+                                rng.uniform(4, 12, size=(n, k, 1))], axis=2)
+    return {
+        "pred_pos": rng.uniform(0, 100, size=(n, 2)),
+        "prey_pos": rng.uniform(0, 100, size=(n, 2)),
+        "pred_act": rng.uniform(-3, 3, size=(n, 2)),
+        "prey_act": rng.uniform(-3, 3, size=(n, 2)),
+        "obstacles": obstacles,
+        "active": rng.uniform(size=n) < 0.9,
+    }
+
+
+def run_kernels(backend, state):
+    s = {k: v.copy() for k, v in state.items()}
+    n = len(s["pred_pos"])
+    dist = np.empty(n)
+    captured = backend.step(s["pred_pos"], s["prey_pos"], s["pred_act"], s["prey_act"],
+                            s["obstacles"], s["active"], 100.0, 100.0, 5.0, 5.0, 30.0, dist)
+    pred_obs, prey_obs = np.empty((n, 6)), np.empty((n, 6))
+    backend.observe(s["pred_pos"], s["prey_pos"], s["obstacles"], pred_obs, prey_obs)
+    return s["pred_pos"], s["prey_pos"], dist, np.asarray(captured), pred_obs, prey_obs
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_numba_kernels_match_numpy(seed):
+    pytest.importorskip("numba")
+    state = random_state(seed=seed)
+    expected = run_kernels(kernels.NUMPY, state)
+    got = run_kernels(kernels.get_backend("numba"), state)
+    for a, b in zip(expected, got):
+        assert np.array_equal(a, b)
+
+
+def test_numba_kernels_without_obstacles():
+    pytest.importorskip("numba")
+    state = random_state(k=0)
+    for a, b in zip(run_kernels(kernels.NUMPY, state), run_kernels(kernels.get_backend("numba"), state)):
+        assert np.array_equal(a, b)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "auto"])
+def test_environment_backend_matches_scalar_path(backend):
+    np.random.seed(10)
+    scalar = run_episode(pred_dummy, prey_escape, Environment(num_obstacles=6), T=200)
+    np.random.seed(10)
+    kernel = run_episode(pred_dummy, prey_escape, Environment(num_obstacles=6, backend=backend), T=200)
+
+    assert (scalar.steps, scalar.captured) == (kernel.steps, kernel.captured)
+    for a, b in zip(scalar.trace, kernel.trace):
+        assert np.allclose(a["pred_pos"], b["pred_pos"])
+        assert np.allclose(a["prey_pos"], b["prey_pos"])
+
+
+def test_batched_runner_backends_agree():
+    results = {}
+    for backend in ("numpy", "auto"):
+        np.random.seed(11)
+        results[backend] = run_episodes_batched(pred_dummy, prey_escape, 12, T=150, backend=backend)
+    for a, b in zip(results["numpy"], results["auto"]):
+        assert (a.steps, a.captured) == (b.steps, b.captured)
+        assert np.isclose(a.final_distance, b.final_distance)
+
+
+def test_missing_numba_falls_back_to_numpy(monkeypatch):
+    monkeypatch.setattr(kernels, "numba_available", lambda: False)
+
+    with pytest.warns(UserWarning):
+        assert kernels.get_backend("numba") is kernels.NUMPY
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert kernels.get_backend("auto") is kernels.NUMPY
+
+    assert VecEnvironment(2, backend="auto").backend is kernels.NUMPY
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        kernels.get_backend("cuda")
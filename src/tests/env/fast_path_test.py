@@ -0,0 +1,58 @@
+# the float fast path must match the original numpy-based step/observe
+import numpy as np
+
+from src.core.environment import Environment
+from src.core.simulation import run_episode
+
+
+def reference_step(env, pos, action, radius):
+    # original Environment.step movement: numpy position, collision on the unclipped target, np.clip
+    target = np.array(pos) + np.array(action)
+    blocked = any(np.sqrt((target[0] - ob.x) ** 2 + (target[1] - ob.y) ** 2) < radius + ob.radius
+                  for ob in env.obstacles)
+    if blocked:
+        return np.array(pos)
+    return np.array([np.clip(target[0], 0, env.width), np.clip(target[1], 0, env.height)])
+
+
+def test_open_loop_positions_are_bit_identical():
+    np.random.seed(8)
+    env = Environment(num_obstacles=6)
+    env.reset()
+    pred = np.array(env.predator.position())
+    prey = np.array(env.prey.position())
+
+    actions = np.random.uniform(-3, 3, size=(400, 4))
+    for a in actions:
+        pred = reference_step(env, pred, a[:2], env.predator.radius)
+        prey = reference_step(env, prey, a[2:], env.prey.radius)
+        dist, captured = env.step_fast(a[:2], a[2:])
+
+        assert np.array_equal(pred, env.predator.position())
+        assert np.array_equal(prey, env.prey.position())
+        assert np.isclose(dist, np.linalg.norm(pred - prey), rtol=1e-15, atol=0)
+
+
+def test_observe_into_matches_observe():
+    np.random.seed(9)
+    env = Environment()
+    env.reset()
+    pred_buf, prey_buf = np.empty(6), np.empty(6)
+
+    for a in np.random.uniform(-2, 2, size=(50, 4)):
+        (pred_obs, prey_obs), info = env.step(a[:2], a[2:])
+        env.observe_into(pred_buf, prey_buf)
+        assert np.array_equal(pred_obs, pred_buf)
+        assert np.array_equal(prey_obs, prey_buf)
+        assert info["distance"] == env.distance()
+
+
+def test_run_episode_reuses_observation_buffer():
+    seen = []
+
+    def pred(obs):
+        seen.append(id(obs))
+        return 1.0, 0.0
+
+    run_episode(pred, lambda obs: (0.0, 0.0), T=20)
+    assert len(set(seen)) == 1
@@ -0,0 +1,76 @@
+# obstacle layouts never overlap, spawns stay clear, and crowded maps fail loudly
+import numpy as np
+import pytest
+
+from src.core.environment import Environment
+from src.core.layout import LayoutError, place_obstacles, place_obstacles_batch
+from src.core.vec_environment import VecEnvironment
+
+
+def overlapping(ob):
+    # ob (K,3) -> True if any two disks intersect
+    d = np.hypot(ob[:, None, 0] - ob[None, :, 0], ob[:, None, 1] - ob[None, :, 1])
+    clash = d < ob[:, None, 2] + ob[None, :, 2]
+    np.fill_diagonal(clash, False)
+    return clash.any()
+
+
+def inside_walls(ob, width, height):
+    return np.all((ob[:, 0] >= ob[:, 2]) & (ob[:, 0] <= width - ob[:, 2]) &
+                  (ob[:, 1] >= ob[:, 2]) & (ob[:, 1] <= height - ob[:, 2]))
+
+
+def test_thousands_of_obstacles_without_overlap():
+    rng = np.random.default_rng(0)
+    ob = place_obstacles(3000, 1000, 1000, 2.0, 6.0, rng=rng)
+    assert ob.shape == (3000, 3)
+    assert not overlapping(ob)
+    assert inside_walls(ob, 1000, 1000)
+
+
+def test_batched_layouts_without_overlap():
+    rng = np.random.default_rng(1)
+    obs = place_obstacles_batch(200, 12, 100, 100, 4.0, 12.0, rng=rng)
+    for ob in obs:
+        assert not overlapping(ob)
+        assert inside_walls(ob, 100, 100)
+
+    # above DENSE_MAX the batch falls back to the grid sampler per world
+    big = place_obstacles_batch(2, 100, 300, 300, 2.0, 6.0, rng=rng)
+    assert not any(overlapping(ob) for ob in big)
+
+
+def test_crowded_map_raises():
+    with pytest.raises(LayoutError, match="placed only"):
+        place_obstacles(60, 100, 100, 4.0, 12.0, rng=np.random.default_rng(2), max_rounds=20)
+    with pytest.raises(LayoutError):
+        place_obstacles_batch(4, 60, 100, 100, 4.0, 12.0, rng=np.random.default_rng(2), max_rounds=20)
+    with pytest.raises(LayoutError, match="does not fit"):
+        place_obstacles(1, 10, 10, 6.0, 8.0)
+
+
+def test_blocked_spawn_raises():
+    # one huge obstacle covers the whole predator spawn area
+    env = Environment(width=60, height=60, num_obstacles=1, min_r=29.0, max_r=30.0)
+    with pytest.raises(LayoutError, match="predator spawn"):
+        env.reset()
+
+
+def test_environment_spawns_are_clear():
+    np.random.seed(12)
+    env = Environment(num_obstacles=10)
+    vec = VecEnvironment(300, num_obstacles=10)
+    vec.reset()
+
+    for _ in range(20):
+        env.reset()
+        ob = np.array([(o.x, o.y, o.radius) for o in env.obstacles])
+        assert not overlapping(ob)
+        assert not env.collides_with_obstacle(env.predator.x, env.predator.y)
+        assert not env.collides_with_obstacle(env.prey.x, env.prey.y)
+
+    for i in range(vec.num_envs):
+        ob = vec.obstacles[i]
+        assert not overlapping(ob)
+        for p in (vec.pred_pos[i], vec.prey_pos[i]):
+            assert np.all(np.hypot(*(ob[:, :2] - p).T) >= 1.0 + ob[:, 2])
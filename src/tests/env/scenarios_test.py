@@ -0,0 +1,120 @@
+# scenario bank: seeded, memory-mapped, and replayed exactly by both environments
+import os
+
+import numpy as np
+import pytest
+
+from src.core.environment import Environment
+from src.core.io import write_atomic
+from src.core.scenarios import ScenarioBank, ScenarioSchedule
+from src.core.simulation import run_episode, run_episodes_batched
+from src.core.vec_environment import VecEnvironment
+
+
+def chase(obs):
+    return obs[0] * 2.0, obs[1] * 2.0
+
+
+def flee(obs):
+    return -obs[0] * 1.3, -obs[1] * 1.3
+
+
+@pytest.fixture
+def bank(tmp_path):
+    path = str(tmp_path / "bank.npy")
+    ScenarioBank.generate(64, seed=3).save(path)
+    return ScenarioBank.load(path)
+
+
+def test_bank_is_seeded_and_memory_mapped(bank):
+    assert isinstance(bank.data, np.memmap)
+    assert np.shares_memory(bank.obstacles, bank.data)
+    assert np.shares_memory(bank[5]["pred_pos"], bank.data)
+
+    same = ScenarioBank.generate(64, seed=3)
+    other = ScenarioBank.generate(64, seed=4)
+    assert np.array_equal(same.data, bank.data)
+    assert not np.array_equal(other.obstacles, bank.obstacles)
+
+
+def test_load_or_create_reuses_matching_bank(tmp_path):
+    path = str(tmp_path / "bank.npy")
+    first = ScenarioBank.load_or_create(path, 32, seed=1)
+    again = ScenarioBank.load_or_create(path, 32, seed=1)
+    assert np.array_equal(first.data, again.data)
+
+    # different settings regenerate the file
+    bigger = ScenarioBank.load_or_create(path, 32, seed=1, num_obstacles=5)
+    assert bigger.obstacles.shape == (32, 5, 3)
+
+
+def test_regenerating_leaves_mapped_banks_intact(tmp_path):
+    # another process holding the old bank memory-mapped keeps seeing the old file
+    path = str(tmp_path / "bank.npy")
+    mapped = ScenarioBank.load_or_create(path, 32, seed=1)
+    before = np.array(mapped.data)
+
+    ScenarioBank.load_or_create(path, 64, seed=2, num_obstacles=5)
+    assert np.array_equal(mapped.data, before)
+    assert len(ScenarioBank.load(path)) == 64
+    assert sorted(os.listdir(tmp_path)) == ["bank.json", "bank.npy"]
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / "bank.json")
+    write_atomic(path, lambda f: f.write("old"), mode="w")
+
+    def crash(f):
+        f.write("half")
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        write_atomic(path, crash, mode="w")
+    assert open(path).read() == "old"
+    assert os.listdir(tmp_path) == ["bank.json"]
+
+
+def test_environment_replays_scenario(bank):
+    env = Environment(scenarios=bank)
+    env.reset(scenario=7)
+    row = bank[7]
+
+    assert [(o.x, o.y, o.radius) for o in env.obstacles] == [tuple(ob) for ob in row["obstacles"].tolist()]
+    assert np.array_equal(env.predator.position(), row["pred_pos"])
+    assert np.array_equal(env.prey.position(), row["prey_pos"])
+
+    # same scenario -> same episode, whatever the global random state is doing
+    np.random.seed(0)
+    a = run_episode(chase, flee, env=env, T=100, scenario=7)
+    np.random.seed(99)
+    b = run_episode(chase, flee, env=env, T=100, scenario=7)
+    assert np.array_equal(a.trace, b.trace)
+
+
+def test_batched_run_matches_scalar_run(bank):
+    scenarios = np.array([3, 3, 10, 41])
+    vec = VecEnvironment(4, scenarios=bank)
+    results = run_episodes_batched(chase, flee, env=vec, T=80, scenarios=scenarios)
+
+    assert np.array_equal(results[0].trace, results[1].trace)
+    for i, r in zip(scenarios, results):
+        ep = run_episode(chase, flee, env=Environment(scenarios=bank), T=80, scenario=i)
+        assert (ep.steps, ep.captured) == (r.steps, r.captured)
+        assert np.array_equal(ep.trace["pred_pos"], r.trace["pred_pos"])
+
+
+def test_schedule_shares_scenarios_within_a_generation(bank):
+    schedule = ScenarioSchedule(bank, 5)
+    first = schedule.episode_scenarios(3)
+    second = schedule.episode_scenarios(3)
+
+    assert list(first) == [0, 1, 2, 3, 4] * 3
+    assert list(second) == [5, 6, 7, 8, 9] * 3
+    assert list(schedule.indices(12)) == [60, 61, 62, 63, 0]
+
+
+def test_world_mismatch_is_rejected(bank):
+    with pytest.raises(ValueError, match="scenario bank"):
+        Environment(num_obstacles=4, scenarios=bank)
+    with pytest.raises(ValueError, match="scenarios=ScenarioBank"):
+        Environment().reset(scenario=0)
@@ -0,0 +1,83 @@
+# the obstacle grid must give exactly the same answers as the linear scan
+import numpy as np
+
+from src.core.environment import Environment, Obstacle
+from src.core.spatial_index import ObstacleGrid
+
+
+def scan_nearest(obstacles, x, y):
+    best_i, best_d = None, float("inf")
+    for i, ob in enumerate(obstacles):
+        d = np.sqrt((ob.x - x) ** 2 + (ob.y - y) ** 2)
+        if d < best_d:
+            best_i, best_d = i, d
+    return best_i
+
+
+def scan_collides(obstacles, x, y, agent_radius):
+    return any(np.sqrt((x - ob.x) ** 2 + (y - ob.y) ** 2) < agent_radius + ob.radius
+               for ob in obstacles)
+
+
+def test_grid_matches_linear_scan():
+    rng = np.random.default_rng(0)
+    for k in (1, 3, 40, 500):
+        obstacles = [Obstacle(*rng.uniform(0, 100, size=2), rng.uniform(1, 12)) for _ in range(k)]
+        grid = ObstacleGrid(obstacles, 100, 100)
+
+        # include points slightly outside the world, like unclipped move targets
+        for x, y in rng.uniform(-5, 105, size=(500, 2)):
+            assert grid.nearest(x, y) == scan_nearest(obstacles, x, y)
+            for radius in (1.0, 5.0):
+                assert grid.collides(x, y, radius) == scan_collides(obstacles, x, y, radius)
+
+
+def test_grid_tie_break_prefers_first_obstacle():
+    obstacles = [Obstacle(60, 50, 2), Obstacle(40, 50, 2), Obstacle(50, 60, 2)]
+    grid = ObstacleGrid(obstacles, 100, 100, cell_size=5)
+    assert grid.nearest(50, 50) == 0
+
+
+def test_environment_same_with_and_without_index():
+    np.random.seed(5)
+    # 60 disks can't all fit without overlapping in 100x100, and the index has to handle overlaps
+    fast = Environment(num_obstacles=60, allow_overlap=True)
+    fast.reset()
+    slow = Environment(num_obstacles=60, spatial_index=False)
+    slow.obstacles = fast.obstacles
+    slow.predator, slow.prey = fast.predator, fast.prey
+
+    for x, y in np.random.uniform(0, 100, size=(300, 2)):
+        assert fast.collides_with_obstacle(x, y, 5.0) == slow.collides_with_obstacle(x, y, 5.0)
+        assert fast.nearest_obstacle(x, y) is slow.nearest_obstacle(x, y)
+    assert np.array_equal(fast.observe()[0], slow.observe()[0])
+
+
+def test_distance_field_within_error_bound():
+    from src.core.distance_field import ObstacleField
+
+    np.random.seed(6)
+    env = Environment(num_obstacles=8)
+    env.reset()
+
+    for resolution in (2.0, 1.0, 0.5):
+        field = ObstacleField(env.obstacles, env.width, env.height, resolution=resolution)
+        assert field.error_stats(samples=1000)["sdf_max"] <= field.error_bound + 1e-9
+
+    # finer grids track the exact directions more closely
+    coarse = ObstacleField(env.obstacles, env.width, env.height, resolution=2.0).error_stats()
+    fine = ObstacleField(env.obstacles, env.width, env.height, resolution=0.25).error_stats()
+    assert fine["dir_p95"] < coarse["dir_p95"] < 0.5
+
+
+def test_environment_field_mode_observations():
+    np.random.seed(7)
+    env = Environment(field_resolution=0.5)
+    env.reset()
+    exact = Environment()
+    exact.obstacles, exact.predator, exact.prey = env.obstacles, env.predator, env.prey
+
+    approx_obs = env.observe()[0]
+    exact_obs = exact.observe()[0]
+    assert np.allclose(approx_obs[:4], exact_obs[:4])
+    assert np.linalg.norm(approx_obs[4:] - exact_obs[4:]) < 0.1
@@ -0,0 +1,65 @@
+# checks the swarm broadphase and stepping against brute force
+import numpy as np
+
+from src.core.swarm_environment import SwarmEnvironment, capture_pairs, nearest_opponent
+from src.core.simulation import run_swarm_episode
+from src.neat_utils.dummy_controllers import pred_dummy, prey_dummy
+
+
+def brute_force_pairs(pred_pos, prey_pos, radius):
+    d = np.linalg.norm(pred_pos[:, None, :] - prey_pos[None, :, :], axis=2)
+    return set(zip(*np.nonzero(d < radius)))
+
+
+def test_capture_pairs_matches_all_pairs():
+    rng = np.random.default_rng(0)
+    for radius in (1.0, 5.0, 17.5):
+        pred = rng.uniform(0, 100, size=(120, 2))
+        prey = rng.uniform(0, 100, size=(300, 2))
+        hunters, victims = capture_pairs(pred, prey, radius)
+        assert set(zip(hunters, victims)) == brute_force_pairs(pred, prey, radius)
+        assert len(hunters) == len(set(zip(hunters, victims)))
+
+
+def test_nearest_opponent_chunks():
+    rng = np.random.default_rng(1)
+    pos = rng.uniform(0, 100, size=(50, 2))
+    other = rng.uniform(0, 100, size=(70, 2))
+    idx, dist = nearest_opponent(pos, other, chunk=7)
+    d = np.linalg.norm(pos[:, None, :] - other[None, :, :], axis=2)
+    assert np.array_equal(idx, d.argmin(axis=1))
+    assert np.allclose(dist, d.min(axis=1))
+
+
+def test_swarm_episode_runs_and_removes_captured_prey():
+    np.random.seed(3)
+    env = SwarmEnvironment(num_predators=20, num_prey=80)
+    ep = run_swarm_episode(pred_dummy, prey_dummy, env, T=100)
+
+    caught = ep.capture_step > 0
+    assert ep.kills.sum() >= caught.sum()
+    assert ep.survivors == env.prey_alive.sum()
+    assert ep.pred_trace.shape == (ep.steps, 20, 2)
+
+    # dead prey don't move after their capture step
+    for q in np.flatnonzero(caught):
+        s = ep.capture_step[q]
+        assert np.allclose(ep.prey_trace[s - 1:, q], ep.prey_trace[s - 1, q])
+
+
+def test_single_pair_matches_environment_observation():
+    from src.core.environment import Environment
+
+    np.random.seed(4)
+    env = Environment()
+    env.reset()
+
+    swarm = SwarmEnvironment(num_predators=1, num_prey=1)
+    swarm.pred_pos[0] = env.predator.x, env.predator.y
+    swarm.prey_pos[0] = env.prey.x, env.prey.y
+    swarm.obstacles[:] = [(ob.x, ob.y, ob.radius) for ob in env.obstacles]
+
+    pred_obs, prey_obs = env.observe()
+    swarm_pred, swarm_prey = swarm.observe()
+    assert np.allclose(pred_obs, swarm_pred[0])
+    assert np.allclose(prey_obs, swarm_prey[0])
@@ -31,8 +31,8 @@ def summarize_episode(ep):
     print(f"Trace length: {len(ep.trace)}")
 
     # print start and end positions (rounded)
-    start_pred, start_prey = ep.trace[0]
-    end_pred, end_prey = ep.trace[-1]
+    start_pred, start_prey = ep.trace[0]["pred_pos"], ep.trace[0]["prey_pos"]
+    end_pred, end_prey = ep.trace[-1]["pred_pos"], ep.trace[-1]["prey_pos"]
     print(f"Start (Predator): {[round(x,2) for x in start_pred]}")
     print(f"Start (Prey): {[round(x,2) for x in start_prey]}")
     print(f"End (Predator): {[round(x,2) for x in end_pred]}")
@@ -42,7 +42,7 @@ def summarize_episode(ep):
     if len(ep.trace) > 5:
         print("\nSample trajectory points:")
         for i in np.linspace(0, len(ep.trace) - 1, 5, dtype=int):
-            pred, prey = ep.trace[i]
+            pred, prey = ep.trace[i]["pred_pos"], ep.trace[i]["prey_pos"]
             print(f" Step {i:<3}: Predator {np.round(pred,1)} | Prey {np.round(prey,1)}")
 
 
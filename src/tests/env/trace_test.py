@@ -0,0 +1,46 @@
+# episode traces are preallocated structured arrays with a list-of-dicts compatible accessor
+from dataclasses import replace
+
+import numpy as np
+
+from src.core.simulation import run_episode, run_episodes_batched
+from src.core.trace import TRACE_DTYPE, trace_column
+from src.neat_utils.fitness import predator_fitness, prey_fitness_against_predator
+
+
+def as_dicts(trace):
+    # the old per-step dict format
+    return [{name: (np.array(row[name]) if row[name].shape else float(row[name]))
+             for name in TRACE_DTYPE.names} for row in trace]
+
+
+def test_trace_rows_and_columns():
+    np.random.seed(3)
+    ep = run_episode(lambda obs: (obs[0] * 2, obs[1] * 2), lambda obs: (0.5, -0.5), T=60)
+
+    assert ep.trace.dtype == TRACE_DTYPE
+    assert len(ep.trace) == ep.steps
+    assert ep.trace["pred_pos"].shape == (ep.steps, 2)
+    assert np.array_equal(ep.trace[-1]["prey_vel"], [0.5, -0.5])
+    assert ep.trace["distance"][-1] == ep.final_distance
+
+
+def test_fitness_matches_dict_trace():
+    np.random.seed(4)
+    ep = run_episode(lambda obs: (obs[0] * 2, obs[1] * 2), lambda obs: (-obs[0], -obs[1]), T=80)
+    legacy = replace(ep, trace=as_dicts(ep.trace))
+
+    assert np.array_equal(trace_column(legacy.trace, "pred_pos"), ep.trace["pred_pos"])
+    assert predator_fitness(ep) == predator_fitness(legacy)
+    assert prey_fitness_against_predator(ep) == prey_fitness_against_predator(legacy)
+
+
+def test_batched_traces_share_one_buffer():
+    np.random.seed(5)
+    results = run_episodes_batched(lambda obs: (obs[0] * 2, obs[1] * 2),
+                                   lambda obs: (0.0, 0.0), num_episodes=4, T=50)
+
+    base = results[0].trace.base
+    for r in results:
+        assert len(r.trace) == r.steps
+        assert r.trace.base is base
@@ -0,0 +1,83 @@
+# checks that the batched VecEnvironment reproduces the scalar Environment
+import numpy as np
+
+from src.core.environment import Environment
+from src.core.vec_environment import VecEnvironment
+from src.core.simulation import run_episodes_batched
+from src.neat_utils.dummy_controllers import pred_dummy, BatchedGreedyPreyDummy
+
+
+def prey_escape(obs):
+    step = -np.array([obs[0], obs[1]])
+    return step / (np.linalg.norm(step) + 1e-8) * 1.8
+
+
+def copy_into_vec(envs, vec):
+    # load several scalar environments into the rows of a VecEnvironment
+    for i, env in enumerate(envs):
+        vec.pred_pos[i] = env.predator.x, env.predator.y
+        vec.prey_pos[i] = env.prey.x, env.prey.y
+        vec.obstacles[i] = [(ob.x, ob.y, ob.radius) for ob in env.obstacles]
+    vec.steps[:] = 0
+    vec.done[:] = False
+
+
+def test_step_matches_scalar_environment():
+    np.random.seed(0)
+    envs = [Environment() for _ in range(8)]
+    for env in envs:
+        env.reset()
+
+    vec = VecEnvironment(len(envs))
+    copy_into_vec(envs, vec)
+    scalar_done = [False] * len(envs)
+
+    for _ in range(100):
+        obs = [env.observe() for env in envs]
+        vec_pred, vec_prey = vec.observe()
+
+        for i, (p, q) in enumerate(obs):
+            if vec.done[i]:
+                continue
+            assert np.allclose(p, vec_pred[i])
+            assert np.allclose(q, vec_prey[i])
+
+        a_pred = np.array([pred_dummy(p) for p, _ in obs])
+        a_prey = np.array([prey_escape(q) for _, q in obs])
+        _, info = vec.step(a_pred, a_prey)
+
+        for i, env in enumerate(envs):
+            if scalar_done[i]:
+                continue
+            _, scalar_info = env.step(a_pred[i], a_prey[i])
+            assert np.allclose(scalar_info["positions"][0], info["positions"][0][i])
+            assert np.allclose(scalar_info["positions"][1], info["positions"][1][i])
+            assert scalar_info["captured"] == info["captured"][i]
+            scalar_done[i] = scalar_info["captured"]
+
+
+def test_run_episodes_batched_results():
+    np.random.seed(1)
+    vec = VecEnvironment(16)
+    results = run_episodes_batched(pred_dummy, BatchedGreedyPreyDummy(vec), env=vec, T=150)
+
+    assert len(results) == 16
+    for ep in results:
+        assert len(ep.trace) == ep.steps
+        assert ep.captured == (ep.steps < 150 or ep.final_distance < vec.capture_radius)
+        assert np.isclose(ep.trace[-1]["distance"], ep.final_distance)
+
+
+def test_auto_reset_restarts_finished_episodes():
+    np.random.seed(2)
+    vec = VecEnvironment(4, max_steps=5, auto_reset=True)
+    vec.reset()
+    # keep every pair out of capture range so all four episodes end on the step limit
+    vec.pred_pos[:] = (20.0, 20.0)
+    vec.prey_pos[:] = (80.0, 80.0)
+
+    for _ in range(5):
+        _, info = vec.step(np.zeros((4, 2)), np.zeros((4, 2)))
+
+    assert info["done"].all()
+    assert (vec.steps == 0).all() and not vec.done.any()
@@ -1,10 +1,12 @@
 import matplotlib.pyplot as plt
 import numpy as np
 
+from src.core.trace import trace_column
+
 def plot_episode(ep, env=None, save_path=None):
     # plot predator vs prey trajectories from an episode 
-    preds = np.array([p for p, _ in ep.trace])
-    preys = np.array([q for _, q in ep.trace])
+    preds = trace_column(ep.trace, "pred_pos")
+    preys = trace_column(ep.trace, "prey_pos")
 
     plt.figure(figsize=(7, 6))
     plt.plot(preds[:, 0], preds[:, 1], '-r', label="Predator Path")
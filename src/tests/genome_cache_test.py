@@ -0,0 +1,152 @@
+# genome-keyed cache: same behaviour -> same key, LRU under a byte cap, replays skipped
+import copy
+
+import neat
+import numpy as np
+import pytest
+
+from conftest import first_genomes, id_play, weight_play
+from src.core.scenarios import ScenarioBank, ScenarioSchedule
+from src.neat_utils.genome_cache import CacheReporter, GenomeCache, LRUCache, genome_hash
+from src.neat_utils.racing import RacingEvaluator
+
+
+@pytest.fixture
+def genomes(config):
+    return first_genomes(config, 2, 6)
+
+
+class CountingPlay:
+    def __init__(self):
+        self.played = []
+
+    def __call__(self, genomes, config, scenarios, n_episodes):
+        self.played.append([gid for gid, _ in genomes])
+        return id_play(genomes, config, scenarios, n_episodes)
+
+
+def test_hash_follows_behaviour_not_identity(config, genomes):
+    genome = genomes[0][1]
+    clone = copy.deepcopy(genome)
+    clone.key = 999
+    for cg in clone.connections.values():
+        cg.innovation = None
+    assert genome_hash(clone, config) == genome_hash(genome, config)
+
+    # a disabled link's weight does not change what the network computes...
+    cg = next(iter(clone.connections.values()))
+    cg.enabled = False
+    disabled = genome_hash(clone, config)
+    cg.weight += 1.0
+    assert genome_hash(clone, config) == disabled
+
+    # ...an enabled one does
+    cg.enabled = True
+    assert genome_hash(clone, config) != genome_hash(genome, config)
+
+
+def test_lru_evicts_oldest_under_byte_cap():
+    lru = LRUCache(max_bytes=300, sizeof=lambda v: 100)
+    for k in "abc":
+        lru.put(k, k)
+    assert lru.get("a") == "a"          # a is now the most recent
+    lru.put("d", "d")
+
+    assert "b" not in lru and {"a", "c", "d"} <= set(lru._data)
+    assert lru.nbytes == 300
+    assert lru.get("b") is None
+    assert lru.take_stats() == {"hits": 1, "misses": 1, "evictions": 1, "entries": 3, "bytes": 300}
+    assert lru.take_stats()["hits"] == 0
+
+
+def test_network_compiled_once_per_distinct_genome(config, genomes):
+    cache = GenomeCache()
+    genome = genomes[0][1]
+    net = cache.network(genome, config)
+    assert cache.network(copy.deepcopy(genome), config) is net
+    assert cache.network(genomes[1][1], config) is not net
+    assert cache.networks.take_stats()["hits"] == 1
+
+
+def test_bank_scores_are_reused(config, genomes):
+    cache = GenomeCache()
+    play = CountingPlay()
+    cached = cache.wrap_play(play)
+
+    first = cached(genomes, config, np.array([3, 4]), 2)
+    assert play.played == [[gid for gid, _ in genomes]]
+
+    # elites come back with new genomes: only the new ones are played
+    newcomers = [(gid + 100, copy.deepcopy(g)) for gid, g in genomes[:2]]
+    for _, g in newcomers:
+        next(iter(g.connections.values())).weight += 0.5
+    again = cached(genomes[3:] + newcomers, config, np.array([3, 4]), 2)
+
+    assert play.played[-1] == [gid for gid, _ in newcomers]
+    assert np.array_equal(again[:3], first[3:])
+
+    # a new scenario means a new episode
+    cached(genomes[:1], config, np.array([3, 5]), 2)
+    assert play.played[-1] == [genomes[0][0]]
+
+    # random layouts are never reused
+    cached(genomes[:1], config, None, 2)
+    cached(genomes[:1], config, None, 2)
+    assert len(play.played) == 5
+
+
+@pytest.mark.parametrize("rotate", [False, True])
+def test_elites_hit_the_score_cache_on_fixed_scenarios(config, rotate):
+    # what train(..., fixed_scenarios=True) wires up: a fixed schedule and a wrapped play
+    schedule = ScenarioSchedule(ScenarioBank.generate(32, seed=0), 3, rotate=rotate)
+    cache = GenomeCache()
+    evaluator = RacingEvaluator(cache.wrap_play(weight_play), max_episodes=3, eta=2,
+                                schedule=schedule)
+    pop = neat.Population(config, seed=4)
+    reporter = CacheReporter(cache)
+    pop.add_reporter(reporter)
+    pop.run(evaluator, 3)
+
+    hits = [stats["scores"]["hits"] for stats in reporter.history]
+    if rotate:
+        assert hits == [0, 0, 0]
+    else:
+        # at least the carried-over elites replay nothing after the first generation
+        assert hits[0] == 0 and all(h >= config.reproduction_config.elitism for h in hits[1:])
+
+
+def test_wrapped_play_hashes_each_genome_once(config, genomes, monkeypatch):
+    import src.neat_utils.genome_cache as genome_cache
+    hashed = []
+
+    def counting_hash(genome, config):
+        hashed.append(genome.key)
+        return genome_hash(genome, config)
+
+    monkeypatch.setattr(genome_cache, "genome_hash", counting_hash)
+    cache = GenomeCache()
+
+    def compiling_play(genomes, config, scenarios, n_episodes):
+        # what play_episodes does through make_population_controller(..., cache=cache)
+        for _, g in genomes:
+            cache.network(g, config)
+        return np.zeros((len(genomes), n_episodes))
+
+    cache.wrap_play(compiling_play)(genomes, config, np.array([1, 2]), 2)
+    assert sorted(hashed) == sorted(gid for gid, _ in genomes)
+
+    # outside a wrapped call network() hashes for itself
+    cache.network(genomes[0][1], config)
+    assert len(hashed) == len(genomes) + 1
+
+
+def test_reporter_prints_and_resets(config, genomes, capsys):
+    cache = GenomeCache()
+    reporter = CacheReporter(cache)
+    for _ in range(2):
+        cache.network(genomes[0][1], config)
+    reporter.end_generation(config, {}, None)
+
+    assert "networks 1/2 hits" in capsys.readouterr().out
+    assert reporter.history[0]["networks"]["misses"] == 1
+    assert cache.take_stats()["networks"]["hits"] == 0
@@ -0,0 +1,71 @@
+# process-pool evaluation: compact genomes survive the trip, scores land on the right genome
+
+import neat
+import numpy as np
+import pytest
+
+from conftest import first_genomes, weight_play
+from src.neat_utils.config import CONFIG_PATH
+from src.neat_utils.genome_codec import decode_genome, encode_genome
+from src.neat_utils.parallel import ParallelEvaluator, chunk_sizes
+
+
+def toy_setup(config):
+    return {"offset": 100.0}
+
+
+@pytest.fixture(scope="module")
+def genomes(config):
+    genomes = first_genomes(config, 3, 30)
+    # grow some structure (hidden nodes, disabled links) so the codec has work to do
+    for _, g in genomes[::2]:
+        for _ in range(5):
+            g.mutate(config.genome_config)
+    return genomes
+
+
+def test_codec_round_trip(config, genomes):
+    obs = np.random.default_rng(0).normal(size=(20, 6))
+
+    for gid, genome in genomes:
+        back = decode_genome(encode_genome(genome, config), config)
+        assert back.key == genome.key
+        assert set(back.nodes) == set(genome.nodes)
+        assert set(back.connections) == set(genome.connections)
+        for key, cg in genome.connections.items():
+            assert (back.connections[key].weight, back.connections[key].enabled) == (cg.weight, cg.enabled)
+
+        a = neat.nn.FeedForwardNetwork.create(genome, config)
+        b = neat.nn.FeedForwardNetwork.create(back, config)
+        for o in obs:
+            assert a.activate(o) == b.activate(o)
+
+
+def test_chunks_shrink_and_cover_everything():
+    sizes = chunk_sizes(100, 4)
+    assert sum(sizes) == 100
+    assert sizes == sorted(sizes, reverse=True)
+    assert sizes[0] > sizes[-1] == 1
+    assert min(chunk_sizes(100, 4, min_chunk=3)[:-1]) >= 3
+
+
+def test_pool_scores_match_serial(config, genomes):
+    expected = weight_play(genomes, config, None, 3, offset=100.0)
+
+    with ParallelEvaluator(weight_play, CONFIG_PATH, setup=toy_setup, num_workers=2,
+                           n_episodes=3) as pool:
+        scores = pool.play(genomes, config)
+        assert np.allclose(scores, expected)
+
+        stats = pool.stats
+        assert stats["tasks"] == len(chunk_sizes(len(genomes), 2))
+        assert 1 <= len(stats["utilization"]) <= 2
+        assert 0.0 <= stats["mean_utilization"] <= 1.0
+        assert set(pool.cost) == {gid for gid, _ in genomes}
+
+        # scenarios fix the episode count, second call reuses the measured costs
+        scores = pool.play(genomes, config, scenarios=np.array([4, 9]))
+        assert np.allclose(scores, expected[:, :2])
+
+        pool(genomes, config)
+        assert [g.fitness for _, g in genomes] == pytest.approx(list(expected.mean(axis=1)))
@@ -0,0 +1,60 @@
+# packed population forward pass == every genome's own compiled network
+import neat
+import numpy as np
+import pytest
+
+from src.core.simulation import run_episodes_batched
+from src.core.vec_environment import VecEnvironment
+from src.neat_utils.compiled_net import CompiledNetwork
+from src.neat_utils.controllers import make_controller, make_population_controller
+from src.neat_utils.population_net import PopulationNetwork
+
+
+@pytest.fixture(scope="module")
+def genomes(config):
+    # uneven depths and widths, mixed activations, some disabled links
+    rng = np.random.default_rng(3)
+    pop = neat.Population(config, seed=11)
+    genomes = [g for _, g in list(pop.population.items())[:25]]
+    for g in genomes:
+        for _ in range(int(rng.integers(0, 25))):
+            g.mutate(config.genome_config)
+        for ng in g.nodes.values():
+            ng.activation = rng.choice(config.genome_config.activation_options)
+    return genomes
+
+
+def test_matches_per_genome_networks(config, genomes):
+    net = PopulationNetwork.create(genomes, config)
+    assert len({len(CompiledNetwork.create(g, config).layers) for g in genomes}) > 1
+
+    obs = np.random.default_rng(0).normal(scale=2.0, size=(len(genomes), 7, 6))
+    out = net.activate(obs)
+    assert out.shape == (len(genomes), 7, 2)
+
+    for g, genome in enumerate(genomes):
+        expected = CompiledNetwork.create(genome, config).activate_batch(obs[g])
+        assert np.allclose(out[g], expected, rtol=1e-12, atol=1e-12)
+
+
+def test_rejects_wrong_population_size(config, genomes):
+    net = PopulationNetwork.create(genomes[:3], config)
+    with pytest.raises(RuntimeError):
+        net.activate(np.zeros((4, 1, 6)))
+
+
+def test_generation_in_one_controller(config, genomes):
+    # same episodes as one controller per genome
+    n = 3
+    prey = make_controller(genomes[0], config, speed=1.3)
+
+    def episodes(pred):
+        np.random.seed(5)
+        return run_episodes_batched(pred, prey, env=VecEnvironment(len(genomes) * n), T=120)
+
+    packed = episodes(make_population_controller(genomes, config, n, speed=2.0))
+    single = episodes([make_controller(g, config, speed=2.0) for g in genomes for _ in range(n)])
+
+    for a, b in zip(packed, single):
+        assert (a.steps, a.captured) == (b.steps, b.captured)
+        assert np.allclose(a.trace["pred_pos"], b.trace["pred_pos"])
@@ -0,0 +1,160 @@
+# phase profiler: off by default, per-phase totals from the episode loops, worker totals
+# come back through the pool, and the reporter summarises (and cProfiles) generations
+import os
+import threading
+import time
+
+import neat
+import numpy as np
+import pytest
+
+from src.core.environment import Environment
+from src.core.profiling import profiler
+from src.core.simulation import run_episode, run_episodes_batched
+from src.core.vec_environment import VecEnvironment
+from src.neat_utils.config import load_config
+from src.neat_utils.dummy_controllers import pred_dummy, prey_dummy
+from src.neat_utils.parallel import ParallelEvaluator
+from src.neat_utils.profile_reporter import ProfileReporter, summary
+
+CONFIG_PATH = os.path.join("config", "neat_config.txt")
+
+
+@pytest.fixture(autouse=True)
+def clean_profiler():
+    profiler.disable()
+    profiler.reset()
+    yield
+    profiler.disable()
+    profiler.reset()
+
+
+def timed_play(genomes, config, scenarios, n_episodes):
+    with profiler.phase("fitness"):
+        return np.ones((len(genomes), n_episodes))
+
+
+def test_disabled_profiler_records_nothing():
+    np.random.seed(0)
+    run_episode(pred_dummy, prey_dummy, env=Environment(), T=50)
+    with profiler.phase("fitness"):
+        pass
+    assert profiler.take() == {"times": {}, "calls": {}, "counts": {}, "lengths": []}
+
+
+def test_episode_loops_time_every_phase():
+    profiler.enable()
+    np.random.seed(0)
+    ep = run_episode(pred_dummy, prey_dummy, env=Environment(), T=50)
+
+    phases = profiler.take()
+    assert set(phases["times"]) == {"controllers", "step", "observe", "obstacles", "trace"}
+    assert phases["calls"]["step"] == ep.steps
+    assert phases["counts"] == {"episodes": 1, "steps": ep.steps, "captures": int(ep.captured)}
+    assert phases["lengths"] == [ep.steps]
+    assert profiler.take()["counts"] == {}
+
+    episodes = run_episodes_batched(pred_dummy, prey_dummy, env=VecEnvironment(6), T=50)
+    counts = profiler.take()["counts"]
+    assert counts["episodes"] == 6
+    assert counts["steps"] == sum(e.steps for e in episodes)
+    assert counts["captures"] == sum(e.captured for e in episodes)
+
+
+@pytest.mark.parametrize("backend", [None, "numpy"])
+def test_obstacle_queries_are_split_out_of_step_and_observe(backend, monkeypatch):
+    # every obstacle query takes 1ms longer, which must land in "obstacles" only
+    import src.core.environment as environment
+    import src.core.kernels as kernels
+
+    def slow(fn):
+        def wrapped(*args, **kwargs):
+            time.sleep(0.001)
+            return fn(*args, **kwargs)
+        return wrapped
+
+    monkeypatch.setattr(environment.Environment, "collides_with_obstacle",
+                        slow(environment.Environment.collides_with_obstacle))
+    monkeypatch.setattr(environment.Environment, "_obstacle_dir",
+                        slow(environment.Environment._obstacle_dir))
+    monkeypatch.setattr(kernels, "collides", slow(kernels.collides))
+    monkeypatch.setattr(kernels, "nearest_obstacle_dirs", slow(kernels.nearest_obstacle_dirs))
+
+    profiler.enable()
+    np.random.seed(0)
+    ep = run_episode(pred_dummy, prey_dummy, env=Environment(backend=backend), T=20)
+    times = profiler.take()["times"]
+    assert times["obstacles"] > 4 * 0.001 * ep.steps
+    assert times["step"] < times["obstacles"] / 4 and times["observe"] < times["obstacles"] / 4
+
+    episodes = run_episodes_batched(pred_dummy, prey_dummy, env=VecEnvironment(4), T=20)
+    times = profiler.take()["times"]
+    assert times["obstacles"] > 4 * 0.001 * max(e.steps for e in episodes)
+    assert times["step"] < times["obstacles"] / 4
+
+
+def test_merges_from_other_threads_are_not_lost():
+    snapshot = {"times": {"fitness": 1.0}, "calls": {"fitness": 1},
+                "counts": {"episodes": 1}, "lengths": [5]}
+
+    def merge():
+        for _ in range(2000):
+            profiler.merge(snapshot)
+
+    threads = [threading.Thread(target=merge) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for _ in range(2000):
+        profiler.add("fitness", 1.0)
+    for thread in threads:
+        thread.join()
+
+    phases = profiler.take()
+    assert phases["calls"]["fitness"] == 10000 and phases["times"]["fitness"] == 10000.0
+    assert phases["counts"]["episodes"] == 8000 and len(phases["lengths"]) == 8000
+
+
+def test_worker_phases_are_merged_into_the_parent():
+    config = load_config(CONFIG_PATH)
+    genomes = list(neat.Population(config, seed=1).population.items())[:12]
+
+    profiler.enable()
+    with ParallelEvaluator(timed_play, CONFIG_PATH, num_workers=2, n_episodes=2, min_chunk=3) as pool:
+        pool.play(genomes, config)
+        chunks = pool.stats["tasks"]
+    assert profiler.take()["calls"]["fitness"] == chunks
+
+
+def test_reporter_summarises_generations_and_dumps_one_profile(tmp_path):
+    config = load_config(CONFIG_PATH)
+    pop = neat.Population(config, seed=2)
+    reporter = ProfileReporter(profile_generation=1, profile_dir=str(tmp_path), verbose=False)
+    pop.add_reporter(reporter)
+    assert profiler.enabled
+
+    def evaluate(genomes, config):
+        np.random.seed(0)
+        run_episode(pred_dummy, prey_dummy, env=Environment(), T=20)
+        for _, genome in genomes:
+            genome.fitness = timed_play([None], config, None, 1)[0, 0]
+
+    pop.run(evaluate, 3)
+
+    assert [r["generation"] for r in reporter.history] == [0, 1, 2]
+    assert all(r["counts"]["episodes"] == 1 and r["calls"]["fitness"] == config.pop_size
+               for r in reporter.history)
+    assert os.listdir(tmp_path) == ["gen-000001.prof"]
+    line = summary(reporter.history[0])
+    assert "controllers" in line and "1 episodes" in line
+
+
+def test_reporter_puts_the_profiler_back_when_closed(tmp_path):
+    reporter = ProfileReporter(profile_dir=str(tmp_path), verbose=False)
+    assert profiler.enabled
+    reporter.close()
+    assert not profiler.enabled
+
+    # a profiler someone else switched on stays on
+    profiler.enable()
+    ProfileReporter(profile_dir=str(tmp_path), verbose=False).close()
+    assert profiler.enabled
@@ -0,0 +1,131 @@
+# racing evaluation: fewer episodes, same winners, every genome scored
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.neat_utils.racing import RacingEvaluator, ranked_fitness
+
+
+class NoisyPlay:
+    # genome i has true fitness quality[i]; each episode adds gaussian noise
+    def __init__(self, quality, noise, seed=0):
+        self.quality = quality
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.calls = []
+
+    def __call__(self, genomes, config, scenarios, n_episodes):
+        self.calls.append((len(genomes), n_episodes))
+        q = np.array([self.quality[gid] for gid, _ in genomes])
+        return q[:, None] + self.rng.normal(0, self.noise, size=(len(genomes), n_episodes))
+
+
+def population(n):
+    return [(i, SimpleNamespace(fitness=None)) for i in range(n)]
+
+
+def test_racing_cuts_episodes_and_keeps_the_top():
+    quality = np.linspace(0, 100, 100)
+    play = NoisyPlay(quality, noise=10.0)
+    racing = RacingEvaluator(play, max_episodes=5)
+
+    for _ in range(3):
+        genomes = population(100)
+        racing(genomes, None)
+
+    stats = racing.stats
+    assert stats["budget"] / stats["episodes"] >= 2.0
+    assert stats["genomes_per_round"][0] == 100
+
+    # every genome has a fitness and the best genomes played the full budget
+    fitness = np.array([g.fitness for _, g in genomes])
+    assert not np.isnan(fitness).any()
+    assert set(np.argsort(fitness)[-10:]) <= set(range(75, 100))
+
+
+def test_noise_free_race_matches_full_evaluation_order():
+    quality = np.random.default_rng(1).uniform(0, 50, size=40)
+    racing = RacingEvaluator(NoisyPlay(quality, noise=1e-9), max_episodes=4, top_fraction=0.25)
+    genomes = population(40)
+    racing(genomes, None)
+
+    fitness = np.array([g.fitness for _, g in genomes])
+    assert np.array_equal(np.argsort(fitness)[-10:], np.argsort(quality)[-10:])
+
+
+def test_rounds_follow_min_episodes_and_round_size():
+    play = NoisyPlay(np.zeros(10), noise=1.0)
+    RacingEvaluator(play, max_episodes=6, min_episodes=2, round_size=2)(population(10), None)
+    assert [n for _, n in play.calls] == [2, 2, 2]
+
+
+def test_schedule_slots_are_passed_to_play():
+    seen = []
+
+    def play(genomes, config, scenarios, n_episodes):
+        seen.append(list(scenarios))
+        return np.zeros((len(genomes), n_episodes))
+
+    schedule = SimpleNamespace(per_generation=3, next=lambda: np.array([7, 8, 9]))
+    RacingEvaluator(play, max_episodes=3, schedule=schedule)(population(4), None)
+    assert seen == [[7], [8], [9]]
+
+    with pytest.raises(ValueError):
+        RacingEvaluator(play, max_episodes=5, schedule=schedule)
+
+
+def test_halving_caps_survivors_per_round():
+    # heavy noise: the bounds alone keep almost everyone, eta still halves the field
+    play = NoisyPlay(np.linspace(0, 1, 64), noise=50.0)
+    racing = RacingEvaluator(play, max_episodes=5, eta=2, top_fraction=0.1)
+    racing(population(64), None)
+
+    assert racing.stats["genomes_per_round"] == [64, 32, 16, 8, 7]
+    # ...and it is the cap, not the bound, that makes nearly all the cuts
+    assert sum(racing.stats["cut_by_cap"]) > 3 * sum(racing.stats["cut_by_bound"])
+
+
+def test_bound_cuts_when_noise_is_low():
+    # once the noise level is known (from the previous generation) the bound does the
+    # cutting and the eta cap is never reached
+    play = NoisyPlay(np.linspace(0, 100, 64), noise=1.0)
+    racing = RacingEvaluator(play, max_episodes=5, eta=2, top_fraction=0.1)
+    for _ in range(2):
+        racing(population(64), None)
+    assert sum(racing.stats["cut_by_cap"]) == 0
+    assert racing.stats["cut_by_bound"][0] > 32
+
+
+def test_pruned_genomes_rank_below_survivors():
+    # the first scenario is easy for everybody, the rest are hard: a weak genome cut
+    # after the easy one must not outrank the survivors that played the hard ones
+    difficulty = np.array([100.0, -100.0, -100.0, -100.0, -100.0])
+    quality = np.linspace(0, 50, 20)
+
+    def play(genomes, config, scenarios, n_episodes):
+        q = np.array([quality[gid] for gid, _ in genomes])
+        return q[:, None] + difficulty[scenarios]
+
+    schedule = SimpleNamespace(per_generation=5, next=lambda: np.arange(5))
+    genomes = population(20)
+    racing = RacingEvaluator(play, max_episodes=5, eta=2, schedule=schedule)
+    racing(genomes, None)
+
+    fitness = np.array([g.fitness for _, g in genomes])
+    assert np.array_equal(np.argsort(fitness), np.arange(20))
+    assert racing.stats["genomes_per_round"][-1] < 20
+
+
+def test_ranked_fitness_keeps_order_within_a_round():
+    nan = np.nan
+    scores = np.array([[1.0, 1.0, 1.0],
+                       [9.0, nan, nan],
+                       [5.0, 0.0, nan],
+                       [3.0, nan, nan],
+                       [0.0, 0.5, 0.5]])
+    fitness = ranked_fitness(scores)
+    assert list(np.argsort(fitness)[::-1]) == [0, 4, 2, 1, 3]
+    # full-budget genomes keep their plain mean
+    assert fitness[0] == 1.0 and fitness[4] == pytest.approx(1 / 3)
+    assert fitness[1] - fitness[3] == pytest.approx(6.0)
@@ -0,0 +1,119 @@
+# model registry: pickle-free round trip, versions and tags, one controller per process
+import copy
+import multiprocessing
+import os
+import pickle
+
+import neat
+import numpy as np
+import pytest
+
+from conftest import first_genomes
+from src.neat_utils.config import load_config
+from src.neat_utils.controllers import make_controller
+from src.neat_utils.registry import ModelRegistry, RegistryError, load_genome, registry
+
+
+@pytest.fixture
+def genomes(config):
+    genomes = [g for _, g in first_genomes(config, 4, 3)]
+    for i, g in enumerate(genomes):
+        for _ in range(6):
+            g.mutate(config.genome_config)
+        g.fitness = 10.0 * i
+    return genomes
+
+
+def same_outputs(a, b, config):
+    obs = np.random.default_rng(0).normal(size=(8, 6))
+    na = neat.nn.FeedForwardNetwork.create(a, config)
+    nb = neat.nn.FeedForwardNetwork.create(b, config)
+    return all(na.activate(o) == nb.activate(o) for o in obs)
+
+
+def test_versions_tags_and_cached_controllers(tmp_path, config, genomes):
+    reg = ModelRegistry(str(tmp_path), config)
+    assert reg.save("prey", genomes[0], config) == "v0001"
+    assert reg.save("prey", genomes[1], config, tags=("best", "candidate")) == "v0002"
+
+    assert reg.resolve("prey", "best") == "v0002"
+    assert reg.meta("prey", "v0001")["fitness"] == 0.0
+
+    # a fresh registry (another process) reads the same index lazily
+    other = ModelRegistry(str(tmp_path), config)
+    assert other.versions("prey") == ["v0001", "v0002"]
+    assert same_outputs(other.genome("prey", "best"), genomes[1], config)
+    assert other.genome("prey", "v0001").fitness == 0.0
+
+    ctrl = other.get("prey", "best")
+    assert other.get("prey", "candidate") is ctrl
+    assert ctrl.speed == 1.3
+    assert other.get("prey", "best", speed=2.0) is not ctrl
+
+    with pytest.raises(RegistryError):
+        other.get("prey", "worst")
+    with pytest.raises(RegistryError):
+        other.get("octopus")
+
+
+def test_artifacts_load_without_pickle_under_reordered_options(tmp_path, config, genomes):
+    reg = ModelRegistry(str(tmp_path), config)
+    reg.save("predator", genomes[2], config)
+    path = reg.path("predator")
+
+    with np.load(path, allow_pickle=False) as f:
+        assert set(f.files) >= {"nodes", "conns", "activation_options"}
+
+    shuffled = copy.deepcopy(config)
+    shuffled.genome_config.activation_options = list(reversed(config.genome_config.activation_options))
+    back = load_genome(path, shuffled)
+    assert {k: n.activation for k, n in back.nodes.items()} == \
+           {k: n.activation for k, n in genomes[2].nodes.items()}
+
+
+def test_committed_models_match_the_old_pickles(config):
+    pickles = {
+        "predator": "results/predator_training/best_predator.pkl",
+        "prey": "results/prey_training/best_prey.pkl",
+        "predator_vs_prey": "results/pred_against_prey/best_predator_vs_prey.pkl",
+    }
+    obs = np.random.default_rng(1).normal(size=(32, 6))
+
+    for role, path in pickles.items():
+        with open(path, "rb") as f:
+            old = make_controller(pickle.load(f), config, speed=2.0)
+        new = registry.get(role, "best", speed=2.0)
+        assert np.array_equal(new(obs), old(obs))
+
+
+def _save_many(root, seed, n):
+    config = load_config()
+    genome = first_genomes(config, seed, 1)[0][1]
+    reg = ModelRegistry(root, config)
+    for _ in range(n):
+        reg.save("prey", genome, config, worker=seed)
+
+
+def test_concurrent_saves_keep_every_version(tmp_path, config, genomes):
+    # two registries that read the index before either saved
+    a, b = ModelRegistry(str(tmp_path), config), ModelRegistry(str(tmp_path), config)
+    assert a.roles() == b.roles() == []
+    a.save("prey", genomes[0], config)
+    b.save("prey", genomes[1], config)
+    assert ModelRegistry(str(tmp_path), config).versions("prey") == ["v0001", "v0002"]
+
+    # trainers in separate processes
+    procs = [multiprocessing.Process(target=_save_many, args=(str(tmp_path), seed, 5))
+             for seed in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+
+    reg = ModelRegistry(str(tmp_path), config)
+    assert len(reg.versions("prey")) == 2 + 3 * 5
+    assert sorted(reg.meta("prey", v).get("worker") for v in reg.versions("prey")[2:]) == \
+           sorted([0, 1, 2] * 5)
+    assert all(os.path.exists(reg.path("prey", v)) for v in reg.versions("prey"))
+    assert not [n for n in os.listdir(tmp_path) if ".tmp" in n]
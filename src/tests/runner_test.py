@@ -0,0 +1,45 @@
+# training runner: a resumed run that already played every generation is not trained
+# or saved again
+import os
+
+import numpy as np
+import pytest
+
+from conftest import weight_sum
+from src.neat_utils.registry import ModelRegistry
+from src.training import runner
+from src.training.runner import TrainingSpec, train
+
+
+def play(genomes, config, scenarios, n_episodes, bank=None, cache=None):
+    return np.array([[weight_sum(g)] * n_episodes for _, g in genomes])
+
+
+def setup(config, bank_path=None):
+    return {}
+
+
+def failing_play(genomes, config, scenarios, n_episodes, bank=None, cache=None):
+    raise AssertionError("a finished run played an episode")
+
+
+@pytest.fixture
+def spec(tmp_path, monkeypatch):
+    # every results/ path of the run (checkpoints, scenario bank, registry) under tmp_path
+    monkeypatch.setattr(runner, "CONFIG_PATH", os.path.abspath(runner.CONFIG_PATH))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(runner, "registry", ModelRegistry(str(tmp_path / "models")))
+    return TrainingSpec(name="test", role="prey", play=play, worker_setup=setup, title="test",
+                        curve_path=str(tmp_path / "curve.png"), n_episodes=2, generations=2,
+                        scenario_params={"num_scenarios": 16})
+
+
+@pytest.mark.parametrize("steady_state", [False, True])
+def test_finished_run_returns_its_registered_winner(spec, steady_state):
+    winner, version = train(spec)
+    assert version == "v0001"
+
+    spec.play = failing_play
+    again, same = train(spec, resume=True, steady_state=steady_state)
+    assert same == "v0001" and again.key == winner.key
+    assert runner.registry.versions("prey") == ["v0001"]
@@ -0,0 +1,94 @@
+# steady-state evolution: population stays at pop_size, reporters see generations, it selects
+import neat
+import numpy as np
+
+from conftest import weight_play
+from src.core.scenarios import ScenarioBank, ScenarioSchedule
+from src.neat_utils.config import CONFIG_PATH
+from src.neat_utils.parallel import ParallelEvaluator
+from src.neat_utils.steady_state import SteadyStateEvolution
+
+
+class CountingReporter(neat.reporting.BaseReporter):
+
+    def __init__(self):
+        self.calls = {"start": 0, "post": 0, "end": 0}
+        self.sizes = []
+
+    def start_generation(self, generation):
+        self.calls["start"] += 1
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.calls["post"] += 1
+        self.sizes.append(len(population))
+
+    def end_generation(self, config, population, species_set):
+        self.calls["end"] += 1
+
+
+def test_steady_state_keeps_population_and_reports_generations(config):
+    pop = neat.Population(config, seed=4)
+    reporter = CountingReporter()
+    pop.add_reporter(reporter)
+    first = np.mean(weight_play(list(pop.population.items()), config, None, 2))
+
+    evolution = SteadyStateEvolution(pop, weight_play, n_episodes=2)
+    best = evolution.run(5)
+
+    assert pop.generation == 5
+    assert reporter.calls["post"] == reporter.calls["end"] == 5
+    assert reporter.sizes == [config.pop_size] * 5
+    assert len(pop.population) == config.pop_size
+    assert all(g.fitness is not None for g in pop.population.values())
+    assert evolution.stats["evaluations"] >= 5 * config.pop_size
+
+    # every genome is in exactly one species
+    members = [gid for s in pop.species.species.values() for gid in s.members]
+    assert sorted(members) == sorted(pop.population)
+
+    last = np.mean([g.fitness for g in pop.population.values()])
+    assert last > first
+    assert best.fitness == max(g.fitness for g in pop.population.values())
+
+
+def test_steady_state_on_a_process_pool(config):
+    pop = neat.Population(config, seed=5)
+    with ParallelEvaluator(weight_play, CONFIG_PATH, num_workers=2, n_episodes=1) as pool:
+        evolution = SteadyStateEvolution(pop, pool, n_episodes=1, batch_size=5)
+        evolution.run(2)
+
+    assert pop.generation == 2
+    assert len(pop.population) == config.pop_size
+    assert evolution.max_in_flight == 4
+    assert sum(evolution.stats["busy"].values()) > 0
+
+
+def block_play(genomes, config, scenarios, n_episodes):
+    # every scenario block scores in its own band of thousands
+    return weight_play(genomes, config, scenarios, n_episodes) + 1000.0 * scenarios.min()
+
+
+def test_only_genomes_scored_on_the_same_block_compete(config, tmp_path):
+    path = str(tmp_path / "bank.npy")
+    ScenarioBank.generate(16, seed=2).save(path)
+    pop = neat.Population(config, seed=6)
+    evolution = SteadyStateEvolution(pop, block_play, schedule=ScenarioSchedule(ScenarioBank.load(path), 2),
+                                     n_episodes=2, batch_size=5)
+
+    bands = []
+    cull = evolution._cull
+
+    def checked_cull():
+        before = len(evolution.population)
+        cull()
+        if len(evolution.population) < before:
+            bands.append({round(g.fitness / 1000) for g in evolution.population.values()})
+
+    evolution._cull = checked_cull
+    evolution.run(3)
+
+    assert len(bands) > 3
+    assert all(len(b) == 1 for b in bands)
+    # the bands move on with the schedule, and the survivors are played again each time
+    assert len(set().union(*bands)) >= 2
+    assert evolution.stats["rescored"] >= 2 * config.pop_size - evolution.max_in_flight * 5
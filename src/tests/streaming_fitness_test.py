@@ -0,0 +1,50 @@
+# streaming fitness accumulators must give the same scores as the trace-based functions
+import numpy as np
+import pytest
+
+from src.core.simulation import run_episode
+from src.neat_utils.fitness import (PredatorFitnessAccumulator, PreyFitnessAccumulator,
+                                    predator_fitness, prey_fitness_against_predator)
+
+
+def chaser(obs):
+    return obs[0] * 2.0, obs[1] * 2.0
+
+
+def wanderer(obs):
+    return -obs[0] * 1.3 + 0.3, -obs[1] * 1.3
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_accumulators_match_trace_fitness(seed):
+    np.random.seed(seed)
+    pred_acc, prey_acc = PredatorFitnessAccumulator(), PreyFitnessAccumulator()
+    ep = run_episode(chaser, wanderer, T=120, accumulators=(pred_acc, prey_acc))
+
+    assert pred_acc.fitness(ep) == pytest.approx(predator_fitness(ep), rel=1e-9, abs=1e-9)
+    assert prey_acc.fitness(ep) == pytest.approx(prey_fitness_against_predator(ep), rel=1e-9)
+
+
+def test_no_capture_branch_matches():
+    # the predator backs off into the walls, exercising the runaway and wall terms
+    np.random.seed(1)
+    pred_acc, prey_acc = PredatorFitnessAccumulator(), PreyFitnessAccumulator()
+    ep = run_episode(lambda obs: (-obs[0], 0.4 - obs[1]), lambda obs: (0.5, 0.2), T=150,
+                     accumulators=(pred_acc, prey_acc))
+
+    assert not ep.captured
+    assert pred_acc.fitness(ep) == pytest.approx(predator_fitness(ep), rel=1e-9)
+    assert prey_acc.fitness(ep) == pytest.approx(prey_fitness_against_predator(ep), rel=1e-9)
+
+
+def test_record_trace_false_keeps_results():
+    np.random.seed(2)
+    full = run_episode(chaser, wanderer, T=100)
+    np.random.seed(2)
+    acc = PredatorFitnessAccumulator()
+    bare = run_episode(chaser, wanderer, T=100, record_trace=False, accumulators=[acc])
+
+    assert bare.trace is None
+    assert (bare.steps, bare.captured, bare.final_distance) == \
+        (full.steps, full.captured, full.final_distance)
+    assert acc.fitness(bare) == pytest.approx(predator_fitness(full), rel=1e-9)
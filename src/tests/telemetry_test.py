@@ -0,0 +1,136 @@
+# telemetry reporter: one JSONL record per generation with throughput, episode lengths,
+# memory and (with a pool) per-worker busy time
+import multiprocessing
+import os
+import tracemalloc
+
+import neat
+import numpy as np
+import pytest
+
+from src.core.environment import Environment
+from src.core.profiling import profiler
+from src.core.simulation import run_episode
+from src.neat_utils.config import load_config
+from src.neat_utils.distributed import Coordinator, run_worker
+from src.neat_utils.dummy_controllers import pred_dummy, prey_dummy
+from src.neat_utils.parallel import ParallelEvaluator
+from src.neat_utils.telemetry import TelemetryReporter, load_telemetry
+
+CONFIG_PATH = os.path.join("config", "neat_config.txt")
+
+
+@pytest.fixture(autouse=True)
+def clean_profiler():
+    yield
+    profiler.disable()
+    profiler.reset()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def episode_play(genomes, config, scenarios, n_episodes):
+    # one short dummy episode per genome and episode
+    scores = np.zeros((len(genomes), n_episodes))
+    env = Environment()
+    for i, (gid, _) in enumerate(genomes):
+        np.random.seed(gid)
+        for j in range(n_episodes):
+            scores[i, j] = run_episode(pred_dummy, prey_dummy, env=env, T=30).steps
+    return scores
+
+
+def evaluate(genomes, config):
+    genomes = list(genomes)
+    for (_, genome), row in zip(genomes, episode_play(genomes, config, None, 1)):
+        genome.fitness = float(row.mean())
+
+
+def test_one_record_per_generation(tmp_path):
+    path = str(tmp_path / "telemetry" / "run.jsonl")
+    config = load_config(CONFIG_PATH)
+    pop = neat.Population(config, seed=1)
+    pop.add_reporter(neat.StatisticsReporter())
+    telemetry = TelemetryReporter(path, tracemalloc_top=5)
+    pop.add_reporter(telemetry)
+    pop.run(evaluate, 3)
+    telemetry.close()
+    assert not profiler.enabled
+
+    records = load_telemetry(path)
+    assert [r["generation"] for r in records] == [0, 1, 2]
+    for r in records:
+        assert r["run"] == telemetry.run_id
+        assert r["episodes"] == config.pop_size
+        assert 0 < r["steps"] <= 30 * config.pop_size
+        assert r["steps_per_sec"] > r["episodes_per_sec"] > 0
+        lengths = r["episode_length"]
+        assert lengths["p10"] <= lengths["p50"] <= lengths["p90"] <= lengths["p99"] <= lengths["max"] <= 30
+        assert 0.0 <= r["capture_rate"] <= 1.0
+        assert r["peak_rss_mb"] > 0 and r["gc_objects"] > 0
+        assert "workers" not in r
+        assert 0 < len(r["tracemalloc"]["top"]) <= 5
+
+
+
+def test_a_new_run_starts_the_file_over_and_a_resumed_one_continues_it(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    config = load_config(CONFIG_PATH)
+
+    def session(**kwargs):
+        pop = neat.Population(config, seed=1)
+        telemetry = TelemetryReporter(path, **kwargs)
+        pop.add_reporter(telemetry)
+        pop.run(evaluate, 2)
+        telemetry.close()
+        return telemetry.run_id
+
+    first = session(run_id="first")
+    assert session(resume=True) == first
+    assert [r["run"] for r in load_telemetry(path)] == [first] * 4
+
+    second = session()
+    assert second != first
+    assert [r["run"] for r in load_telemetry(path)] == [second] * 2
+
+
+def test_worker_busy_time_with_a_pool(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    config = load_config(CONFIG_PATH)
+    pop = neat.Population(config, seed=2)
+    telemetry = TelemetryReporter(path)
+    pop.add_reporter(telemetry)
+
+    # the reporter switches the profiler on before the workers start, so they count too
+    with ParallelEvaluator(episode_play, CONFIG_PATH, num_workers=2, n_episodes=1) as pool:
+        telemetry.pool = pool
+        pop.run(pool, 2)
+
+    for r in load_telemetry(path):
+        assert r["episodes"] == config.pop_size
+        assert 1 <= len(r["workers"]) <= 2
+        assert sum(w["busy"] for w in r["workers"].values()) > 0
+        assert all(0 <= w["utilization"] <= 1 for w in r["workers"].values())
+
+
+def test_remote_workers_episodes_are_counted(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    config = load_config(CONFIG_PATH)
+    pop = neat.Population(config, seed=3)
+    telemetry = TelemetryReporter(path)
+    pop.add_reporter(telemetry)
+
+    # the profiler is on as the worker joins, so its totals come back with each chunk
+    with Coordinator(("127.0.0.1", 0), b"test-key", n_episodes=2) as pool:
+        worker = multiprocessing.Process(target=run_worker, args=(pool.address, b"test-key", episode_play),
+                                         kwargs={"name": "remote"}, daemon=True)
+        worker.start()
+        pool.wait_for_workers(1, timeout=30)
+        telemetry.pool = pool
+        pop.run(pool, 2)
+    worker.join(timeout=30)
+
+    for r in load_telemetry(path):
+        assert r["episodes"] == 2 * config.pop_size
+        assert 0 < r["steps"] <= 30 * r["episodes"]
+        assert set(r["workers"]) == {"remote"}
@@ -0,0 +1,355 @@
+# integrated coevolution: predators and prey evolve side by side
+# the "train predators -> train prey -> add champions to the hall of fame -> repeat"
+# cycle from Resources/notes.md, without restarting either population between rounds
+#
+#   python -m src.training.coevolution --rounds 10 --generations 3 --workers 0
+#
+# every generation both populations are scored from one batch of episodes:
+#   - shared episodes: a current predator against a current prey. one trace gives the
+#     predator's and the prey's fitness, so each episode does the work of two
+#   - hall-of-fame episodes: every genome also meets a few champions of earlier rounds
+#     (scored for the current genome only)
+# at the end of each round both sides' champions join their hall of fame
+#
+# the hall-of-fame cost stays flat as the hall grows: only hof_opponents champions are
+# drawn per generation (favouring those whose games are still split). champions are met
+# on the generation's scenarios from the schedule, like the shared episodes: every
+# genome faces a champion on the same layouts (common random numbers), and the layouts
+# move on every generation, so beating a champion on one fixed layout earns nothing
+import argparse
+import os
+from functools import partial
+
+import neat
+import numpy as np
+
+from src.core.vec_environment import VecEnvironment
+from src.core.simulation import run_episodes_batched
+from src.core.scenarios import ScenarioBank, training_schedule
+from src.core.trace import stack_traces
+from src.neat_utils.config import CONFIG_PATH, load_config
+from src.neat_utils.controllers import IndexedPopulationController
+from src.neat_utils.fitness import predator_fitness_batch, prey_fitness_against_predator_batch
+from src.neat_utils.genome_cache import GenomeCache
+from src.neat_utils.genome_codec import decode_genome, encode_genome
+from src.neat_utils.hall_of_fame import HallOfFame
+from src.neat_utils.parallel import ParallelEvaluator, chunk_sizes
+from src.neat_utils.population_net import PopulationNetwork
+from src.neat_utils.registry import ROLE_SPEEDS, registry
+
+N_EPISODES = 5       # shared episodes per genome against the current opponents
+HOF_EPISODES = 1     # episodes per genome against each drawn hall-of-fame champion
+MAX_STEPS = 500
+
+
+def schedule_matches(num_pred, num_prey, scenarios, n_episodes=N_EPISODES, rng=None,
+                     hof_pred=None, hof_prey=None):
+    # one generation's episodes as parallel arrays:
+    #   pred, prey   index into (current genomes + hall-of-fame genomes) of each side
+    #   scenario     bank scenario of the episode
+    #   score_pred, score_prey   whether the episode counts towards that side's fitness
+    # shared episodes come in n_episodes rounds of random pairings; in every round each
+    # genome of the larger population plays once and the smaller one's spread evenly.
+    # hof_pred / hof_prey: (champions, episodes) scenarios of the drawn champions - every
+    # current genome of the other side plays each champion on each of its scenarios
+    rng = np.random.default_rng() if rng is None else rng
+    scenarios = np.asarray(scenarios)
+    size = max(num_pred, num_prey)
+
+    def rounds(num):
+        return np.concatenate([rng.permutation(np.resize(np.arange(num), size))
+                               for _ in range(n_episodes)])
+
+    shared = size * n_episodes
+    pred = [rounds(num_pred)]
+    prey = [rounds(num_prey)]
+    scenario = [np.repeat(scenarios[np.arange(n_episodes) % len(scenarios)], size)]
+    score_pred = [np.ones(shared, dtype=bool)]
+    score_prey = [np.ones(shared, dtype=bool)]
+
+    def against(num, champion_scenarios):
+        # (own index, champion index, scenario) for every genome x champion x episode
+        champion_scenarios = np.asarray(champion_scenarios).reshape(len(champion_scenarios), -1)
+        h, k = champion_scenarios.shape
+        own = np.repeat(np.arange(num), h * k)
+        champion = np.tile(np.repeat(np.arange(h), k), num)
+        return own, champion, np.tile(champion_scenarios.ravel(), num)
+
+    # hall-of-fame genomes come after the current ones in each side's list
+    if hof_prey is not None and len(hof_prey):
+        own, champion, sc = against(num_pred, hof_prey)
+        pred.append(own)
+        prey.append(num_prey + champion)
+        scenario.append(sc)
+        score_pred.append(np.ones(len(own), dtype=bool))
+        score_prey.append(np.zeros(len(own), dtype=bool))
+    if hof_pred is not None and len(hof_pred):
+        own, champion, sc = against(num_prey, hof_pred)
+        pred.append(num_pred + champion)
+        prey.append(own)
+        scenario.append(sc)
+        score_pred.append(np.zeros(len(own), dtype=bool))
+        score_prey.append(np.ones(len(own), dtype=bool))
+
+    return {
+        "pred": np.concatenate(pred),
+        "prey": np.concatenate(prey),
+        "scenario": np.concatenate(scenario),
+        "score_pred": np.concatenate(score_pred),
+        "score_prey": np.concatenate(score_prey),
+    }
+
+
+def play_matches(pred_nets, prey_nets, matches, bank=None, T=MAX_STEPS):
+    # plays every scheduled episode in one lockstep batch with the given compiled
+    # networks -> (predator fitness, prey fitness, captured) per episode
+    n = len(matches["pred"])
+    env = VecEnvironment(n, scenarios=bank)
+
+    pred_ctrl = IndexedPopulationController(PopulationNetwork.from_networks(pred_nets),
+                                            matches["pred"], speed=ROLE_SPEEDS["predator"])
+    prey_ctrl = IndexedPopulationController(PopulationNetwork.from_networks(prey_nets),
+                                            matches["prey"], speed=ROLE_SPEEDS["prey"])
+
+    episodes = run_episodes_batched(pred_ctrl, prey_ctrl, env=env, T=T,
+                                    scenarios=None if bank is None else matches["scenario"])
+
+    trace, steps = stack_traces([ep.trace for ep in episodes])
+    captured = np.array([ep.captured for ep in episodes], dtype=bool)
+    return (predator_fitness_batch(trace, steps, captured),
+            prey_fitness_against_predator_batch(trace, steps, captured),
+            captured)
+
+
+def _match_task(idx, pred_genomes, prey_genomes, matches, config):
+    # a chunk of episodes with only the genomes it needs, re-indexed, as codec arrays
+    pred_used, pred_local = np.unique(matches["pred"][idx], return_inverse=True)
+    prey_used, prey_local = np.unique(matches["prey"][idx], return_inverse=True)
+    return (idx,
+            [encode_genome(pred_genomes[i], config) for i in pred_used],
+            [encode_genome(prey_genomes[i], config) for i in prey_used],
+            {"pred": pred_local, "prey": prey_local, "scenario": matches["scenario"][idx]})
+
+
+def play_match_chunk(task, config, bank=None, cache=None, T=MAX_STEPS):
+    # ParallelEvaluator.map worker function. the worker's cache keeps compiled networks
+    # by genome hash, so hall-of-fame champions are compiled once per worker
+    idx, preds, prey, matches = task
+    cache = GenomeCache() if cache is None else cache
+    scores = play_matches([cache.network(decode_genome(d, config), config) for d in preds],
+                          [cache.network(decode_genome(d, config), config) for d in prey],
+                          matches, bank=bank, T=T)
+    return idx, scores
+
+
+def worker_setup(config, bank_path=None, T=MAX_STEPS):
+    # play_match_chunk context for a worker process, loaded once when the worker starts
+    return {
+        "bank": None if bank_path is None else ScenarioBank.load(bank_path),
+        "cache": GenomeCache(),
+        "T": T,
+    }
+
+
+def _already_scored(genomes, config):
+    # fitness function for Population.run: the joint evaluation has already run
+    pass
+
+
+def _record_games(champions, champion_of_row, rows, captured):
+    if champions:
+        idx = champion_of_row[rows]
+        games = np.bincount(idx, minlength=len(champions))
+        captures = np.bincount(idx, weights=captured[rows], minlength=len(champions))
+        for c, k, n in zip(champions, captures, games):
+            c.record(k, n)
+
+
+def _mean_by(index, values, n):
+    counts = np.bincount(index, minlength=n)[:n]
+    return np.bincount(index, weights=values, minlength=n)[:n] / np.maximum(counts, 1)
+
+
+class Coevolution:
+
+    def __init__(self, config_path=CONFIG_PATH, n_episodes=N_EPISODES, hof_episodes=HOF_EPISODES,
+                 hof_opponents=2, hof_size=20, workers=1, T=MAX_STEPS, schedule=None, seed=None,
+                 verbose=True):
+        # separate configs: each population installs its own innovation tracker on its config
+        pred_config = load_config(config_path)
+        prey_config = load_config(config_path)
+        seed = pred_config.seed if seed is None else seed
+
+        self.predators = neat.Population(pred_config, seed=seed)
+        # a different seed, or both sides would start from identical genomes
+        self.prey = neat.Population(prey_config, seed=seed + 1)
+
+        self.hof_predators = HallOfFame(hof_size)
+        self.hof_prey = HallOfFame(hof_size)
+
+        self.n_episodes = n_episodes
+        self.hof_episodes = hof_episodes
+        self.hof_opponents = hof_opponents
+        self.T = T
+        self.verbose = verbose
+        self.rng = np.random.default_rng(seed)
+
+        # shared scenario bank - the layouts of a generation are shared by both sides
+        # (workers load the bank from schedule.bank.path)
+        self.schedule = training_schedule(n_episodes) if schedule is None else schedule
+
+        self.cache = GenomeCache()
+
+        # workers != 1 spreads each generation's episodes over a process pool
+        self.pool = None
+        if workers != 1:
+            self.pool = ParallelEvaluator(None, config_path,
+                                          setup=partial(worker_setup, bank_path=self.schedule.bank.path, T=T),
+                                          num_workers=workers, verbose=verbose)
+
+        # this generation's best genome of each side, and one record per generation
+        self.champions = {}
+        self.history = []
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _champion_scenarios(self, champions, scenarios):
+        # hof_episodes of this generation's scenarios per drawn champion, the i-th
+        # champion starting at slot i * hof_episodes (wrapping), so the drawn champions
+        # cover different layouts and every current genome meets a champion on the same ones
+        k = self.hof_episodes
+        slots = np.arange(len(champions) * k).reshape(-1, k) % len(scenarios)
+        return np.asarray(scenarios)[slots]
+
+    def _play(self, preds, prey, matches, config):
+        # preds / prey: (genome, precompiled network or None) per index
+        if self.pool is None:
+            def nets(side):
+                return [self.cache.network(g, config) if net is None else net for g, net in side]
+            return play_matches(nets(preds), nets(prey), matches, bank=self.schedule.bank, T=self.T)
+
+        pred_genomes = [g for g, _ in preds]
+        prey_genomes = [g for g, _ in prey]
+        n = len(matches["pred"])
+        pred_scores, prey_scores, captured = np.zeros(n), np.zeros(n), np.zeros(n, dtype=bool)
+        tasks = []
+        start = 0
+        for size in chunk_sizes(n, self.pool.num_workers):
+            tasks.append(_match_task(np.arange(start, start + size), pred_genomes, prey_genomes,
+                                     matches, config))
+            start += size
+        for idx, (p, q, c) in self.pool.map(play_match_chunk, tasks):
+            pred_scores[idx] = p
+            prey_scores[idx] = q
+            captured[idx] = c
+        return pred_scores, prey_scores, captured
+
+    def evaluate(self):
+        # assigns fitness to both current populations from one batch of episodes
+        config = self.predators.config
+        preds = list(self.predators.population.values())
+        prey = list(self.prey.population.values())
+        hof_pred = self.hof_predators.sample(self.hof_opponents, self.rng)
+        hof_prey = self.hof_prey.sample(self.hof_opponents, self.rng)
+
+        scenarios = self.schedule.next()
+        matches = schedule_matches(len(preds), len(prey), scenarios, self.n_episodes,
+                                   self.rng, hof_pred=self._champion_scenarios(hof_pred, scenarios),
+                                   hof_prey=self._champion_scenarios(hof_prey, scenarios))
+
+        players = [(g, None) for g in preds] + [(c.genome, c.network) for c in hof_pred]
+        opponents = [(g, None) for g in prey] + [(c.genome, c.network) for c in hof_prey]
+        pred_scores, prey_scores, captured = self._play(players, opponents, matches, config)
+
+        scored = matches["score_pred"]
+        for g, f in zip(preds, _mean_by(matches["pred"][scored], pred_scores[scored], len(preds))):
+            g.fitness = float(f)
+        scored = matches["score_prey"]
+        for g, f in zip(prey, _mean_by(matches["prey"][scored], prey_scores[scored], len(prey))):
+            g.fitness = float(f)
+
+        # how evenly the games against each drawn champion went, for the next draws
+        hof_games = matches["score_pred"] ^ matches["score_prey"]
+        _record_games(hof_prey, matches["prey"] - len(prey), hof_games & matches["score_pred"], captured)
+        _record_games(hof_pred, matches["pred"] - len(preds), hof_games & matches["score_prey"], captured)
+
+        self.champions = {
+            "predator": max(preds, key=lambda g: g.fitness),
+            "prey": max(prey, key=lambda g: g.fitness),
+        }
+        record = {
+            "generation": self.predators.generation,
+            "episodes": len(matches["pred"]),
+            "shared": int(np.sum(matches["score_pred"] & matches["score_prey"])),
+            "predator_best": self.champions["predator"].fitness,
+            "predator_mean": float(np.mean([g.fitness for g in preds])),
+            "prey_best": self.champions["prey"].fitness,
+            "prey_mean": float(np.mean([g.fitness for g in prey])),
+        }
+        self.history.append(record)
+        if self.verbose:
+            print(f"generation {record['generation']}: {record['episodes']} episodes "
+                  f"({record['shared']} shared) | predators best "
+                  f"{record['predator_best']:.1f} mean {record['predator_mean']:.1f} | prey best "
+                  f"{record['prey_best']:.1f} mean {record['prey_mean']:.1f}")
+
+    def generation(self):
+        self.evaluate()
+        # reproduction, speciation and reporters as usual, one generation per side
+        self.predators.run(_already_scored, 1)
+        self.prey.run(_already_scored, 1)
+
+    def run(self, rounds, generations_per_round=3):
+        config = self.predators.config
+        for r in range(rounds):
+            for _ in range(generations_per_round):
+                self.generation()
+            self.hof_predators.add(self.champions["predator"], config, r)
+            self.hof_prey.add(self.champions["prey"], config, r)
+            if self.verbose:
+                print(f"round {r}: hall of fame {len(self.hof_predators)} predators, "
+                      f"{len(self.hof_prey)} prey")
+        return self.champions
+
+
+def run_coevolution(rounds=10, generations=3, workers=1):
+    os.makedirs("results/coevolution", exist_ok=True)
+
+    with Coevolution(workers=workers) as coevo:
+        champions = coevo.run(rounds, generations)
+
+    config = coevo.predators.config
+    pred_version = registry.save("coevolved_predator", champions["predator"], config, tags=("best",))
+    prey_version = registry.save("coevolved_prey", champions["prey"], config, tags=("best",))
+    print(f"\nCoevolution complete. Saved coevolved_predator {pred_version}, coevolved_prey {prey_version}.")
+
+    # both sides' best fitness per generation
+    import matplotlib.pyplot as plt
+    gens = [h["generation"] for h in coevo.history]
+    plt.plot(gens, [h["predator_best"] for h in coevo.history], label="predators")
+    plt.plot(gens, [h["prey_best"] for h in coevo.history], label="prey")
+    plt.xlabel("Generation")
+    plt.ylabel("Best Fitness")
+    plt.title("Predator-Prey Coevolution")
+    plt.legend()
+    plt.savefig("results/coevolution/fitness_curve.png")
+    plt.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--generations", type=int, default=3, help="generations per round")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="evaluation processes (default 1 = in-process, 0 = one per core)")
+    args = parser.parse_args()
+    run_coevolution(args.rounds, args.generations, args.workers)
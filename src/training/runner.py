@@ -0,0 +1,247 @@
+# shared setup of the three single-population training scripts: evaluation pool
+# (process pool or remote workers), checkpoints and --resume, model registry, profiling,
+# telemetry and steady-state mode. each script only supplies its episode code and a
+# TrainingSpec, then hands its command line to main()
+#
+#   SPEC = TrainingSpec(name="prey", role="prey", play=play_episodes, worker_setup=worker_setup,
+#                       title="Prey Evolution Progress",
+#                       curve_path="results/prey_training/prey_fitness_curve.png")
+#   winner, version = train(SPEC, workers=4, resume=True)
+#
+# play / worker_setup follow the ParallelEvaluator protocol and must be module-level
+# functions of the script, so worker processes can import them:
+#   play(genomes, config, scenarios, n_episodes, bank=..., cache=..., **worker context)
+#   worker_setup(config, bank_path=None[, opponent_version]) -> worker context
+#
+# a fixed opponent (spec.opponent) is resolved to one registry version when the run
+# starts and handed to every worker by that version, never by tag: remote workers read
+# their own registry, and a newer "best" saved mid-run must not change the opponent
+import argparse
+import os
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable
+
+import neat
+
+from src.core.scenarios import training_schedule
+from src.neat_utils.checkpoint import AsyncCheckpointer, start_or_resume
+from src.neat_utils.config import CONFIG_PATH, load_config
+from src.neat_utils.distributed import (AUTHKEY_ENV, Coordinator, authkey_from_env, parse_address,
+                                        run_worker)
+from src.neat_utils.genome_cache import CacheReporter, GenomeCache, genome_hash
+from src.neat_utils.parallel import ParallelEvaluator
+from src.neat_utils.profile_reporter import ProfileReporter
+from src.neat_utils.racing import RacingEvaluator
+from src.neat_utils.registry import registry
+from src.neat_utils.steady_state import SteadyStateEvolution
+from src.neat_utils.telemetry import TelemetryReporter
+
+
+@dataclass
+class TrainingSpec:
+    name: str                   # results/checkpoints/<name>, results/telemetry/<name>.jsonl
+    role: str                   # model registry role the winner is saved under
+    play: Callable
+    worker_setup: Callable
+    title: str                  # fitness curve title and path
+    curve_path: str
+    n_episodes: int = 5
+    generations: int = 30
+    # scenario bank settings (training_schedule keyword arguments)
+    scenario_params: dict = field(default_factory=dict)
+    # registry role of the fixed opponent (worker_setup's opponent_version), if any
+    opponent: str = None
+
+    @property
+    def checkpoint_dir(self):
+        # periodic snapshots of the run, for --resume after a crash
+        return os.path.join("results", "checkpoints", self.name)
+
+    @property
+    def telemetry_path(self):
+        # per-generation throughput / memory records (--telemetry)
+        return os.path.join("results", "telemetry", f"{self.name}.jsonl")
+
+
+def train(spec, workers=1, resume=False, fresh=False, coordinator=None, steady_state=False,
+          fixed_scenarios=False, profile=False, profile_generation=None, telemetry=False,
+          tracemalloc_top=0):
+    # -> (winner, registry version it was saved as)
+    config = load_config(CONFIG_PATH)
+
+    # continue from the newest checkpoint, or start a fresh run (an earlier run's
+    # checkpoints need resume or fresh, which archives them)
+    pop, extra = start_or_resume(spec.checkpoint_dir, config, resume=resume, fresh=fresh)
+
+    # a resumed run that already played all its generations: nothing to evaluate, and
+    # its winner is only saved if the run ended before it got into the registry
+    generations = spec.generations - pop.generation
+    if generations <= 0:
+        print(f"{spec.name}: all {spec.generations} generations already played "
+              f"(checkpoint at generation {pop.generation})")
+        return pop.best_genome, save_winner(spec, pop.best_genome, config)
+
+    pop.add_reporter(neat.StdOutReporter(True))
+    stats = neat.StatisticsReporter()
+    pop.add_reporter(stats)
+
+    # shared scenario bank - all genomes of a generation face the same layouts, new ones
+    # every generation unless fixed_scenarios (then elites' scores come from the cache)
+    scenario_params = dict(spec.scenario_params)
+    if fixed_scenarios:
+        scenario_params["rotate"] = False
+    schedule = training_schedule(spec.n_episodes, **scenario_params)
+    schedule.generation = extra.get("schedule", 0)
+
+    # what every evaluation process sets up with; a resumed run keeps its opponent
+    setup_kwargs = {"bank_path": schedule.bank.path}
+    if spec.opponent is not None:
+        setup_kwargs["opponent_version"] = (extra.get("opponent_version")
+                                            or registry.resolve(spec.opponent))
+
+    # compiled networks are cached by genome content (workers keep their own network
+    # cache); scores only with a fixed scenario set (fixed_scenarios, or
+    # scenario_params["rotate"] = False), where the same scenarios come back
+    cache = GenomeCache()
+    pop.add_reporter(CacheReporter(cache))
+
+    # per-phase timings / telemetry after every generation; added before the pool starts,
+    # so its workers time their episodes too
+    profile_reporter = None
+    if profile or profile_generation is not None:
+        profile_reporter = ProfileReporter(profile_generation)
+        pop.add_reporter(profile_reporter)
+    telemetry_reporter = None
+    if telemetry or tracemalloc_top:
+        telemetry_reporter = TelemetryReporter(spec.telemetry_path, tracemalloc_top=tracemalloc_top,
+                                               resume=resume)
+        pop.add_reporter(telemetry_reporter)
+
+    # race the episodes: the weaker half stops after each round, down to the top 20%
+    # workers != 1 spreads each round over a process pool (0 = one worker per core),
+    # coordinator="host:port" over remote workers started with --worker host:port
+    # with no remote worker left for a minute the coordinator plays in-process
+    pool = None
+    context = dict(spec.worker_setup(config, **setup_kwargs), bank=schedule.bank, cache=cache)
+    play = partial(spec.play, **context)
+    if coordinator is not None:
+        pool = Coordinator(parse_address(coordinator, "0.0.0.0"), authkey_from_env(),
+                           n_episodes=spec.n_episodes, setup_kwargs=setup_kwargs, fallback=play,
+                           verbose=True)
+        play = pool.play
+    elif workers != 1:
+        pool = ParallelEvaluator(spec.play, CONFIG_PATH, setup=partial(spec.worker_setup, **setup_kwargs),
+                                 num_workers=workers, n_episodes=spec.n_episodes, verbose=True)
+        play = pool.play
+    if not schedule.rotate:
+        play = cache.wrap_play(play)
+    if telemetry_reporter is not None:
+        telemetry_reporter.pool = pool
+
+    evaluator = RacingEvaluator(play, max_episodes=spec.n_episodes,
+                                eta=2, schedule=schedule, verbose=True)
+    evaluator.sigma = extra.get("sigma")
+
+    # best fitness per generation before a resume (the new stats only see this session)
+    best_history = extra.get("best_fitness", [])
+
+    checkpointer = AsyncCheckpointer(spec.checkpoint_dir, best_genome=pop.best_genome, extra_state=lambda: {
+        "schedule": schedule.generation,
+        "opponent_version": setup_kwargs.get("opponent_version"),
+        "sigma": evaluator.sigma,
+        "best_fitness": best_history + [g.fitness for g in stats.most_fit_genomes],
+    })
+    pop.add_reporter(checkpointer)
+
+    try:
+        if steady_state:
+            # no generation barrier: children are bred and sent out as results come back
+            # (asynchronously on a process pool or remote workers, chunk by chunk otherwise)
+            evolution = SteadyStateEvolution(pop, play if pool is None else pool,
+                                             schedule=schedule, n_episodes=spec.n_episodes)
+            winner = evolution.run(generations)
+        else:
+            winner = pop.run(evaluator, n=generations)
+    finally:
+        checkpointer.close()
+        if pool is not None:
+            pool.close()
+        if telemetry_reporter is not None:
+            telemetry_reporter.close()
+        if profile_reporter is not None:
+            profile_reporter.close()
+
+    version = save_winner(spec, winner, config)
+    plot_fitness(spec, best_history + [g.fitness for g in stats.most_fit_genomes])
+    return winner, version
+
+
+def save_winner(spec, winner, config):
+    # -> registry version of winner; a genome that is already registered keeps its
+    # version and tags instead of becoming a new "best"
+    if winner is None:
+        return None
+    key = genome_hash(winner, config)
+    registry.reload()
+    for version in reversed(registry.versions(spec.role)):
+        # versions saved before genome_hash was recorded are hashed from their artifact
+        stored = registry.meta(spec.role, version).get("genome_hash")
+        if (stored or genome_hash(registry.genome(spec.role, version), config)) == key:
+            return version
+    return registry.save(spec.role, winner, config, tags=("best",), genome_hash=key)
+
+
+def plot_fitness(spec, best):
+    # best fitness per generation
+    import matplotlib.pyplot as plt
+    plt.plot(range(len(best)), best)
+    plt.xlabel("Generation")
+    plt.ylabel("Best Fitness")
+    plt.title(spec.title)
+    plt.savefig(spec.curve_path)
+    plt.close()
+
+
+def parser(spec):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1,
+                        help="evaluation processes (default 1 = in-process, 0 = one per core)")
+    start = parser.add_mutually_exclusive_group()
+    start.add_argument("--resume", action="store_true",
+                       help=f"continue from the newest checkpoint in {spec.checkpoint_dir}")
+    start.add_argument("--fresh", action="store_true",
+                       help="start over even if an earlier run left checkpoints (they are moved to archive/)")
+    parser.add_argument("--coordinator", metavar="HOST:PORT",
+                        help=f"evaluate on remote workers connecting to this address ({AUTHKEY_ENV} must be set)")
+    parser.add_argument("--fixed-scenarios", action="store_true",
+                        help="play every generation on the same scenarios (scores of returning "
+                             "genomes are reused) instead of rotating through the bank")
+    parser.add_argument("--steady-state", action="store_true",
+                        help="steady-state evolution: breed and evaluate continuously, no generation barrier")
+    parser.add_argument("--profile", action="store_true",
+                        help="print where each generation's time goes (per-phase timers)")
+    parser.add_argument("--profile-generation", type=int, metavar="N",
+                        help="also write a cProfile dump of generation N to results/profiles")
+    parser.add_argument("--telemetry", action="store_true",
+                        help=f"write one throughput / memory record per generation to {spec.telemetry_path}")
+    parser.add_argument("--tracemalloc", type=int, default=0, metavar="N",
+                        help="with telemetry: trace allocations, record the N fastest-growing sites (slow)")
+    parser.add_argument("--worker", metavar="HOST:PORT",
+                        help="run as an evaluation worker for the coordinator at this address")
+    return parser
+
+
+def main(spec, run_training, argv=None):
+    # a script's command line: --worker serves a coordinator, anything else trains
+    # through the script's run_training(**options)
+    args = parser(spec).parse_args(argv)
+    if args.worker:
+        run_worker(parse_address(args.worker), authkey_from_env(), spec.play,
+                   setup=spec.worker_setup, verbose=True)
+    else:
+        run_training(workers=args.workers, resume=args.resume, fresh=args.fresh,
+                     coordinator=args.coordinator, fixed_scenarios=args.fixed_scenarios,
+                     steady_state=args.steady_state, profile=args.profile,
+                     profile_generation=args.profile_generation, telemetry=args.telemetry,
+                     tracemalloc_top=args.tracemalloc)
@@ -1,103 +1,111 @@
 # first train predators while prey stays fixed
 import os
-import neat
-import pickle
-from statistics import mean
-
-from src.core.environment import Environment
-from src.core.simulation import run_episode
-from src.neat_utils.controllers import make_controller
-from src.neat_utils.dummy_controllers import prey_dummy
-from src.neat_utils.dummy_controllers import GreedyPreyDummy
-from src.neat_utils.fitness import predator_fitness
+import numpy as np
+
+from src.core.vec_environment import VecEnvironment
+from src.core.simulation import run_episodes_batched
+from src.core.profiling import profiler
+from src.core.scenarios import ScenarioBank
+from src.core.trace import stack_traces
+from src.neat_utils.controllers import make_population_controller
+from src.neat_utils.dummy_controllers import BatchedGreedyPreyDummy
+from src.neat_utils.fitness import predator_fitness_batch
+from src.neat_utils.genome_cache import GenomeCache
+from src.training.runner import TrainingSpec, main, train
 
 # save results
 os.makedirs("results/predator_training", exist_ok=True)
 
-def evaluate_genomes(genomes, config):
-    # called by NEAT. assigns fitness to each genome
-    for gid, genome in genomes:
-        genome.fitness = 0.0
-
-        # build predator controller for this genome
-        predator_ctrl = make_controller(genome, config, speed=2.0)
-        #print("DEBUGGING: TRAINING predator speed =", 2.0)
-
-        # run multiple episodes for stability
-        episode_fitnesses = []
-
-        for _ in range(5):         
-            env = Environment(
-                num_obstacles=3,
-                min_r=4.0,
-                max_r=12.0
-            )     # fresh environment each time
-
-            prey_ctrl = GreedyPreyDummy(env)
-
-            ep = run_episode(
-                predator_ctrl,
-                prey_ctrl,        # fixed prey
-                env,
-                T=400              
-            )
-            
-            
-            # removed below block and replaced with predator fitness function
-            # reward faster captures:
-            # reward_capture = 400 if ep.captured else 0
-            # reward getting closer (inverse distance)
-            # reward_distance = max(0, 120 - ep.final_distance * 15)
-            # penalize long chases (we want efficient hunting)
-            # reward_time = max(0, 300 - ep.steps)
-            # fitness = reward_capture + reward_distance + reward_time
-            
-            fitness = predator_fitness(ep)
-            
-            episode_fitnesses.append(fitness)
-
-
-        # use mean fitness across episodes
-        genome.fitness = mean(episode_fitnesses)
-
-
-def run_training():
-    config_path = os.path.join("config", "neat_config.txt")
-
-    config = neat.Config(
-        neat.DefaultGenome,
-        neat.DefaultReproduction,
-        neat.DefaultSpeciesSet,
-        neat.DefaultStagnation,
-        config_path
+N_EPISODES = 5         # run multiple episodes for stability
+GENERATIONS = 30
+
+
+def play_episodes(genomes, config, scenarios=None, n_episodes=N_EPISODES, bank=None,
+                  cache=None):
+    # plays n_episodes per genome (on the given scenarios of bank, if any) and returns
+    # a (len(genomes), n_episodes) array of episode fitnesses
+    if scenarios is not None:
+        n_episodes = len(scenarios)
+
+    # every genome's episodes run together in one lockstep batch
+    # fresh environment for each episode
+    env = VecEnvironment(
+        len(genomes) * n_episodes,
+        num_obstacles=3,
+        min_r=4.0,
+        max_r=12.0,
+        scenarios=bank
     )
 
-    pop = neat.Population(config)
-    pop.add_reporter(neat.StdOutReporter(True))
-    stats = neat.StatisticsReporter()
-    pop.add_reporter(stats)
+    # every genome's network packed into one controller for all episodes
+    # (genome-major rows, n_episodes per genome)
+    with profiler.phase("build"):
+        predator_ctrls = make_population_controller([g for _, g in genomes], config, n_episodes, speed=2.0,
+                                                    cache=cache)
+
+    prey_ctrl = BatchedGreedyPreyDummy(env)    # fixed prey
+
+    episodes = run_episodes_batched(predator_ctrls, prey_ctrl, env=env, T=400,
+                                    scenarios=None if scenarios is None else np.tile(scenarios, len(genomes)))
+
+    # removed below block and replaced with predator fitness function
+    # reward faster captures:
+    # reward_capture = 400 if ep.captured else 0
+    # reward getting closer (inverse distance)
+    # reward_distance = max(0, 120 - ep.final_distance * 15)
+    # penalize long chases (we want efficient hunting)
+    # reward_time = max(0, 300 - ep.steps)
+    # fitness = reward_capture + reward_distance + reward_time
+
+    # score every episode in one call, then one row of n_episodes per genome
+    with profiler.phase("fitness"):
+        trace, steps = stack_traces([ep.trace for ep in episodes])
+        captured = [ep.captured for ep in episodes]
+        return predator_fitness_batch(trace, steps, captured).reshape(len(genomes), n_episodes)
+
+
+def worker_setup(config, bank_path=None):
+    # play_episodes context for a worker process, loaded once when the worker starts
+    return {
+        "bank": None if bank_path is None else ScenarioBank.load(bank_path),
+        "cache": GenomeCache(),
+    }
+
+
+def evaluate_genomes(genomes, config, schedule=None):
+    # called by NEAT. assigns fitness to each genome from a full N_EPISODES evaluation
+    # with a ScenarioSchedule every genome plays the same scenarios this generation
+    genomes = list(genomes)
+    if schedule is None:
+        scores = play_episodes(genomes, config)
+    else:
+        scores = play_episodes(genomes, config, schedule.next(), bank=schedule.bank)
+
+    for (gid, genome), episode_fitnesses in zip(genomes, scores):
+        # use mean fitness across episodes
+        genome.fitness = float(episode_fitnesses.mean())
 
-    # run for 30 generations
-    winner = pop.run(evaluate_genomes, n=30) 
 
-    # save best genome
-    with open("results/predator_training/best_predator.pkl", "wb") as f:
-        pickle.dump(winner, f)
+SPEC = TrainingSpec(
+    name="predator",
+    role="predator",
+    play=play_episodes,
+    worker_setup=worker_setup,
+    title="Predator Evolution Progress",
+    curve_path="results/predator_training/predator_fitness_curve.png",
+    n_episodes=N_EPISODES,
+    generations=GENERATIONS,
+    scenario_params={"num_obstacles": 3, "min_r": 4.0, "max_r": 12.0},
+)
 
-    print("\nTraining complete. Best genome saved.")
 
-    # save fitness curve
-    import matplotlib.pyplot as plt
-    gen = range(len(stats.most_fit_genomes))
-    best = [g.fitness for g in stats.most_fit_genomes]
+def run_training(**options):
+    # options: see runner.train (workers, resume, coordinator, steady_state, ...)
+    winner, version = train(SPEC, **options)
 
-    plt.plot(gen, best)
-    plt.xlabel("Generation")
-    plt.ylabel("Best Fitness")
-    plt.title("Predator Evolution Progress")
-    plt.savefig("results/predator_training/predator_fitness_curve.png")
-    plt.close()
+    print(f"\nTraining complete. Best genome saved (predator {version}).")
+    return winner
 
 
 if __name__ == "__main__":
-    run_training()
+    main(SPEC, run_training)
@@ -2,100 +2,107 @@
 # this completes the basic competitive coevolution loop
 
 import os
-import neat
-import pickle
-from statistics import mean
-
-from src.core.environment import Environment
-from src.core.simulation import run_episode
-from src.neat_utils.controllers import make_controller
-from src.neat_utils.fitness import predator_fitness
-
-# load the already evolved prey brain
-PREY_MODEL_PATH = "results/prey_training/best_prey.pkl"
+import numpy as np
+
+from src.core.vec_environment import VecEnvironment
+from src.core.simulation import run_episodes_batched
+from src.core.profiling import profiler
+from src.core.scenarios import ScenarioBank
+from src.core.trace import stack_traces
+from src.neat_utils.controllers import make_population_controller
+from src.neat_utils.fitness import predator_fitness_batch
+from src.neat_utils.genome_cache import GenomeCache
+from src.neat_utils.registry import registry
+from src.training.runner import TrainingSpec, main, train
 
 # save results
 SAVE_DIR = "results/pred_against_prey"
 os.makedirs(SAVE_DIR, exist_ok=True)
 
 
-# load evolved prey controller
-def load_evolved_prey(config):
-    with open(PREY_MODEL_PATH, "rb") as f:
-        prey_genome = pickle.load(f)
-
-    prey_controller = make_controller(prey_genome, config, speed=1.3)
-    return prey_controller
+# load evolved prey controller - the registry reads and compiles it once per process
+def load_evolved_prey(version="best"):
+    return registry.get("prey", version)
 
 
 # fitness evaluation for predators
-def evaluate_genomes(genomes, config):
-    prey_controller = load_evolved_prey(config)
-
-    for gid, genome in genomes:
-        genome.fitness = 0.0
-
-        # build predator controller
-        predator_ctrl = make_controller(genome, config, speed=2)
-
-        fitness_scores = []
-
-        # eval on multiple environments for robustness
-        for _ in range(5):
-            env = Environment()
-
-            ep = run_episode(
-                predator_ctrl,
-                prey_controller,
-                env,
-                T=500
-            )
-
-            fitness_scores.append(predator_fitness(ep))
-
-        genome.fitness = mean(fitness_scores)
+N_EPISODES = 5
+GENERATIONS = 30
+
+
+def play_episodes(genomes, config, scenarios=None, n_episodes=N_EPISODES, bank=None,
+                  prey_controller=None, cache=None):
+    # plays n_episodes per genome (on the given scenarios of bank, if any) and returns
+    # a (len(genomes), n_episodes) array of episode fitnesses
+    # worker processes pass in the prey they loaded at startup
+    if prey_controller is None:
+        prey_controller = load_evolved_prey()
+
+    if scenarios is not None:
+        n_episodes = len(scenarios)
+
+    # eval on multiple environments for robustness - one batch for all of them
+    env = VecEnvironment(len(genomes) * n_episodes, scenarios=bank)
+
+    # all predator networks in one packed controller, n_episodes rows per genome
+    with profiler.phase("build"):
+        predator_ctrls = make_population_controller([g for _, g in genomes], config, n_episodes, speed=2,
+                                                    cache=cache)
+
+    episodes = run_episodes_batched(predator_ctrls, prey_controller, env=env, T=500,
+                                    scenarios=None if scenarios is None else np.tile(scenarios, len(genomes)))
+
+    # score every episode in one call, then one row of n_episodes per genome
+    with profiler.phase("fitness"):
+        trace, steps = stack_traces([ep.trace for ep in episodes])
+        captured = [ep.captured for ep in episodes]
+        scores = predator_fitness_batch(trace, steps, captured)
+        return scores.reshape(len(genomes), n_episodes)
+
+
+def worker_setup(config, bank_path=None, opponent_version="best"):
+    # play_episodes context for a worker process, loaded once when the worker starts
+    return {
+        "prey_controller": load_evolved_prey(opponent_version),
+        "bank": None if bank_path is None else ScenarioBank.load(bank_path),
+        "cache": GenomeCache(),
+    }
+
+
+def evaluate_genomes(genomes, config, schedule=None):
+    # full N_EPISODES evaluation, on the schedule's shared scenarios when one is given
+    genomes = list(genomes)
+    if schedule is None:
+        scores = play_episodes(genomes, config)
+    else:
+        scores = play_episodes(genomes, config, schedule.next(), bank=schedule.bank)
+
+    for (gid, genome), fitness_scores in zip(genomes, scores):
+        genome.fitness = float(fitness_scores.mean())
+
+
+SPEC = TrainingSpec(
+    name="predator_vs_prey",
+    role="predator_vs_prey",
+    opponent="prey",
+    play=play_episodes,
+    worker_setup=worker_setup,
+    title="Predator Evolution Against Evolved Prey",
+    curve_path=f"{SAVE_DIR}/fitness_curve.png",
+    n_episodes=N_EPISODES,
+    generations=GENERATIONS,
+)
 
 
 # run training
-def run_training():
-    config_path = os.path.join("config", "neat_config.txt")
-
-    config = neat.Config(
-        neat.DefaultGenome,
-        neat.DefaultReproduction,
-        neat.DefaultSpeciesSet,
-        neat.DefaultStagnation,
-        config_path
-    )
-
-    pop = neat.Population(config)
-    pop.add_reporter(neat.StdOutReporter(True))
-    stats = neat.StatisticsReporter()
-    pop.add_reporter(stats)
-
+def run_training(**options):
+    # options: see runner.train (workers, resume, coordinator, steady_state, ...)
     print("\n--- Training predators against evolved prey ---\n")
+    winner, version = train(SPEC, **options)
 
-    # run for 30 generations
-    winner = pop.run(evaluate_genomes, n=30)
-
-    # save best predator
-    with open(f"{SAVE_DIR}/best_predator_vs_prey.pkl", "wb") as f:
-        pickle.dump(winner, f)
-
-    print("\nTraining complete. Saved new best predator.\n")
-
-    # plot fitness curve
-    import matplotlib.pyplot as plt
-    gens = range(len(stats.most_fit_genomes))
-    best = [g.fitness for g in stats.most_fit_genomes]
-
-    plt.plot(gens, best)
-    plt.xlabel("Generation")
-    plt.ylabel("Best Fitness")
-    plt.title("Predator Evolution Against Evolved Prey")
-    plt.savefig(f"{SAVE_DIR}/fitness_curve.png")
-    plt.close()
+    print(f"\nTraining complete. Saved new best predator (predator_vs_prey {version}).\n")
+    return winner
 
 
 if __name__ == "__main__":
-    run_training()
+    main(SPEC, run_training)
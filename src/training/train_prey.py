@@ -1,85 +1,105 @@
 # train prey while predator is fixed (using the evolved predator)
 import os
-import neat
-import pickle
-from statistics import mean
+import numpy as np
 
-from src.core.environment import Environment
-from src.core.simulation import run_episode
-from src.neat_utils.controllers import make_controller
-from src.neat_utils.fitness import prey_fitness_against_predator
+from src.core.vec_environment import VecEnvironment
+from src.core.simulation import run_episodes_batched
+from src.core.profiling import profiler
+from src.core.scenarios import ScenarioBank
+from src.core.trace import stack_traces
+from src.neat_utils.controllers import make_population_controller
+from src.neat_utils.fitness import prey_fitness_against_predator_batch
+from src.neat_utils.genome_cache import GenomeCache
+from src.neat_utils.registry import registry
+from src.training.runner import TrainingSpec, main, train
 
 
-PREDATOR_MODEL_PATH = "results/predator_training/best_predator.pkl"
-
 os.makedirs("results/prey_training", exist_ok=True)
 
 
-def load_predator(config):
-    with open(PREDATOR_MODEL_PATH, "rb") as f:
-        predator_genome = pickle.load(f)
-    predator_ctrl = make_controller(predator_genome, config, speed=2.0)
-    return predator_ctrl
-
+def load_predator(version="best"):
+    # trained predator from the model registry, read and compiled once per process
+    return registry.get("predator", version)
 
 
 # evaluate prey genomes
-def evaluate_genomes(genomes, config):
+N_EPISODES = 5       # evaluate each prey 5 times for stability
+GENERATIONS = 30
+
+
+def play_episodes(genomes, config, scenarios=None, n_episodes=N_EPISODES, bank=None,
+                  predator_ctrl=None, cache=None):
+    # plays n_episodes per genome (on the given scenarios of bank, if any) and returns
+    # a (len(genomes), n_episodes) array of episode scores
 
     # load predator ONCE outside the loop -> efficiency
-    predator_ctrl = load_predator(config)
+    # (worker processes pass in the one they loaded at startup)
+    if predator_ctrl is None:
+        predator_ctrl = load_predator()
+
+    if scenarios is not None:
+        n_episodes = len(scenarios)
 
-    for gid, genome in genomes:
-        genome.fitness = 0.0
+    # all prey episodes step together in one batch
+    env = VecEnvironment(len(genomes) * n_episodes, scenarios=bank)
 
-        prey_ctrl = make_controller(genome, config, speed=1.3)
-        episode_scores = []
+    # one packed forward pass per step for every prey network (n_episodes rows per genome)
+    with profiler.phase("build"):
+        prey_ctrls = make_population_controller([g for _, g in genomes], config, n_episodes, speed=1.3,
+                                                cache=cache)
 
-        for _ in range(5):   # evaluate each prey 5 times for stability
-            env = Environment()
-            ep = run_episode(predator_ctrl, prey_ctrl, env, T=500)
-            score = prey_fitness_against_predator(ep)
-            episode_scores.append(score)
+    episodes = run_episodes_batched(predator_ctrl, prey_ctrls, env=env, T=500,
+                                    scenarios=None if scenarios is None else np.tile(scenarios, len(genomes)))
 
-        genome.fitness = mean(episode_scores)
+    # score every episode in one call, then one row of n_episodes per genome
+    with profiler.phase("fitness"):
+        trace, steps = stack_traces([ep.trace for ep in episodes])
+        captured = [ep.captured for ep in episodes]
+        scores = prey_fitness_against_predator_batch(trace, steps, captured)
+        return scores.reshape(len(genomes), n_episodes)
 
 
+def worker_setup(config, bank_path=None, opponent_version="best"):
+    # play_episodes context for a worker process, loaded once when the worker starts
+    return {
+        "predator_ctrl": load_predator(opponent_version),
+        "bank": None if bank_path is None else ScenarioBank.load(bank_path),
+        "cache": GenomeCache(),
+    }
 
-def run_training():
-    config_path = os.path.join("config", "neat_config.txt")
 
-    config = neat.Config(
-        neat.DefaultGenome,
-        neat.DefaultReproduction,
-        neat.DefaultSpeciesSet,
-        neat.DefaultStagnation,
-        config_path,
-    )
+def evaluate_genomes(genomes, config, schedule=None):
+    # full N_EPISODES evaluation, on the schedule's shared scenarios when one is given
+    genomes = list(genomes)
+    if schedule is None:
+        scores = play_episodes(genomes, config)
+    else:
+        scores = play_episodes(genomes, config, schedule.next(), bank=schedule.bank)
 
-    pop = neat.Population(config)
-    pop.add_reporter(neat.StdOutReporter(True))
-    stats = neat.StatisticsReporter()
-    pop.add_reporter(stats)
+    for (gid, genome), episode_scores in zip(genomes, scores):
+        genome.fitness = float(episode_scores.mean())
 
-    winner = pop.run(evaluate_genomes, n=30)
 
-    with open("results/prey_training/best_prey.pkl", "wb") as f:
-        pickle.dump(winner, f)
+SPEC = TrainingSpec(
+    name="prey",
+    role="prey",
+    opponent="predator",
+    play=play_episodes,
+    worker_setup=worker_setup,
+    title="Prey Evolution Progress",
+    curve_path="results/prey_training/prey_fitness_curve.png",
+    n_episodes=N_EPISODES,
+    generations=GENERATIONS,
+)
 
-    print("\nPrey training complete. Best prey saved.")
 
-    # save fitness curve
-    import matplotlib.pyplot as plt
-    gen = range(len(stats.most_fit_genomes))
-    best = [g.fitness for g in stats.most_fit_genomes]
+def run_training(**options):
+    # options: see runner.train (workers, resume, coordinator, steady_state, ...)
+    winner, version = train(SPEC, **options)
 
-    plt.plot(gen, best)
-    plt.xlabel("Generation")
-    plt.ylabel("Best Fitness")
-    plt.title("Prey Evolution Progress")
-    plt.savefig("results/prey_training/prey_fitness_curve.png")
-    plt.close()
+    print(f"\nPrey training complete. Best prey saved (prey {version}).")
+    return winner
 
 
 if __name__ == "__main__":
-    run_training()
+    main(SPEC, run_training)
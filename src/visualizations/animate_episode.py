@@ -3,14 +3,16 @@ import matplotlib.animation as animation
 import numpy as np
 from matplotlib.patches import Circle
 
+from src.core.trace import trace_column
+
 def animate_episode(ep, env, save_path="results/visualizations/chase.mp4"):
     trace = ep.trace
-    if not trace:
+    if len(trace) == 0:
         print("No trace data in episode; cannot animate.")
         return
 
-    preds = np.array([step["pred_pos"] for step in trace])
-    preys = np.array([step["prey_pos"] for step in trace])
+    preds = trace_column(trace, "pred_pos")
+    preys = trace_column(trace, "prey_pos")
 
     fig, ax = plt.subplots(figsize=(6, 6))
     ax.set_xlim(0, env.width)
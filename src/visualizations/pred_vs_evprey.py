@@ -1,40 +1,20 @@
 import os
-import pickle
 import numpy as np
 import matplotlib.pyplot as plt
 
 from src.core.environment import Environment
 from src.core.simulation import run_episode
-from src.neat_utils.controllers import make_controller
+from src.core.trace import trace_column
+from src.neat_utils.registry import registry
 
 
-PRED_PATH = "results/pred_against_prey/best_predator_vs_prey.pkl"
-PREY_PATH = "results/prey_training/best_prey.pkl"
-CONFIG_PATH = "config/neat_config.txt"
-
 SAVE_DIR = "results/visualizations"
 os.makedirs(SAVE_DIR, exist_ok=True)
 
 
-def load_genome(path):
-    with open(path, "rb") as f:
-        return pickle.load(f)
-
-
-def load_config():
-    import neat
-    return neat.Config(
-        neat.DefaultGenome,
-        neat.DefaultReproduction,
-        neat.DefaultSpeciesSet,
-        neat.DefaultStagnation,
-        CONFIG_PATH
-    )
-
-
 def plot_episode_with_obstacles(ep, env, save_path):
-    preds = np.array([step["pred_pos"] for step in ep.trace])
-    preys = np.array([step["prey_pos"] for step in ep.trace])
+    preds = trace_column(ep.trace, "pred_pos")
+    preys = trace_column(ep.trace, "prey_pos")
 
 
     plt.figure(figsize=(8, 7))
@@ -76,14 +56,9 @@ def plot_episode_with_obstacles(ep, env, save_path):
 def main():
     print("\n---- Predator vs Evolved Prey ----")
 
-    config = load_config()
-
     # Load predator and prey
-    predator_genome = load_genome(PRED_PATH)
-    prey_genome = load_genome(PREY_PATH)
-
-    predator_ctrl = make_controller(predator_genome, config, speed=2)
-    prey_ctrl = make_controller(prey_genome, config, speed=1.3)
+    predator_ctrl = registry.get("predator_vs_prey", "best")
+    prey_ctrl = registry.get("prey", "best")
 
     # run simulation
     env = Environment()
@@ -91,7 +66,7 @@ def main():
 
     # DEBUGGING
     print("\nPrey path deltas (movement each step):")
-    prey_path = [step["prey_pos"] for step in ep.trace]
+    prey_path = trace_column(ep.trace, "prey_pos")
 
     for i in range(1, len(prey_path)):
         dx = prey_path[i][0] - prey_path[i-1][0]
@@ -1,50 +1,25 @@
 import os
-import pickle
-import neat
 import numpy as np
 
 from src.core.environment import Environment
 from src.core.simulation import run_episode
-from src.neat_utils.controllers import make_controller
+from src.neat_utils.registry import registry
 from src.visualizations.viz_utils import plot_episode_with_obstacles
 from src.neat_utils.dummy_controllers import GreedyPreyDummy
 from src.visualizations.animate_episode import animate_episode
 
 
 
-PRED_PATH = "results/predator_training/best_predator.pkl"
-PREY_PATH = "results/prey_training/best_prey.pkl"
-CONFIG_PATH = "config/neat_config.txt"
-
-
-def load_network(path, config):
-    # load genome and create NEAT controller
-
-    with open(path, "rb") as f:
-        genome = pickle.load(f)
-
-    return make_controller(genome, config, speed=2.0)
-
-
 def main():
     os.makedirs("results/visualizations", exist_ok=True)
 
-    # load config
-    config = neat.Config(
-        neat.DefaultGenome,
-        neat.DefaultReproduction,
-        neat.DefaultSpeciesSet,
-        neat.DefaultStagnation,
-        CONFIG_PATH
-    )
-
     # new environment with obstacles
     env = Environment(num_obstacles=3)
 
-    # load trained predator and prey
-    pred_ctrl = load_network(PRED_PATH, config)
+    # load trained predator and prey (this view has always run the prey at predator speed)
+    pred_ctrl = registry.get("predator", "best")
 
-    prey_ctrl = load_network(PREY_PATH, config)
+    prey_ctrl = registry.get("prey", "best", speed=2.0)
     #prey_ctrl = GreedyPreyDummy(env)
 
 
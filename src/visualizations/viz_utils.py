@@ -1,9 +1,11 @@
 import matplotlib.pyplot as plt
 import numpy as np
 
+from src.core.trace import trace_column
+
 def plot_episode_with_obstacles(ep, env, save_path=None):
-    preds = np.array([step["pred_pos"] for step in ep.trace])
-    preys = np.array([step["prey_pos"] for step in ep.trace])
+    preds = trace_column(ep.trace, "pred_pos")
+    preys = trace_column(ep.trace, "prey_pos")
 
     plt.figure(figsize=(7, 7))
 